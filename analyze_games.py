@@ -0,0 +1,239 @@
+"""
+Batch analysis of archived games: replay every game saved in a directory through the Engine, the way rerun.py does
+    but without calling run(), and write a summary of each game as one line of JSON to a single summary file.
+The games are spread across a pool of worker processes.
+
+An archived game can be any of
+    > a 'game_play.pkl' dump of [num_players, my_player_number, my_hand, turn_sequence], as written by earlier
+        versions of clue_solver.py (read with dill when it's installed, otherwise with the pickle module)
+    > a game journal (see journal.py), ending in '.jsonl'
+    > a game script (see game_script.py), ending in '.txt'
+
+The deductions run after every Turn and UPDATE, and each game's summary records
+    > the Turn on which each card became known, i.e. its holder was found or it was found to be a Murder Card
+        (Turn 0 for the cards in your own hand)
+    > the Turn on which the Engine was ready to accuse, if it ever was
+    > the Turn that led to a contradiction, if any, and the Engine's complaint (the game's replay stops there)
+
+    {"game":"archive/0042/game_play.pkl","players":4,"turns":38,"card_known_on_turn":{"plum":12,...},
+     "ready_to_accuse_on_turn":31,"contradiction":null}
+
+    >>> python3 analyze_games.py archive/ --output summary.jsonl --processes 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from defs import mask_to_cards
+from game_script import ScriptReader, ingest, numbered_lines, parse_setup
+from journal import read_journal
+
+SUMMARY_FILE = 'game_summaries.jsonl'
+# Games handed to a worker process at a time, so sending them costs little next to replaying them
+CHUNK_SIZE = 16
+
+
+def _cards(obj, name):
+    """
+    The cards of a ClueCardSet attribute of an unpickled object, read from its pickled state:
+        a CardSet since cards were stored as bitmasks, and a dict of sets by category before then
+
+    :return set[str]:
+    """
+    state = vars(obj)
+    if name in state:
+        return set(state[name])
+    return {card for cards in state.get(name + '_dict', {}).values() for card in cards}
+
+
+def load_pickled_game(path):
+    """
+    Read a game from a 'game_play.pkl' dump
+
+    :param str path:
+    :return tuple[int, int, list[str], list[tuple]]: The number of Players, your Player number, your HAND,
+                                                        and the game's actions, as from ScriptReader.parse_batch()
+    """
+    try:
+        import dill as pickle
+    except ImportError:
+        import pickle
+
+    with open(path, 'rb') as f:
+        num_players, my_player_number, my_hand, turn_sequence = pickle.load(f)
+
+    actions = []
+    # Skip Turn 0, which every Engine starts with
+    for turn_number, turn in enumerate(turn_sequence[1:], start=1):
+        if turn.is_pass:
+            actions.append(('pass', turn_number))
+            continue
+        revealed_card = turn.revealed_card if turn.suggester.is_me else None
+        revealer_num = turn.revealer.number if turn.revealer else 0
+        actions.append(('turn', turn_number, sorted(_cards(turn, 'suggestion')), revealer_num, revealed_card))
+    return num_players, my_player_number, list(my_hand), actions
+
+
+def load_journal_game(path):
+    """
+    Read a game from a game journal, leaving out whatever was undone (and not redone)
+
+    :param str path:
+    :return tuple[int, int, list[str], list[tuple]]: As from load_pickled_game()
+    """
+    records = read_journal(path)
+    setup = next(records, None)
+    if setup is None or setup['type'] != 'setup':
+        raise ValueError(f"{path} does not start with a game setup record")
+
+    # Each Turn and UPDATE is one step of UNDO, as in Engine.checkpoint()
+    actions = []
+    redo_stack = []
+    for record in records:
+        if record['type'] == 'undo':
+            redo_stack.append(actions[-record['steps']:])
+            del actions[-record['steps']:]
+            continue
+        if record['type'] == 'redo':
+            actions += redo_stack.pop()
+            continue
+
+        redo_stack.clear()
+        if record['type'] == 'update':
+            actions.append(('update', record['number'], record['player'], record['action'], record['card']))
+        elif record['type'] != 'turn':
+            raise ValueError(f"{path}: unknown journal record type '{record['type']}'")
+        elif record.get('pass'):
+            actions.append(('pass', record['number']))
+        else:
+            actions.append(('turn', record['number'], record['suggestion'], record['revealer'], record['revealed']))
+    return setup['num_players'], setup['my_player_number'], setup['my_hand'], actions
+
+
+def load_script_game(path):
+    """
+    Read a game from a game script
+
+    :param str path:
+    :return tuple[int, int, list[str], list[tuple]]: As from load_pickled_game()
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = numbered_lines(f)
+        num_players, my_player_number, my_hand = parse_setup(lines)
+        actions = ScriptReader(num_players, my_player_number).parse_batch(list(lines))
+    return num_players, my_player_number, my_hand, actions
+
+
+# How to read each kind of archived game, by file extension
+LOADERS = {
+    '.pkl': load_pickled_game,
+    '.jsonl': load_journal_game,
+    '.txt': load_script_game,
+}
+
+
+def find_games(directory):
+    """
+    :param str directory:
+    :return list[str]: Every archived game under the directory, in sorted order
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths += [os.path.join(root, name) for name in files if os.path.splitext(name)[1] in LOADERS]
+    return sorted(paths)
+
+
+def known_cards(eng):
+    """The mask of the cards whose holder the Engine knows, or that it knows to be Murder Cards"""
+    known = eng.accusation.mask
+    for player in eng.all_players:
+        known |= player.hand.mask
+    return known
+
+
+def analyze_game(path):
+    """
+    Replay an archived game through a fresh Engine, running the deductions after every Turn and UPDATE
+
+    :param str path:
+    :return dict: The game's summary
+    """
+    from clue_solver import Engine
+
+    summary = {'game': path}
+    try:
+        num_players, my_player_number, my_hand, actions = LOADERS[os.path.splitext(path)[1]](path)
+        eng = Engine(num_players, my_player_number, my_hand)
+    except Exception as e:
+        summary['error'] = f"{type(e).__name__}: {e}"
+        return summary
+
+    known = known_cards(eng)
+    card_known_on_turn = {card: 0 for card in mask_to_cards(known)}
+    ready_to_accuse_on_turn = None
+    contradiction = None
+    for action in actions:
+        turn_number = action[1]
+        try:
+            ingest(eng, [action])
+        except ValueError as e:
+            contradiction = {'turn': turn_number, 'error': str(e)}
+            break
+        newly_known = known_cards(eng) & ~known
+        if newly_known:
+            known |= newly_known
+            card_known_on_turn.update((card, turn_number) for card in mask_to_cards(newly_known))
+        if ready_to_accuse_on_turn is None and eng.ready_to_accuse():
+            ready_to_accuse_on_turn = turn_number
+
+    summary.update(
+        players=num_players,
+        turns=len(eng.turn_sequence) - 1,
+        card_known_on_turn=card_known_on_turn,
+        ready_to_accuse_on_turn=ready_to_accuse_on_turn,
+        contradiction=contradiction,
+    )
+    return summary
+
+
+def analyze_games(paths, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Analyze the archived games in a pool of worker processes
+
+    :param list[str] paths:
+    :param int processes:   Worker processes (default one per CPU)
+    :param int chunk_size:  Games handed to a worker process at a time
+    :return Iterator[dict]: Each game's summary, in the order of paths
+    """
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap(analyze_game, paths, chunksize=chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a directory of archived games and summarize each one")
+    parser.add_argument('directory', help="Where the archived games are saved (searched recursively)")
+    parser.add_argument('--output', default=SUMMARY_FILE, help="The summary file, one line of JSON per game")
+    parser.add_argument('--processes', type=int, help="Worker processes (default one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Games handed to a worker at a time")
+    args = parser.parse_args()
+
+    paths = find_games(args.directory)
+    start = time.perf_counter()
+    games = solved = contradictions = errors = 0
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for summary in analyze_games(paths, args.processes, args.chunk_size):
+            f.write(json.dumps(summary, separators=(',', ':')) + '\n')
+            games += 1
+            errors += 'error' in summary
+            solved += summary.get('ready_to_accuse_on_turn') is not None
+            contradictions += summary.get('contradiction') is not None
+    elapsed = time.perf_counter() - start
+    print(f"Analyzed {games} games in {elapsed:.2f}s ({games / elapsed if elapsed else 0:.1f} games/second) "
+          f"into {args.output}")
+    print(f"  Ready to accuse in {solved}, contradictions in {contradictions}, unreadable: {errors}")
+
+
+if __name__ == '__main__':
+    main()
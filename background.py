@@ -0,0 +1,211 @@
+"""
+The heavier analyses of the game, worked out in a background thread while the prompt waits for the user:
+    > the card probabilities (see probability.estimate_probabilities())
+    > whether any deal of the cards still agrees with the Engine's deductions (the probabilities are None if not)
+An analysis whose sample of deals came up empty (see probability.SamplingFailed) is shown, but not kept,
+    so the state is analyzed again the next time it's asked for.
+    > the ranking of the suggestions the user could make (see recommender.py)
+
+Each analysis works on a snapshot of what the Engine knows (a DealConstraints, which is plain integers and tuples),
+    so the Engine can carry on with the next Turn while it runs.
+The analyses are cached by that snapshot, so a pass, a Turn that teaches nothing, or an UNDO back to an earlier state
+    shows its analysis at once. Asking for the analysis of a new state cancels the work on the ones before it:
+    those still waiting don't start, and the one running gives up, even partway through listing or sampling deals.
+
+    >>> analyst = Analyst()
+    >>> analyst.request(eng)                    # Returns at once
+    >>> analyst.latest(eng, timeout=0.1)        # The analysis of the Engine's state if it's ready by then,
+                                                #   otherwise the most recent one finished, if any
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from defs import NOBODY, Turn
+from probability import DealConstraints, DealProbabilities, SamplingFailed, estimate_probabilities
+
+# How long to wait for the analysis of the state being drawn, before drawing the most recent one finished instead
+ANALYSIS_WAIT = 0.1
+# The most analyses to keep
+CACHE_SIZE = 64
+# Off the critical path, the probabilities can be worked out more thoroughly than before each prompt (see clue_solver.py):
+#   the most partial deals to list, and the most seconds to spend sampling deals when there are too many
+ANALYSIS_MAX_STEPS = 100000
+ANALYSIS_TIME_BUDGET = 2.0
+
+
+class Analysis(object):
+    """The heavier analyses of one state of the game"""
+    def __init__(self, key, turn_number, probabilities=None, suggestions=None):
+        """
+        :param tuple key:                       As from analysis_key()
+        :param int turn_number:                 The last Turn entered when the state was snapshotted
+        :param DealProbabilities probabilities: None if no deal of the cards agrees with the Engine's deductions,
+                                                SamplingFailed if none of the deals sampled did
+        :param list[tuple[float, tuple]] suggestions:       As from recommender.rank_suggestions(),
+                                                            None if they weren't ranked
+        """
+        self.key = key
+        self.turn_number = turn_number
+        self.probabilities = probabilities
+        self.suggestions = suggestions
+
+
+def snapshot(eng):
+    """
+    :param Engine eng:
+    :return tuple[DealConstraints, list[int], tuple]: What the Engine knows, the order in which the other Players
+                                                        would respond to the user's suggestions, and the state's key
+    """
+    constraints = DealConstraints.from_engine(eng)
+    responders = [player.number
+                  for player in eng.get_non_revealing_responders(Turn(suggester=eng.my_player, revealer=NOBODY))]
+    return constraints, responders, analysis_key(constraints, responders)
+
+
+def analysis_key(constraints: DealConstraints, responders):
+    """
+    :param DealConstraints constraints:
+    :param list[int] responders:    The order in which the other Players would respond to the user's suggestions
+    :return tuple: The same for any two states that the analyses can't tell apart,
+                    e.g. before and after a Turn that teaches nothing
+    """
+    return (constraints.numbers, constraints.hands, constraints.candidates, constraints.hand_sizes,
+            constraints.accusation, frozenset(constraints.turn_constraints), tuple(responders))
+
+
+def analyze(constraints: DealConstraints, responders, key, turn_number, cancelled, **budget):
+    """
+    Run the analyses of one state of the game, giving up once cancelled
+
+    :param DealConstraints constraints:
+    :param list[int] responders:        As for analysis_key()
+    :param tuple key:                   As from analysis_key()
+    :param int turn_number:
+    :param threading.Event cancelled:
+    :param budget:                      Passed on to probability.estimate_probabilities()
+    :return Analysis|None: None if cancelled before the probabilities were worked out
+    """
+    if cancelled.is_set():
+        return None
+    try:
+        probabilities = estimate_probabilities(constraints, should_stop=cancelled.is_set, **budget)
+    except SamplingFailed as e:
+        probabilities = e
+    if cancelled.is_set():
+        # Given up partway, or finished too late to be wanted: either way, not to be taken for the state's analysis
+        return None
+    analysis = Analysis(key, turn_number, probabilities)
+    if isinstance(analysis.probabilities, DealProbabilities):
+        from recommender import rank_suggestions
+
+        analysis.suggestions = rank_suggestions(analysis.probabilities, responders)
+    return analysis
+
+
+class Analyst(object):
+    """Runs the analyses in a background thread, one at a time, and keeps the results"""
+    def __init__(self, wait=ANALYSIS_WAIT, cache_size=CACHE_SIZE, max_steps=ANALYSIS_MAX_STEPS,
+                 time_budget=ANALYSIS_TIME_BUDGET):
+        """
+        :param float wait:          Default seconds that latest() waits for the analysis of the Engine's state
+        :param int cache_size:      The most analyses to keep
+        :param int max_steps:       As for probability.estimate_probabilities()
+        :param float time_budget:   As for probability.estimate_probabilities()
+        """
+        self.wait = wait
+        self.cache_size = cache_size
+        self.budget = dict(max_steps=max_steps, time_budget=time_budget)
+        self._cache: OrderedDict[tuple, Analysis] = OrderedDict()
+        self._latest: Analysis | None = None
+        self._lock = threading.Lock()
+        # The analyses asked for and not finished yet: key -> (future, cancellation flag)
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analyst')
+
+    def request(self, eng):
+        """
+        Start analyzing the Engine's current state in the background, unless it's analyzed already,
+            and cancel the analyses of every other state still under way
+
+        :param Engine eng:
+        :return tuple: The state's key, as from analysis_key()
+        """
+        constraints, responders, key = snapshot(eng)
+        with self._lock:
+            stale = [self._pending.pop(pending_key) for pending_key in list(self._pending) if pending_key != key]
+            start = key not in self._cache and key not in self._pending
+            if start:
+                cancelled = threading.Event()
+                future = self._executor.submit(analyze, constraints, responders, key, len(eng.turn_sequence) - 1,
+                                               cancelled, **self.budget)
+                self._pending[key] = (future, cancelled)
+        # Outside the lock, since cancelling a future runs its callback on the spot
+        for stale_future, stale_cancelled in stale:
+            stale_cancelled.set()
+            stale_future.cancel()
+        if start:
+            future.add_done_callback(lambda done: self._finished(key, done))
+        return key
+
+    def _finished(self, key, future):
+        analysis = None if future.cancelled() else future.result()
+        with self._lock:
+            if self._pending.get(key, (None,))[0] is future:
+                del self._pending[key]
+            if analysis is None:
+                return
+            self._latest = analysis
+            if isinstance(analysis.probabilities, SamplingFailed):
+                return
+            self._cache[key] = analysis
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, key):
+        """
+        :param tuple key:   As from request()
+        :return Analysis|None: The state's analysis, if it's finished
+        """
+        with self._lock:
+            analysis = self._cache.get(key)
+            if analysis is not None:
+                self._cache.move_to_end(key)
+            return analysis
+
+    def latest(self, eng, timeout=None):
+        """
+        Ask for the analysis of the Engine's current state, and wait a little for it
+
+        :param Engine eng:
+        :param float timeout:   Seconds to wait for it (default self.wait)
+        :return Analysis|None: The analysis of the current state if it's finished in time,
+                                otherwise the most recent analysis finished, if any
+        """
+        key = self.request(eng)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            future = pending[0]
+            if wait([future], timeout=self.wait if timeout is None else timeout).done:
+                # Don't count on the callback having run yet
+                self._finished(key, future)
+        with self._lock:
+            return self._cache.get(key) or self._latest
+
+    def is_current(self, analysis, eng):
+        """
+        :param Analysis analysis:
+        :param Engine eng:
+        :return bool: Whether the analysis is of the Engine's current state
+        """
+        return analysis.key == snapshot(eng)[2]
+
+    def close(self):
+        """Cancel whatever is under way, without waiting for it"""
+        with self._lock:
+            for future, cancelled in self._pending.values():
+                cancelled.set()
+            self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,340 @@
+"""
+Benchmarks for the Clue Solver Engine's deduction logic.
+
+The replay benchmarks feed a recorded game through the Engine (without the interactive prompts)
+    and time the deductive work done on its Turn sequence.
+The micro-benchmarks time the Engine's hot paths one at a time, on the Engine's state early,
+    midway through and late in a recorded game.
+
+Results can be saved as JSON, and compared against a saved baseline to catch regressions:
+
+    >>> python3 bench_clue_solver.py --output baseline.json
+    >>> python3 bench_clue_solver.py --baseline baseline.json
+"""
+import argparse
+import copy
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+from defs import CATEGORIES, Turn
+from clue_solver import Engine, color_cards
+from display import BoardRenderer
+
+"""
+Recorded games, written with the same grammar the Engine prompts for.
+A Turn is either 'pass' or 'card,card,card,revealer_num'.
+When the user was the Suggester and was shown a card, that card follows a colon, e.g. 'plum,rope,hall,3:rope'
+"""
+RECORDED_GAMES = {
+    'four_player_40_turns': dict(
+        num_players=4, my_player_number=1,
+        my_hand=['candlestick', 'lounge', 'ballroom', 'white', 'scarlet'],
+        turns=[
+            'pass', 'plum,revolver,billiard,3', 'pass', 'mustard,pipe,hall,0', 'mustard,rope,hall,3:rope',
+            'pass', 'plum,wrench,lounge,4', 'mustard,pipe,library,3', 'scarlet,knife,library,3:library',
+            'plum,revolver,kitchen,0', 'pass', 'scarlet,wrench,library,1', 'white,rope,ballroom,3:rope',
+            'peacock,pipe,library,3', 'pass', 'mustard,knife,dining,3',
+            'mustard,candlestick,library,3:library', 'peacock,candlestick,lounge,1',
+            'peacock,revolver,library,2', 'green,wrench,billiard,2', 'mustard,rope,library,3:rope',
+            'peacock,pipe,kitchen,0', 'scarlet,rope,conservatory,1', 'peacock,pipe,study,0',
+            'peacock,revolver,study,2:revolver', 'scarlet,pipe,conservatory,1', 'plum,revolver,kitchen,2',
+            'mustard,pipe,hall,0', 'plum,candlestick,ballroom,2:plum', 'peacock,pipe,ballroom,1',
+            'green,knife,study,4', 'white,candlestick,study,1', 'plum,candlestick,conservatory,2:plum',
+            'white,rope,billiard,3', 'peacock,knife,billiard,4', 'mustard,candlestick,conservatory,1',
+            'mustard,wrench,library,3:library', 'pass', 'scarlet,candlestick,library,1', 'pass',
+        ],
+    ),
+    'six_player_60_turns': dict(
+        num_players=6, my_player_number=3,
+        my_hand=['rope', 'ballroom', 'peacock'],
+        turns=[
+            'scarlet,candlestick,conservatory,2', 'white,rope,billiard,3', 'mustard,rope,library,1:mustard',
+            'plum,knife,kitchen,6', 'green,rope,library,1', 'mustard,rope,hall,1', 'mustard,wrench,billiard,5',
+            'white,candlestick,lounge,4', 'white,revolver,billiard,4:white', 'white,candlestick,study,5',
+            'mustard,revolver,kitchen,6', 'peacock,wrench,billiard,3', 'white,pipe,kitchen,4', 'pass',
+            'scarlet,pipe,ballroom,4:pipe', 'plum,revolver,conservatory,2', 'white,candlestick,study,1',
+            'pass', 'mustard,wrench,billiard,5', 'mustard,revolver,lounge,4', 'plum,candlestick,hall,6:hall',
+            'peacock,wrench,study,5', 'pass', 'green,pipe,billiard,1', 'scarlet,pipe,library,4',
+            'plum,revolver,conservatory,4', 'mustard,pipe,kitchen,4:pipe', 'mustard,pipe,study,5',
+            'scarlet,rope,lounge,3', 'pass', 'plum,revolver,study,2', 'mustard,candlestick,hall,6',
+            'white,pipe,kitchen,4:pipe', 'mustard,knife,lounge,5', 'plum,revolver,billiard,2',
+            'scarlet,pipe,billiard,4', 'peacock,knife,conservatory,2', 'scarlet,wrench,ballroom,3',
+            'white,candlestick,dining,4:white', 'white,knife,lounge,5', 'pass', 'plum,rope,lounge,2',
+            'green,rope,conservatory,2', 'green,candlestick,lounge,5', 'white,candlestick,billiard,4:white',
+            'white,knife,lounge,5', 'pass', 'pass', 'scarlet,revolver,dining,2', 'green,knife,library,1',
+            'mustard,rope,ballroom,1:mustard', 'white,candlestick,billiard,5', 'white,candlestick,library,1',
+            'peacock,wrench,conservatory,2', 'peacock,revolver,library,3', 'peacock,candlestick,hall,3',
+            'plum,pipe,study,4:pipe', 'peacock,pipe,conservatory,2', 'white,revolver,lounge,4',
+            'white,candlestick,library,1',
+        ],
+    ),
+    'three_player_20_turns': dict(
+        num_players=3, my_player_number=2,
+        my_hand=['hall', 'study', 'mustard', 'white', 'revolver', 'lounge'],
+        turns=[
+            'plum,knife,study,2', 'white,pipe,billiard,3:billiard', 'peacock,candlestick,study,1',
+            'mustard,candlestick,conservatory,2', 'pass', 'pass', 'green,candlestick,hall,2',
+            'scarlet,knife,dining,1:dining', 'peacock,revolver,billiard,1', 'green,revolver,conservatory,2',
+            'mustard,knife,lounge,0', 'plum,revolver,hall,2', 'pass', 'green,candlestick,lounge,3:green',
+            'scarlet,pipe,billiard,1', 'scarlet,rope,billiard,3', 'mustard,wrench,ballroom,1:wrench',
+            'white,wrench,billiard,1', 'pass', 'plum,candlestick,hall,1:candlestick',
+        ],
+    ),
+}
+
+
+def parse_turn(eng: Engine, turn_number: int, line: str):
+    """
+    Build a Turn from a line of a recorded game
+
+    :param Engine eng:
+    :param int turn_number:
+    :param str line:
+    :return Turn:
+    """
+    if line == 'pass':
+        return Turn(number=turn_number, is_pass=True)
+
+    line, _, revealed_card = line.partition(':')
+    suggestion, revealer_num = line.rsplit(',', maxsplit=1)
+    suggester_num = (turn_number % eng.num_players) or eng.num_players
+    turn = Turn(
+        number=turn_number,
+        suggestion=suggestion.split(','),
+        suggester=eng.get_player(suggester_num),
+        revealer=eng.get_player(max(int(revealer_num), 0)),
+    )
+    if revealed_card:
+        turn.revealed_card = revealed_card
+    return turn
+
+
+def replay(game: dict, process_each_turn=True):
+    """
+    Feed a recorded game into a fresh Engine, the way Engine.run() would
+
+    :param dict game:               One of RECORDED_GAMES
+    :param bool process_each_turn:  Run the deductions after every Turn, rather than once at the end
+    :return Engine:
+    """
+    eng = Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+    for line in game['turns']:
+        turn = parse_turn(eng, len(eng.turn_sequence), line)
+        eng.one_time_turn_deductions(turn)
+        eng.turn_sequence.append(turn)
+        if process_each_turn and not turn.is_pass:
+            eng.process_turns_for_info()
+    if not process_each_turn:
+        eng.process_turns_for_info()
+    return eng
+
+
+def feed(game: dict, num_turns=None):
+    """
+    Feed the first num_turns Turns of a recorded game into a fresh Engine, making only the one-time deductions
+
+    :param dict game:       One of RECORDED_GAMES
+    :param int num_turns:   How many Turns to feed (default all of them)
+    :return Engine:
+    """
+    eng = Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+    for line in game['turns'][:num_turns]:
+        turn = parse_turn(eng, len(eng.turn_sequence), line)
+        eng.one_time_turn_deductions(turn)
+        eng.turn_sequence.append(turn)
+    return eng
+
+
+def time_it(func, repeat: int, setup=None):
+    """
+    Return the timings of repeated func() calls, in milliseconds
+
+    :param func:
+    :param int repeat:
+    :param setup:   Called (untimed) before each call, and its result passed to func
+    """
+    timings = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+"""
+Game states for the micro-benchmarks: (recorded game, number of Turns played)
+"""
+STAGES = {
+    'early': ('six_player_60_turns', 10),
+    'mid': ('six_player_60_turns', 30),
+    'late': ('six_player_60_turns', 60),
+}
+
+# Calls per timing of the benchmarks that are too quick to time one call at a time
+INNER_LOOPS = 100
+
+
+def _unprocessed_turns(eng: Engine):
+    return [turn for turn in eng.turn_sequence
+            if not turn.is_pass and not turn.totally_processed and turn.revealer.number]
+
+
+def _get_card_sets(eng: Engine):
+    for _ in range(INNER_LOOPS):
+        for player in eng.all_players:
+            player.hand, player.possibles
+
+
+def _set_card_sets(values):
+    for _ in range(INNER_LOOPS):
+        for player, hand, possibles in values:
+            player.hand = hand
+            player.possibles = possibles
+
+
+def _color_cards(eng: Engine):
+    for _ in range(INNER_LOOPS):
+        for player in eng.all_players:
+            color_cards(player.hand)
+            color_cards(player.possibles)
+
+
+def _render_board(args):
+    renderer, eng, probabilities = args
+    for _ in range(INNER_LOOPS):
+        renderer.render(eng, probabilities)
+
+
+def _process_revealed_turns(eng: Engine):
+    for turn in _unprocessed_turns(eng):
+        eng.process_revealed_turn(turn)
+
+
+def micro_benchmarks(stage: str):
+    """
+    The micro-benchmarks for one stage of a recorded game
+
+    :param str stage:   One of STAGES
+    :return dict: benchmark name -> (func, setup), as taken by time_it().
+                  The ClueCardSet, color_cards and BoardRenderer benchmarks time INNER_LOOPS passes.
+    """
+    name, num_turns = STAGES[stage]
+    game = RECORDED_GAMES[name]
+    # The Engine as Engine.run() leaves it after the Turn, and just before the Turn's deductions are run
+    processed = replay(dict(game, turns=game['turns'][:num_turns]))
+    unprocessed = feed(game, num_turns)
+    # The Engine with every Turn but the last processed, and the last Turn just entered
+    last_turn = replay(dict(game, turns=game['turns'][:num_turns - 1]))
+    turn = parse_turn(last_turn, len(last_turn.turn_sequence), game['turns'][num_turns - 1])
+    last_turn.one_time_turn_deductions(turn)
+    last_turn.turn_sequence.append(turn)
+
+    def fresh(eng):
+        return lambda: copy.deepcopy(eng)
+
+    def unchanged(eng):
+        return lambda: eng
+
+    def card_sets(eng):
+        return lambda: [(player, player.hand.copy(), player.possibles.copy()) for player in eng.all_players]
+
+    # The board as drawn on the next Turn, when the deductions changed nothing on it
+    probabilities = processed.estimate_probabilities(time_budget=0.05)
+
+    def drawn_board():
+        renderer = BoardRenderer(out=io.StringIO(), ansi=True, rows=200)
+        renderer.render(processed, probabilities)
+        return renderer, processed, probabilities
+
+    return {
+        'ClueCardSet.__get__': (_get_card_sets, unchanged(processed)),
+        'ClueCardSet.__set__': (_set_card_sets, card_sets(processed)),
+        'remove_set_from_possibles': (
+            lambda eng: eng.remove_set_from_possibles(eng.other_players, set(CATEGORIES[-1].__members__)),
+            fresh(processed)),
+        'process_revealed_turn': (_process_revealed_turns, fresh(unprocessed)),
+        'deduce_murder_cards': (lambda eng: eng.deduce_murder_cards(), fresh(unprocessed)),
+        'check_players_hand_size': (lambda eng: eng.check_players_hand_size(), fresh(unprocessed)),
+        'color_cards': (_color_cards, unchanged(processed)),
+        'BoardRenderer.render': (_render_board, drawn_board),
+        'process_turns_for_info (last Turn)': (lambda eng: eng.process_turns_for_info(), fresh(last_turn)),
+        'process_turns_for_info (all Turns)': (lambda eng: eng.process_turns_for_info(), fresh(unprocessed)),
+    }
+
+
+def run_benchmarks(repeat=200):
+    """
+    Run every benchmark, printing a table of timings as they finish
+
+    :return dict: benchmark name -> {'min_ms': ..., 'median_ms': ...}
+    """
+    results = {}
+
+    def record(name, timings):
+        results[name] = {'min_ms': min(timings), 'median_ms': statistics.median(timings)}
+        print(f"{name:<56}{min(timings):>10.4f}{statistics.median(timings):>12.4f}")
+
+    print(f"{'benchmark':<56}{'min ms':>10}{'median ms':>12}")
+    for name, game in RECORDED_GAMES.items():
+        for mode, process_each_turn in (('per-turn', True), ('batch', False)):
+            record(f"replay/{name}/{mode}", time_it(lambda: replay(game, process_each_turn), repeat))
+    for stage in STAGES:
+        for name, (func, setup) in micro_benchmarks(stage).items():
+            record(f"{stage}/{name}", time_it(func, repeat, setup))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold=0.2):
+    """
+    Flag the benchmarks whose fastest timing got slower than the baseline's by more than threshold (a fraction).
+    The fastest timing is the least affected by noise from the rest of the machine.
+
+    :param dict results:    As returned by run_benchmarks()
+    :param dict baseline:   As returned by run_benchmarks(), from an earlier run
+    :param float threshold:
+    :return list[str]: The names of the regressed benchmarks
+    """
+    regressions = []
+    print(f"\n{'benchmark':<56}{'baseline ms':>12}{'now ms':>10}{'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]['min_ms'], result['min_ms']
+        change = now / before - 1 if before else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<56}{before:>12.4f}{now:>10.4f}{change:>+9.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Clue Solver Engine's deduction logic")
+    parser.add_argument('--repeat', type=int, default=200, help="Timings taken of each benchmark")
+    parser.add_argument('--output', help="Save the results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare the results to those saved in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown of a benchmark's fastest timing (as a fraction) counted as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'repeat': args.repeat, 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
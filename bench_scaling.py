@@ -0,0 +1,137 @@
+"""
+How the Engine's per-Turn propagation time scales with the size of the deck and the number of Players.
+
+Each deck is generated (with the same number of cards in each of its categories, give or take one),
+    and each (deck, Players) configuration is simulated with simulator.py in a process of its own,
+    since the deck in play is fixed once defs is imported (see defs.load_deck()).
+
+    >>> python3 bench_scaling.py --cards 21 30 45 60 --players 3 6 10 --games 50
+"""
+import argparse
+import json
+import os
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+
+DECK_SIZES = (21, 30, 45, 60)
+PLAYER_COUNTS = (3, 6, 10)
+CATEGORY_NAMES = ('Suspect', 'Weapon', 'Room', 'Motive', 'Time', 'Place')
+
+
+def card_name(prefix, index):
+    """A single lower-case word naming a generated card, e.g. 'suspectab'"""
+    letters = string.ascii_lowercase
+    return prefix + letters[index // len(letters)] + letters[index % len(letters)]
+
+
+def scaled_deck(num_cards, num_categories=3, max_players=max(PLAYER_COUNTS)):
+    """
+    A deck config of num_cards cards, as read by defs.load_deck()
+
+    :param int num_cards:
+    :param int num_categories:
+    :param int max_players:     Capped at the number of cards dealt to the Players
+    :return dict:
+    """
+    if not 1 <= num_categories <= len(CATEGORY_NAMES):
+        raise ValueError(f"num_categories must be 1 to {len(CATEGORY_NAMES)}, not {num_categories}")
+    categories = {}
+    for i, name in enumerate(CATEGORY_NAMES[:num_categories]):
+        size = num_cards // num_categories + (1 if i < num_cards % num_categories else 0)
+        categories[name] = [card_name(name.lower(), index) for index in range(size)]
+    return {'categories': categories, 'max_players': min(max_players, num_cards - num_categories)}
+
+
+def measure(num_players, num_games=50, seed=0):
+    """
+    Simulate games with the deck in play, and summarize the time spent propagating each Turn
+
+    :return dict:
+    """
+    from defs import NUM_CARDS
+    from simulator import percentile, simulate_game
+
+    results = [simulate_game(seed + i, num_players=num_players) for i in range(num_games)]
+    latencies = sorted(t for result in results for t in result.propagation_times)
+    turns_to_accuse = [result.turns_to_accuse for result in results if result.turns_to_accuse is not None]
+    return {
+        'cards': NUM_CARDS,
+        'players': num_players,
+        'games': num_games,
+        'games_solved': len(turns_to_accuse),
+        'turns_to_accuse_mean': statistics.mean(turns_to_accuse) if turns_to_accuse else None,
+        'propagations': len(latencies),
+        'propagation_ms_p50': percentile(latencies, 0.50) * 1000,
+        'propagation_ms_p99': percentile(latencies, 0.99) * 1000,
+        'propagation_ms_mean': statistics.mean(latencies) * 1000,
+    }
+
+
+def measure_deck(deck, num_players, num_games=50, seed=0):
+    """
+    Run measure() in a new process with the deck in play
+
+    :param dict deck:   As from scaled_deck()
+    :return dict:
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(deck, f)
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure',
+             '--players', str(num_players), '--games', str(num_games), '--seed', str(seed)],
+            env=dict(os.environ, CLUE_DECK=f.name), capture_output=True, text=True, check=True,
+        ).stdout
+    finally:
+        os.remove(f.name)
+    return json.loads(output)
+
+
+def run_scaling(deck_sizes=DECK_SIZES, player_counts=PLAYER_COUNTS, num_games=50, seed=0, num_categories=3):
+    """
+    Measure every (deck size, Players) configuration, printing a table as they finish
+
+    :return list[dict]: As from measure(), one per configuration
+    """
+    print(f"{'cards':>6}{'players':>9}{'solved':>8}{'turns':>8}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}")
+    reports = []
+    for num_cards in deck_sizes:
+        deck = scaled_deck(num_cards, num_categories)
+        for num_players in player_counts:
+            if num_players > deck['max_players']:
+                continue
+            report = measure_deck(deck, num_players, num_games, seed)
+            reports.append(report)
+            turns = '-' if report['turns_to_accuse_mean'] is None else f"{report['turns_to_accuse_mean']:.1f}"
+            print(f"{num_cards:>6}{num_players:>9}{report['games_solved']:>8}{turns:>8}"
+                  f"{report['propagation_ms_p50']:>9.3f}{report['propagation_ms_p99']:>9.3f}"
+                  f"{report['propagation_ms_mean']:>9.3f}", flush=True)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark propagation time against deck size and player count")
+    parser.add_argument('--cards', type=int, nargs='+', default=DECK_SIZES, help="Deck sizes to measure")
+    parser.add_argument('--players', type=int, nargs='+', default=PLAYER_COUNTS, help="Player counts to measure")
+    parser.add_argument('--categories', type=int, default=3, help="Card categories in each deck")
+    parser.add_argument('--games', type=int, default=50, help="Games simulated per configuration")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first game of each configuration")
+    parser.add_argument('--output', help="Save the results as JSON to this file")
+    # Measure the deck in play (CLUE_DECK) in this process, writing the result as JSON: used by measure_deck()
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.players[0], args.games, args.seed)))
+        return
+    reports = run_scaling(args.cards, args.players, args.games, args.seed, args.categories)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
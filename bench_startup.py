@@ -0,0 +1,128 @@
+"""
+Benchmark of how long the tool takes to start: the time from launching it to its first prompt.
+
+    > clue_solver.py:   until it asks for the number of Players
+    > rerun.py:         until it has replayed a recorded game's journal and asks for the next Turn
+
+Each launch is a fresh Python process, timed until the prompt appears on its output.
+Results can be saved as JSON, and compared against a saved baseline to catch regressions (see bench_clue_solver.py):
+
+    >>> python3 bench_startup.py --output startup.json
+    >>> python3 bench_startup.py --baseline startup.json --threshold 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_clue_solver import RECORDED_GAMES, compare, feed
+from journal import GameJournal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Launching Python itself, which no change to the tool can speed up, so it's never counted as a regression
+INTERPRETER = 'python'
+SETUP_PROMPT = b"Enter Number of Players"
+TURN_PROMPT = b"Enter Turn Details"
+
+
+def time_to_prompt(args, prompt, cwd, timeout=30.0):
+    """
+    Launch a Python script and time how long it takes to show the prompt
+
+    :param list[str] args:  The script and its arguments
+    :param bytes prompt:
+    :param str cwd:         Where to run it, so any files it writes are kept out of the way
+    :param float timeout:   Give up after this many seconds
+    :return float: Milliseconds
+    """
+    env = dict(os.environ, PYTHONPATH=HERE, NO_COLOR='1')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=cwd, env=env,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        output = b''
+        while prompt not in output:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                raise RuntimeError(f"{' '.join(args)} exited without showing '{prompt.decode()}'")
+            output += chunk
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{' '.join(args)} didn't show '{prompt.decode()}' within {timeout}s")
+        return (time.perf_counter() - start) * 1000
+    finally:
+        process.kill()
+        process.communicate()
+
+
+def write_journal(path, game):
+    """Record a game to a journal, for rerun.py to pick up"""
+    eng = feed(game)
+    journal = GameJournal(path)
+    journal.record_setup(eng.num_players, eng.my_player_number, eng.my_hand)
+    for turn in eng.turn_sequence[1:]:
+        journal.record_turn(turn)
+    journal.close()
+
+
+def run_benchmarks(repeat=10):
+    """
+    Time every launch, printing a table of timings as they finish
+
+    :return dict: benchmark name -> {'min_ms': ..., 'median_ms': ...}
+    """
+    results = {}
+
+    def record(name, timings):
+        results[name] = {'min_ms': min(timings), 'median_ms': statistics.median(timings)}
+        print(f"{name:<40}{min(timings):>10.1f}{statistics.median(timings):>12.1f}")
+
+    print(f"{'benchmark':<40}{'min ms':>10}{'median ms':>12}")
+    with tempfile.TemporaryDirectory() as cwd:
+        record(INTERPRETER, [time_to_prompt(['-c', f"print({SETUP_PROMPT!r})"], SETUP_PROMPT, cwd)
+                             for _ in range(repeat)])
+        record('clue_solver.py', [time_to_prompt([os.path.join(HERE, 'clue_solver.py')], SETUP_PROMPT, cwd)
+                                  for _ in range(repeat)])
+
+        for name, game in RECORDED_GAMES.items():
+            path = os.path.join(cwd, f"{name}.jsonl")
+            write_journal(path, game)
+            timings = []
+            for _ in range(repeat):
+                # rerun.py appends to the journal it picks up, so each launch gets a fresh copy
+                shutil.copy(path, path + '.run')
+                timings.append(time_to_prompt([os.path.join(HERE, 'rerun.py'), path + '.run'], TURN_PROMPT, cwd))
+            record(f"rerun.py/{name}", timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the time from launching the tool to its first prompt")
+    parser.add_argument('--repeat', type=int, default=10, help="Launches timed of each benchmark")
+    parser.add_argument('--output', help="Save the results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare the results to those saved in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown of a launch's fastest timing (as a fraction) counted as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'repeat': args.repeat, 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        results.pop(INTERPRETER)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} launch(es) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
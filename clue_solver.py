@@ -1,13 +1,75 @@
 """
 The main module that houses the Clue Solver 'Engine', which holds all deductive and Turn processing logic.
 """
-import os
-import atexit
-import dill
-import time
+import argparse
+import sys
+from collections import deque
+
+from defs import (CardSet, ClueCardSet, Turn, Player, CATEGORIES, NUM_CARDS, ALL_CARDS, NOBODY,
+                  COLORS, CARD_TO_CATEGORY, SORT_ORDER, CARD_ORDER, CATEGORY_MASKS, cards_to_mask,
+                  mask_to_bits)
+from display import BoardRenderer, color_mask, colorize, supports_ansi, use_ansi
+from game_script import ScriptContradiction, ScriptError, run_script
+from hypotheses import forced_facts, what_if
+from instrumentation import DeductionProfiler
+from journal import GameJournal, JOURNAL_FILE
+from probability import DealConstraints, DealProbabilities, SamplingFailed, estimate_probabilities
+from perspectives import Perspectives
+from provenance import Provenance, find_conflict
+
+"""
+recommender.py (which needs numpy) and sampler.py (which needs multiprocessing) are imported
+    where they're first used instead, since importing them takes longer than everything else up to the first prompt.
+"""
+
+# The most partial deals to work through when showing card probabilities on each Turn
+PROBABILITY_MAX_STEPS = 10000
+# The most seconds to spend sampling deals when there are too many to work through
+SAMPLE_TIME_BUDGET = 0.5
+
+
+class EngineSnapshot(object):
+    """
+    The Engine's deductions at one moment of the game, so the Engine can be wound back to it.
+    Only the Turns that later deductions could still change are recorded, along with every Player's
+        HAND and POSSIBLES, so a snapshot costs about as much as the deductions one Turn makes.
+    Nothing that grows with the game is copied: UPDATEs and Turns are only ever added at the end, so
+        their counts are enough, and the worklist's Turn indexes are rebuilt from the Turns on restore().
+    """
+    def __init__(self, eng, turns):
+        """
+        :param Engine eng:
+        :param list[Turn] turns:    The Turns whose state to record
+        """
+        self.num_turns = len(eng.turn_sequence)
+        self.player_masks = [(player.hand.mask, player.possibles.mask) for player in eng.all_players]
+        self.accusation = eng.accusation.mask
+        self.num_updates = len(eng.updates)
+        self.turn_states = [(turn, turn.possible_reveals.mask, turn.revealed_card, turn.totally_processed)
+                            for turn in turns]
+        # The worklist bookkeeping of process_turns_for_info()
+        self.last_seen_masks = list(eng._last_seen_masks)
+        self.num_turns_scheduled = eng._num_turns_scheduled
+
+    def restore(self, eng):
+        """
+        Put the Engine back the way it was when the snapshot was taken.
+        The Turns and UPDATEs made since must already be cut back to, or put back up to, the ones of the snapshot.
+        """
+        del eng.turn_sequence[self.num_turns:]
+        del eng.updates[self.num_updates:]
+        for player, (hand, possibles) in zip(eng.all_players, self.player_masks):
+            player.hand = hand
+            player.possibles = possibles
+        eng.accusation = self.accusation
+        for turn, possible_reveals, revealed_card, totally_processed in self.turn_states:
+            turn.possible_reveals = possible_reveals
+            turn.revealed_card = revealed_card
+            turn.totally_processed = totally_processed
+        eng._last_seen_masks = list(self.last_seen_masks)
+        eng._num_turns_scheduled = self.num_turns_scheduled
+        eng._reindex_turns()
 
-from defs import (ClueCardSet, Turn, Player, CATEGORIES, NUM_CARDS, ALL_CARDS, NOBODY,
-                  COLORS, COLORMAP, CARD_TO_CATEGORY, SORT_ORDER)
 
 class Engine(object):
     """
@@ -29,7 +91,6 @@ class Engine(object):
         # Initialize turn list with blank turn
         self.turn_sequence: list[Turn] = [Turn(number=0, is_pass=True)]
         self.my_hand: list[str] = my_hand
-        self.accusation_dict = {}
 
         # Initialize player list with No-Op player
         self._player_list: list[Player] = [NOBODY]
@@ -41,6 +102,40 @@ class Engine(object):
 
         self.setup_players()
 
+        # Where accepted Turns and UPDATEs are recorded as they happen, if anywhere
+        self.journal: GameJournal | None = None
+        # Every UPDATE applied, as (Turn number, Player number, 'has' or 'lacks', card)
+        self.updates: list[tuple[int, int, str, str]] = []
+        # Why the Engine knows what it knows, brought up to date when asked (see provenance.py)
+        self.provenance: Provenance | None = None
+        # What each rival can have deduced, if it's being estimated (see perspectives.py)
+        self.perspectives: Perspectives | None = None
+        # Draws the board on the terminal each Turn of run()
+        self.renderer = BoardRenderer()
+        # Works out the probabilities and suggestions in the background while the prompt waits, if set (see background.py)
+        self.analyst = None
+        # The analysis on the board, when there's an analyst
+        self.analysis = None
+        # Messages to show under the next board drawn, e.g. why a Turn was undone, since drawing it clears the screen
+        self.notices: list[str] = []
+
+        # (description, EngineSnapshot) from just before each Turn and UPDATE, for UNDO
+        self.history: list[tuple[str, EngineSnapshot]] = []
+        # What each UNDO took back, for REDO: (undone history, EngineSnapshot, undone Turns, undone UPDATEs)
+        self._redo_stack: list[tuple[list, EngineSnapshot, list[Turn], list]] = []
+
+        # Bookkeeping for the worklist in process_turns_for_info():
+        #   the (HAND, POSSIBLES) masks of each Player as of the last deduction pass,
+        #   the unprocessed Turns each Player revealed a card in,
+        #   the unprocessed Turns that might have revealed each card (by index into CARD_ORDER, in Turn order),
+        #   and how many Turns of self.turn_sequence have been scheduled so far
+        self._last_seen_masks: list[tuple[int, int]] = [(0, 0)] * len(self._player_list)
+        self._turns_by_revealer: list[list[Turn]] = [[] for _ in self._player_list]
+        self._turns_by_card: list[dict[Turn, None]] = [{} for _ in CARD_ORDER]
+        self._num_turns_scheduled = 0
+        # How many rounds the last deduction pass took to settle (see instrumentation.py)
+        self.last_deduction_rounds = 0
+
     def setup_players(self):
         """
         Generate Player instances for the game, including self.my_player (YOU, the user)
@@ -48,7 +143,8 @@ class Engine(object):
         Determine how many cards each Player ought to have been dealt,
             since not all Players may get the same number of cards
         """
-        num_active_cards = NUM_CARDS - 3
+        # One card of each category is a Murder Card, and the rest are dealt
+        num_active_cards = NUM_CARDS - len(CATEGORIES)
         # Not all players may get the same number of cards
         min_cards_per_player = num_active_cards // self.num_players
         # leftover_cards are distributed to the first Players in game rotation
@@ -84,12 +180,11 @@ class Engine(object):
             suggester_num = (turn_number % self.num_players) or self.num_players
             suggester = self.get_player(suggester_num)
 
-            # Log game details, including Players' hands, to the console
-            print_separator_line()
-            self.print_player_hands(turn_number)
-
-            # Log to the user past Turn info, so the user can make an informed suggestion on their turn
-            self.offer_turn_intel()
+            # Log game details to the console: Players' hands, and past Turn info,
+            #   so the user can make an informed suggestion on their turn
+            if self.perspectives:
+                self.perspectives.update(self)
+            self.render_board(suggestions=suggester.is_me)
 
             # Enter Turn information to the Engine
             if self.take_turn(turn_number, suggester):
@@ -98,7 +193,11 @@ class Engine(object):
                     1. Who has what
                     2. What was revealed during each Turn
                 """
-                self.process_turns_for_info()
+                self.settle_or_roll_back()
+
+            if len(self.turn_sequence) != turn_number + 1:
+                # The user undid or redid Turns instead of entering this one
+                continue
 
             if suggester.is_me and self.ready_to_accuse():
                 print("****** You are ready to accuse!")
@@ -112,6 +211,8 @@ class Engine(object):
         The input from the user to the Engine on each Turn is one of the following
             > 'pass'
             > 'update'
+            > 'undo' / 'redo'
+            > 'whatif'
             > (card_1,card_2,card_3,revealing_player_number)
                 e.g. > 'rope,green,hall,2'
                 Meaning, Player 2 showed a card to the Suggesting Player, who guessed it was
@@ -119,18 +220,22 @@ class Engine(object):
                 If no player revealed a card to the Suggester, then 0 should be submitted
                 as the revealer_player_number
 
-        :return bool: True if turn was taken, False if suggester Player passed
+        :return bool: True if turn was taken, False if suggester Player passed (or the user undid or redid)
         """
         print_color(COLORS.YELLOW, f"\nTurn # {turn_number}")
         print(f"Player {suggester.number} takes turn")
 
         parameters = handle_input(
-            "-- Enter Turn Details\n   (Suggestion + Revealing Player Number, or 'PASS', or 'UPDATE'): "
+            "-- Enter Turn Details\n   (Suggestion + Revealing Player Number, or 'PASS', 'UPDATE', 'WHATIF', 'UNDO' or 'REDO'): "
         )
 
         if parameters.upper().strip() == "PASS":
             # User indicates that the Suggester decline to make a suggestion
-            self.turn_sequence.append(Turn(number=turn_number, is_pass=True))
+            self.checkpoint(f"Turn {turn_number}: Player {suggester.number} passed")
+            turn = Turn(number=turn_number, is_pass=True)
+            self.turn_sequence.append(turn)
+            if self.journal:
+                self.journal.record_turn(turn)
             return False
         elif parameters.upper().strip() == 'UPDATE':
             """
@@ -140,6 +245,14 @@ class Engine(object):
             self.user_updates_hands(turn_number)
             # Recursive call here because we want to get the Turn details after the user update
             return self.take_turn(turn_number, suggester)
+        elif parameters.upper().strip() == 'WHATIF':
+            # Ask what the Engine would deduce from hypothetical facts, without changing the game
+            self.user_asks_what_if()
+            return self.take_turn(turn_number, suggester)
+        elif parameters.upper().strip() in ('UNDO', 'REDO'):
+            # Wind the Engine back to (or forward from) an earlier Turn or UPDATE
+            self.user_undoes(redo=parameters.upper().strip() == 'REDO')
+            return False
 
         # Parse the Turn details
         suggestion_set, revealer_num = parameters.rsplit(sep=',', maxsplit=1)
@@ -162,8 +275,11 @@ class Engine(object):
             )
 
         # Perform post-turn deductions that only need to happen once, immediately after a turn
+        self.checkpoint(f"Turn {turn_number}: Player {suggester.number} suggested {parameters}")
         self.one_time_turn_deductions(turn)
         self.turn_sequence.append(turn)
+        if self.journal:
+            self.journal.record_turn(turn)
 
         return True
 
@@ -210,28 +326,204 @@ class Engine(object):
 
         # Parse the input
         player_num, action, card = parameters.split(',')
-        player = self.get_player(int(player_num))
+        player_num = int(player_num)
+        self.checkpoint(f"Turn {turn_number}: UPDATE Player {player_num} {action} {card}")
+        self.apply_update(player_num, action, card)
+        if self.journal:
+            self.journal.record_update(turn_number, player_num, action, card)
 
         if action == 'has':
-            # Move a card from the Player's POSSIBLES to its HAND
             msg = f" > > Adding '{color_cards(card)}' to Player {player_num}'s HAND "
+        else:
+            msg = f"Removing '{color_cards(card)}' from Player {player_num}'s POSSIBLES "
+        msg += 'and re-running deductions'
+
+        kept = self.settle_or_roll_back()
+        self.renderer.invalidate()
+        self.render_board()
+        if kept:
+            print(msg)
+
+    def render_board(self, suggestions=False):
+        """
+        Draw the board, with the probabilities (and suggestions) worked out in the background if there's an analyst,
+            or worked out on the spot otherwise
+
+        :param bool suggestions:    Whether to show the suggestions the user could make
+        """
+        if self.analyst is None:
+            self.renderer.render(self, self.estimate_probabilities(), suggestions=suggestions)
+        else:
+            self.analysis = self.analyst.latest(self)
+            self.renderer.render(self, suggestions=suggestions)
+        self.notices.clear()
+
+    def settle_or_roll_back(self):
+        """
+        Run the deductions after a Turn or UPDATE. If what it says contradicts what was already known,
+            undo it on the spot, and show the fewest Turns and UPDATEs that conflict (see provenance.py)
+            under the next board drawn.
+        When the deductions gave up halfway through, what they left can't be trusted, so it can't be redone.
+
+        :return bool: Whether the Turn or UPDATE was kept
+        """
+        try:
+            self.process_turns_for_info()
+            error = None
+        except ValueError as e:
+            error = e
+        conflict = find_conflict(self)
+        # Undoing the newest input doesn't help if the contradiction doesn't involve it,
+        #   unless the deductions gave up halfway through
+        latest = len(self.provenance.inputs) - 1
+        if error is None and (conflict is None or latest not in conflict.inputs):
+            if conflict:
+                self.notices.append(f"{COLORS.INVERSE} ! ! {conflict.reason}{COLORS.RESET}")
+            return True
+
+        description = self.history[-1][0]
+        self.notices.append(f"{COLORS.INVERSE} ! ! {description} contradicts what's known{COLORS.RESET}")
+        for line in conflict.describe() if conflict else [f"Contradiction: {error}"]:
+            self.notices.append(f"     {line}")
+        self.undo(1)
+        if error:
+            # Nothing to redo: the state it would restore is only partly deduced, and contradictory
+            self._redo_stack.pop()
+        if self.journal:
+            # A replay of the journal drops the Turn or UPDATE the same way
+            self.journal.record_undo(1)
+        self.notices.append(f"   It has been undone{'' if error else ' (enter REDO to keep it anyway)'}")
+        return False
+
+    def user_asks_what_if(self):
+        """
+        User asks what the Engine would deduce if a Player HAD or LACKED a card (see hypotheses.py),
+            or which cards are forced because supposing otherwise leads to a contradiction.
+        The game itself is left unchanged.
+        """
+        prompt = ("-- What if? Enter '<player_num>,[has|lacks],<card>' (several separated by ';'), "
+                  "or 'FORCED' to find every forced card: ")
+        parameters = handle_input(prompt).strip()
+
+        if parameters == 'forced':
+            forced = forced_facts(self)
+            for player_num, action, card, reason in forced:
+                print(f"   Player {player_num} {action} {color_cards(card)} (otherwise: {reason})")
+            if not forced:
+                print("   No cards are forced beyond what the Engine has deduced")
+            return
+
+        facts = []
+        for fact in parameters.split(';'):
+            player_num, _, fact_details = fact.strip().partition(',')
+            action, _, card = fact_details.partition(',')
+            if not player_num.isdigit() or not 0 < int(player_num) <= self.num_players \
+                    or action not in ('has', 'lacks') or card not in ALL_CARDS:
+                print_color(COLORS.INVERSE, f" ! ! Expected '<player_num>,[has|lacks],<card>', not '{fact.strip()}'")
+                return
+            facts.append((int(player_num), action, card))
+        for line in what_if(self, facts).describe():
+            print(f"   {line}")
+
+    def user_undoes(self, redo=False):
+        """
+        User winds the Engine back to before one of the recent Turns or UPDATEs,
+            or (with redo) takes back their last UNDO
+        """
+        if redo:
+            if not self._redo_stack:
+                self.notices.append(f"{COLORS.INVERSE} ! ! There is nothing to redo{COLORS.RESET}")
+                return
+            self.redo()
+            if self.journal:
+                self.journal.record_redo()
+        else:
+            if not self.history:
+                self.notices.append(f"{COLORS.INVERSE} ! ! There is nothing to undo{COLORS.RESET}")
+                return
+            recent = self.history[-10:]
+            for steps, (description, _) in zip(range(len(recent), 0, -1), recent):
+                print(f"   {steps}: {description}")
+            while True:
+                answer = handle_input("-- Undo back to before which of these? (number, or nothing to cancel): ").strip()
+                if not answer:
+                    # The list of Turns and UPDATEs printed over the board goes too
+                    self.renderer.invalidate()
+                    return
+                if answer.isdigit() and 0 < int(answer) <= len(recent):
+                    break
+                print_color(COLORS.INVERSE, f" ! ! Expected a number from 1 to {len(recent)}, not '{answer}'")
+            steps = int(answer)
+            self.undo(steps)
+            if self.journal:
+                self.journal.record_undo(steps)
+        # run() redraws the whole board as of the Turn wound back to
+        self.renderer.invalidate()
+
+    def checkpoint(self, description):
+        """
+        Remember the Engine's state just before a Turn or UPDATE is applied, so that it can be undone.
+        Once something new happens, what was undone can no longer be redone.
+
+        :param str description: How to describe the Turn or UPDATE to the user
+        """
+        self.history.append((description, EngineSnapshot(self, self._open_turns())))
+        self._redo_stack.clear()
+
+    def undo(self, steps=1):
+        """
+        Restore the Engine to how it was before the last few Turns and UPDATEs
+
+        :param int steps:   How many Turns and UPDATEs to undo
+        """
+        if not 0 < steps <= len(self.history):
+            raise ValueError(f"Can only undo between 1 and {len(self.history)} Turns or UPDATEs, not {steps}")
+        index = len(self.history) - steps
+        snapshot = self.history[index][1]
+        # Remember the current state of everything the undo will change, so it can be redone
+        redo_snapshot = EngineSnapshot(self, [turn for turn, *_ in snapshot.turn_states])
+        self._redo_stack.append((self.history[index:], redo_snapshot, self.turn_sequence[snapshot.num_turns:],
+                                 self.updates[snapshot.num_updates:]))
+        del self.history[index:]
+        snapshot.restore(self)
+
+    def redo(self):
+        """Take back the last undo()"""
+        if not self._redo_stack:
+            raise ValueError("There is nothing to redo")
+        undone_history, snapshot, undone_turns, undone_updates = self._redo_stack.pop()
+        self.turn_sequence.extend(undone_turns)
+        self.updates.extend(undone_updates)
+        snapshot.restore(self)
+        self.history.extend(undone_history)
+
+    def _open_turns(self):
+        """The Turns whose possible reveals later deductions could still narrow down"""
+        turns = [turn for revealer_turns in self._turns_by_revealer
+                 for turn in revealer_turns if not turn.totally_processed]
+        turns += [turn for turn in self.turn_sequence[self._num_turns_scheduled:]
+                  if not turn.is_pass and not turn.totally_processed]
+        return turns
+
+    def apply_update(self, player_num, action, card):
+        """
+        Apply the user's knowledge that a Player HAS or LACKS a card, without re-running deductions
+
+        :param int player_num:
+        :param str action:      'has' or 'lacks'
+        :param str card:
+        """
+        player = self.get_player(player_num)
+        self.updates.append((len(self.turn_sequence), player_num, action, card))
+        if action == 'has':
+            # Move a card from the Player's POSSIBLES to its HAND
             player.hand |= {card}
             # Remove the card from all other Players' POSSIBLES
             self.remove_set_from_possibles(self.all_players, {card})
-
         else:  # action == 'lacks'
             # Remove the card from the Player's POSSIBLES
-            msg = f"Removing '{color_cards(card)}' from Player {player_num}'s POSSIBLES "
             player.possibles -= {card}
 
-        msg += 'and re-running deductions'
-        print(msg)
-        print_separator_line()
-
-        self.process_turns_for_info()
-        self.print_player_hands(turn_number)
-        self.offer_turn_intel()
-
     def get_non_revealing_responders(self, turn):
         """
         Return the sequence of players in a turn that "passed" on a suggestion
@@ -250,95 +542,412 @@ class Engine(object):
         else:
             return self._player_list[sug_num + 1:] + self._player_list[1:rev_num]
 
-    def deduce_murder_cards(self):
+    def deduce_murder_cards(self, categories=CATEGORIES, enqueue_turn=None):
         """
         Try to deduce a subset of the Murder Cards in this game (i.e. the accusation)
-            by examining all Players' HANDS and POSSIBLES
+            by examining all Players' HANDS and POSSIBLES.
+        Every card has exactly one owner, among the Players and the Murder envelope, so once a category is solved,
+            a card of it that only one Player POSSIBLY has must be in that Player's HAND
 
-        :return bool: Whether we deduced more of the Murder
+        :param categories:      The card categories to examine (default all)
+        :param enqueue_turn:    Called with each Turn whose possible reveals lost a newly found Murder Card
+        :return bool: Whether we deduced more of the Murder, or of any Player's HAND or POSSIBLES
         """
-        old_accusation = self.accusation.copy()
+        old_accusation = self.accusation.mask
 
         # Establish all cards that we know are held, as well as all cards still potentially held
-        all_hands = set()
-        all_hands_and_possibles = set()
+        all_hands = 0
+        all_hands_and_possibles = 0
         for player in self.all_players:
-            all_hands.update(player.hand)
-            all_hands_and_possibles.update(player.hand | player.possibles)
+            all_hands |= player.hand.mask
+            all_hands_and_possibles |= player.hand.mask | player.possibles.mask
 
-        for category in CATEGORIES:
+        for category in categories:
+            category_mask = CATEGORY_MASKS[category.__name__]
             # If all but one card from a category is in players' HANDS, the outcast must be a Murder Clue
             #  e.g. if we know who has Green, Plum, White, Scarlet, and Peacock, then Mustard must be the SUSPECT
-            cat_cards_not_in_hands = set(category.__members__.keys()) - all_hands
-            if len(cat_cards_not_in_hands) == 1:
+            cat_cards_not_in_hands = category_mask & ~all_hands
+            if cat_cards_not_in_hands.bit_count() == 1:
                 self.accusation |= cat_cards_not_in_hands
-            elif len(cat_cards_not_in_hands) < 1:
+            elif not cat_cards_not_in_hands:
                 raise ValueError(
                     f"All cards from the same category are considered in play, which is impossible!: {category.__name__}"
                 )
 
             # If a card is not in any HANDS or POSSIBLES, it must be a Murder Clue
-            inactive_cat_cards = set(category.__members__.keys()) - all_hands_and_possibles
-            if len(inactive_cat_cards) == 1:
+            inactive_cat_cards = category_mask & ~all_hands_and_possibles
+            if inactive_cat_cards.bit_count() == 1:
                 self.accusation |= inactive_cat_cards
-            elif len(inactive_cat_cards) > 1:
+            elif inactive_cat_cards.bit_count() > 1:
                 raise ValueError(
-                    f"Multiple cards from the same category are considered out of play!: {category.__name__}:{inactive_cat_cards}"
+                    f"Multiple cards from the same category are considered out of play!: {category.__name__}:{set(CardSet.from_mask(inactive_cat_cards))}"
                 )
 
-        if len(self.accusation) > len(old_accusation):
-            # If we gained a new murder clue, make sure it's removed from player POSSIBLES
-            self.remove_set_from_possibles(
-                players=self.other_players, cards=self.accusation
-            )
+        new_murder_cards = self.accusation.mask & ~old_accusation
+        if new_murder_cards:
+            # A Clue can not be a revealed card in a Turn, so update the Turns that might have revealed it
+            self._eliminate_from_turns(new_murder_cards, enqueue_turn)
+        return self._assign_sole_owners(categories, all_hands) or bool(new_murder_cards)
 
-            # A Clue can not be a revealed card in a Turn, so update all relevant Turns
-            for turn in self.turn_sequence:
-                if not turn.totally_processed:
-                    turn.possible_reveals -= self.accusation
-            return True
+    def _assign_sole_owners(self, categories, all_hands):
+        """
+        In the solved categories, the Murder Card is out of every Player's POSSIBLES,
+            and a card that only one Player POSSIBLY has is in that Player's HAND
 
-        return False
+        :param categories:      The card categories to examine
+        :param int all_hands:   The mask of every card known to be in a Player's HAND
+        :return bool: Whether any Player's HAND or POSSIBLES changed
+        """
+        accusation = self.accusation.mask
+        solved = 0
+        for category in categories:
+            category_mask = CATEGORY_MASKS[category.__name__]
+            if accusation & category_mask:
+                solved |= category_mask
+        if not solved:
+            return False
+
+        got_info = False
+        # The cards of the solved categories that one Player POSSIBLY has, and that several do
+        possible_once = possible_twice = 0
+        for player in self.other_players:
+            possibles = player.possibles.mask
+            if possibles & accusation:
+                possibles &= ~accusation
+                player.possibles = possibles
+                got_info = True
+            possible_twice |= possible_once & possibles
+            possible_once |= possibles
+        sole = solved & possible_once & ~possible_twice & ~all_hands
+        if not sole:
+            return got_info
+        for player in self.other_players:
+            cards = player.possibles.mask & sole
+            if cards:
+                player.hand |= cards
+                player.possibles -= cards
+        return True
 
-    def offer_turn_intel(self, ready=False):
+    def offer_turn_intel(self, ready=False, probabilities=None):
         """
         Log to the console the complete Turn history, including every Turn's suggestion, the cards that were
             possibly revealed, and the card that definitely was revealed (according to our deductions)
 
         :param bool ready: Whether to skip the Turn history and get right to the murder cards
+        :param DealProbabilities probabilities: The card probabilities to log, if already estimated
         :return:
         """
+        lines = []
         if not ready:
-            print_color(COLORS.GREEN, "\nPast Turns:")
-            for turn in self.turn_sequence:
-                if turn.is_pass or turn.suggester.is_me:
-                    continue
-                if turn.totally_processed and len(turn.possible_reveals) > 1:
-                    # Possibly trim turn.possible_reveals for turns that are already .totally_processed
-                    turn.possible_reveals &= (turn.revealer.hand | turn.revealer.possibles)
-                print(f"   Turn {turn.number}: Suggester:{turn.suggester.number} Revealer:{turn.revealer.number} Suggestion:{color_cards(turn.suggestion)} Possible Reveals:{color_cards(turn.possible_reveals)}")
+            lines.append(f"\n{COLORS.GREEN}Past Turns:{COLORS.RESET}")
+            lines += [self.format_past_turn(turn) for turn in self.past_turns()]
+            if probabilities is None:
+                probabilities = self.estimate_probabilities()
+            lines += self.format_probabilities(probabilities)
         if self.accusation:
             # If at least one of the Murder cards has been deduced, log this
-            print(f"\n** Murder Cards: {color_cards(self.accusation)}")
+            lines.append(f"\n** Murder Cards: {color_cards(self.accusation)}")
+        print('\n'.join(lines))
+
+    def past_turns(self):
+        """
+        The Turns to show in the Turn history: every Turn with a suggestion, except the user's own
+
+        :return Iterator[Turn]:
+        """
+        for turn in self.turn_sequence:
+            if turn.is_pass or turn.suggester.is_me:
+                continue
+            if turn.totally_processed and len(turn.possible_reveals) > 1:
+                # Possibly trim turn.possible_reveals for turns that are already .totally_processed
+                turn.possible_reveals &= (turn.revealer.hand | turn.revealer.possibles)
+            yield turn
+
+    @staticmethod
+    def format_past_turn(turn: Turn):
+        """The Turn's line of the Turn history"""
+        return (f"   Turn {turn.number}: Suggester:{turn.suggester.number} Revealer:{turn.revealer.number} "
+                f"Suggestion:{color_cards(turn.suggestion)} Possible Reveals:{color_cards(turn.possible_reveals)}")
+
+    def estimate_probabilities(self, max_steps=PROBABILITY_MAX_STEPS, time_budget=SAMPLE_TIME_BUDGET):
+        """
+        Work out how likely each card is to be in each Player's HAND, or to be a Murder Card,
+            counting every deal of the cards consistent with our deductions (see probability.estimate_probabilities()).
+        When there are too many deals to count, estimate the probabilities from a random sample of them instead.
+
+        :param int max_steps:       The most steps to spend listing deals before switching to sampling
+        :param float time_budget:   The most seconds to spend sampling deals
+        :return DealProbabilities|SamplingFailed|None: None if no deal of the cards agrees with our deductions,
+                                                        SamplingFailed if none of the deals sampled did
+        """
+        try:
+            return estimate_probabilities(DealConstraints.from_engine(self), max_steps=max_steps, time_budget=time_budget)
+        except SamplingFailed as e:
+            return e
+
+    def print_probabilities(self, probabilities: DealProbabilities | SamplingFailed | None):
+        """
+        Log to the console how likely each card that's still in doubt is to be in each Player's HAND,
+            or to be a Murder Card
+
+        :param DealProbabilities probabilities: As returned by estimate_probabilities()
+        """
+        print('\n'.join(self.format_probabilities(probabilities)))
+
+    def format_probabilities(self, probabilities: DealProbabilities | SamplingFailed | None):
+        """
+        :param DealProbabilities probabilities: As returned by estimate_probabilities()
+        :return list[str]: The lines print_probabilities() logs
+        """
+        lines = ['', f"{COLORS.GREEN}Probabilities:{COLORS.RESET}"]
+        if probabilities is None:
+            return lines + [f"{COLORS.INVERSE} ! ! No deal of the cards agrees with what the Engine has deduced{COLORS.RESET}"]
+        if isinstance(probabilities, SamplingFailed):
+            # An unlucky sample, not a contradiction
+            return lines + [f"   (Unavailable this time: {probabilities})"]
+
+        for player in self.other_players:
+            in_doubt = {card: p for card, p in probabilities.player_probabilities(player.number).items() if p < 1}
+            if in_doubt:
+                lines.append(f"   Player {player.number}: {color_probabilities(in_doubt)}")
+        in_doubt = {card: p for card, p in probabilities.murder_probabilities().items() if p < 1}
+        if in_doubt:
+            lines.append(f"   Murder Cards: {color_probabilities(in_doubt)}")
+        if not probabilities.exact:
+            margin = max(
+                (high - low) / 2
+                for number in [0] + [player.number for player in self.other_players]
+                for card in ALL_CARDS
+                for low, high in [probabilities.confidence_interval(number, card)]
+            )
+            lines.append(f"   (Estimated from {probabilities.num_drawn} random deals, to within {margin:.0%})")
+        return lines
+
+    def print_suggestions(self, probabilities: DealProbabilities, top=5):
+        """
+        Log to the console the suggestions the user could make that are expected to reveal the most
+            about the deal, given the order in which the other Players would respond
+
+        :param DealProbabilities probabilities: As returned by estimate_probabilities()
+        :param int top:                         How many suggestions to log
+        """
+        print('\n'.join(self.format_suggestions(probabilities, top)))
+
+    def format_suggestions(self, probabilities: DealProbabilities, top=5, ranked=None):
+        """
+        :param list[tuple[float, tuple]] ranked:    The suggestions already ranked, if they are
+        :return list[str]: The lines print_suggestions() logs
+        """
+        if ranked is None:
+            from recommender import rank_suggestions
+
+            responders = self.get_non_revealing_responders(Turn(suggester=self.my_player, revealer=NOBODY))
+            ranked = rank_suggestions(probabilities, [player.number for player in responders], top=top)
+        ranked = ranked[:top]
+        lines = ['', f"{COLORS.GREEN}Suggestions (expected bits of information):{COLORS.RESET}"]
+        return lines + [f"   {color_cards(cards)} {gain:.2f}" for gain, cards in ranked]
+
+    def format_analysis(self):
+        """
+        :return list[str]: The probabilities worked out in the background (see background.py),
+                            as of an earlier Turn or UPDATE while the latest are still being worked out
+        """
+        if self.analysis is None:
+            return ['', f"{COLORS.GREEN}Probabilities:{COLORS.RESET}",
+                    "   (Being worked out in the background: they'll show after your next entry)"]
+        lines = self.format_probabilities(self.analysis.probabilities)
+        if not self.analyst.is_current(self.analysis, self):
+            lines.append(f"   (As of Turn {self.analysis.turn_number}: "
+                         f"the latest are being worked out in the background, and will show after your next entry)")
+        return lines
+
+    def format_analyzed_suggestions(self, top=5):
+        """
+        :return list[str]: The suggestions ranked in the background, if they were ranked
+        """
+        if self.analysis is None or self.analysis.suggestions is None:
+            return []
+        return self.format_suggestions(self.analysis.probabilities, top=top, ranked=self.analysis.suggestions)
+
+    def format_rivals(self):
+        """
+        :return list[str]: How close each rival is to accusing, if it's being estimated
+        """
+        if self.perspectives is None:
+            return []
+        return ['', f"{COLORS.GREEN}Rivals (at least what each can have deduced):{COLORS.RESET}"] + \
+            self.perspectives.describe()
 
     def ready_to_accuse(self):
         """
         Return True if self.accusation is a complete set of cards, meaning
-            it contains one card per category (Suspect, Weapon, Room)
+            it contains one card per category (e.g. Suspect, Weapon, Room)
         """
-
-        # TODO validate that self.accusation has one card per category, in addition to checking overall set length
-        return len(self.accusation) == 3
+        accusation = self.accusation.mask
+        return all((accusation & category_mask).bit_count() == 1 for category_mask in CATEGORY_MASKS.values())
 
     def process_turns_for_info(self):
         """
         Perform deductions of who-has-what based on the information available from the game's Turn sequence.
-        If a pass through the turn sequence yielded new info (narrowing down other players' hands),
+
+        Rather than re-scanning every Turn until nothing changes (see reprocess_all_turns_for_info()),
+            keep a worklist of only the deductions whose inputs changed since they last ran:
+            > a Turn, when its Revealer's HAND or POSSIBLES changed for one of the Turn's possible reveals
+            > a Player's hand-size check, when that Player's HAND or POSSIBLES changed
+            > a category's murder deduction, when any Player's HAND or POSSIBLES changed for a card in that category
+        The deductions reached are identical to those of the full re-scan.
+        """
+        turn_queue = deque()
+        queued_turns = set()
+        queued_categories = set()
+        queued_players = set()
+
+        def enqueue_turn(turn):
+            if turn not in queued_turns:
+                queued_turns.add(turn)
+                turn_queue.append(turn)
+
+        def enqueue_changed_dependents():
+            self._enqueue_changed_dependents(enqueue_turn, queued_categories, queued_players)
+
+        # Schedule Turns added since the last call
+        self._schedule_new_turns(enqueue_turn)
+
+        # Schedule whatever depends on changes made outside this method, e.g. user updates
+        enqueue_changed_dependents()
+
+        rounds = 0
+        while turn_queue or queued_categories or queued_players:
+            rounds += 1
+            while turn_queue:
+                turn = turn_queue.popleft()
+                queued_turns.discard(turn)
+                if turn.totally_processed:
+                    continue
+                if self.process_turn(turn):
+                    enqueue_changed_dependents()
+                if turn.totally_processed:
+                    self._unindex_turn(turn)
+
+            if queued_categories:
+                categories = [category for category in CATEGORIES if category in queued_categories]
+                queued_categories.clear()
+                if self.deduce_murder_cards(categories=categories, enqueue_turn=enqueue_turn):
+                    enqueue_changed_dependents()
+
+            if queued_players:
+                players = [player for player in self.other_players if player in queued_players]
+                queued_players.clear()
+                if self.check_players_hand_size(players=players):
+                    enqueue_changed_dependents()
+        self.last_deduction_rounds = rounds
+
+    def _schedule_new_turns(self, enqueue_turn=None):
+        """
+        Index the unprocessed Turns added to self.turn_sequence since the last call,
+            by Revealer and by the cards they might have revealed
+
+        :param enqueue_turn:    Called with each newly indexed Turn
+        """
+        accusation = self.accusation.mask
+        for turn in self.turn_sequence[self._num_turns_scheduled:]:
+            if turn.totally_processed:
+                continue
+            possible_reveals = turn.possible_reveals
+            # Murder Cards can't have been revealed
+            possible_reveals.mask &= ~accusation
+            self._turns_by_revealer[turn.revealer.number].append(turn)
+            for bit in mask_to_bits(possible_reveals.mask):
+                self._turns_by_card[bit.bit_length() - 1][turn] = None
+            if enqueue_turn:
+                enqueue_turn(turn)
+        self._num_turns_scheduled = len(self.turn_sequence)
+
+    def _reindex_turns(self):
+        """
+        Rebuild the indexes of _schedule_new_turns() from the scheduled Turns, e.g. after they were wound back.
+        Only the unprocessed Turns are indexed, and each only under the cards it still might have revealed,
+            which is all that the worklist looks them up for.
+        """
+        self._turns_by_revealer = [[] for _ in self._player_list]
+        self._turns_by_card = [{} for _ in CARD_ORDER]
+        for turn in self.turn_sequence[:self._num_turns_scheduled]:
+            if turn.totally_processed:
+                continue
+            self._turns_by_revealer[turn.revealer.number].append(turn)
+            for bit in mask_to_bits(turn.possible_reveals.mask):
+                self._turns_by_card[bit.bit_length() - 1][turn] = None
+
+    def _unindex_turn(self, turn):
+        """Drop a totally processed Turn from the card index, since nothing more can be learned from it"""
+        for bit in mask_to_bits(turn.suggestion.mask):
+            self._turns_by_card[bit.bit_length() - 1].pop(turn, None)
+
+    def _eliminate_from_turns(self, cards: int, enqueue_turn=None):
+        """
+        Remove cards that can't have been revealed from the possible reveals of the unprocessed Turns.
+        Only the Turns that might have revealed one of the cards are touched, through the card index.
+
+        :param int cards:       Mask of the cards to remove
+        :param enqueue_turn:    Called with each Turn whose possible reveals were narrowed
+        """
+        for bit in mask_to_bits(cards):
+            index = bit.bit_length() - 1
+            for turn in self._turns_by_card[index]:
+                if not turn.totally_processed and turn.possible_reveals.mask & bit:
+                    turn.possible_reveals -= bit
+                    if enqueue_turn:
+                        enqueue_turn(turn)
+            # No Turn might have revealed the card any more
+            self._turns_by_card[index] = {}
+
+    def _enqueue_changed_dependents(self, enqueue_turn, categories: set, players: set):
+        """
+        Compare every Player's HAND and POSSIBLES against the last time we looked,
+            and enqueue the Turns, categories and Players that depend on the cards that changed
+
+        :param enqueue_turn:    Callback adding a Turn to the worklist of process_turns_for_info()
+        :param categories:      The categories whose murder deductions need re-running
+        :param players:         The Players whose hand-size checks need re-running
+        """
+        for player in self.all_players:
+            hand, possibles = player.hand.mask, player.possibles.mask
+            old_hand, old_possibles = self._last_seen_masks[player.number]
+            changed = (hand ^ old_hand) | (possibles ^ old_possibles)
+            if not changed:
+                continue
+            self._last_seen_masks[player.number] = (hand, possibles)
+
+            if not player.is_me:
+                players.add(player)
+            for category in CATEGORIES:
+                if changed & CATEGORY_MASKS[category.__name__]:
+                    categories.add(category)
+
+            # Fully processed Turns drop out of the Revealer's list
+            revealer_turns = []
+            for turn in self._turns_by_revealer[player.number]:
+                if not turn.totally_processed:
+                    revealer_turns.append(turn)
+                    if turn.possible_reveals.mask & changed:
+                        enqueue_turn(turn)
+            self._turns_by_revealer[player.number] = revealer_turns
+
+    def reprocess_all_turns_for_info(self):
+        """
+        Perform deductions of who-has-what by brute force:
+        If a pass through the entire turn sequence yielded new info (narrowing down other players' hands),
             loop through the turn sequence again.
+
+        This is the reference behavior for the worklist in process_turns_for_info()
         """
+        # deduce_murder_cards() finds the Turns to update through the card index
+        self._schedule_new_turns()
         got_info = True
+        rounds = 0
         while got_info:
             got_info = False
+            rounds += 1
             # Traverse turns reverse-sequentially
             for turn in self.turn_sequence[::-1]:
                 # Don't need to process Turns that are 'solved'
@@ -349,6 +958,7 @@ class Engine(object):
             got_info |= self.deduce_murder_cards()
             # Further deductive reasoning based on what is known about Player hands
             got_info |= self.check_players_hand_size()
+        self.last_deduction_rounds = rounds
 
     def process_turn(self, turn):
         """
@@ -390,26 +1000,24 @@ class Engine(object):
             turn.totally_processed = True
             return True
         elif len(turn.possible_reveals) < 1:
-            print("ERROR: len(turn.possible_reveals) < 1")
-            print(f"Turn: {vars(turn)}")
-            print("suggester", vars(turn.suggester))
-            print("responder", vars(turn.revealer))
-            raise ValueError('turn.possible_reveals has length 0 after reductions')
+            # See provenance.find_conflict() for which Turns and UPDATEs led here
+            raise ValueError(f"Player {turn.revealer.number} can't have shown any of the cards suggested on Turn {turn.number}")
 
         # We got information from this turn if we narrowed down the possible_reveals
         return False
 
-    def check_players_hand_size(self):
+    def check_players_hand_size(self, players=None):
         """
         If a Player's HAND and POSSIBLES combined is equal to hand_size, make them all part of their HAND
         If a Player has HAND size equal to .hand_size, wipe out their POSSIBLES
             since we know all their cards
 
+        :param list[Player] players:    The Players to check (default all OTHER Players)
         :return bool: Whether a player's entire hand was determined
         """
         got_info = False
         # Only want to consider OTHER players with unsolved HANDS
-        for player in self.other_players:
+        for player in (self.other_players if players is None else players):
             if len(player.possibles) == 0:
                 continue
             if len(player.hand) == player.hand_size:
@@ -441,41 +1049,52 @@ class Engine(object):
         :param turn_number:
         :return:
         """
-        print(f"\t\t\t{COLORS.WHITE}CARD DISTRIBUTION{COLORS.RESET}")
+        lines = [f"\t\t\t{COLORS.WHITE}CARD DISTRIBUTION{COLORS.RESET}"]
         for player in self.all_players:
-            if player.is_me:
-                print_color(COLORS.CYAN, f"++ Player {player.number} (YOU!)")
-                print(f"      {COLORS.CYAN}Hand:{COLORS.RESET}      {color_cards(player.hand)}")
-            else:
-                # For non-user Players, indicate the size of the Player's HAND, even if not all cards in the HAND are known
-                print(
-                    f"++ {COLORS.WHITE}Player {player.number}{COLORS.RESET} [{len(player.hand)}/{player.hand_size}]"
-                )
-                print(f"      Hand:      {color_cards(player.hand)}")
-            if len(player.possibles):
-                self.print_cards("      Possibles: ", player.possibles_dict)
+            lines += self.format_player(player)
+        print('\n'.join(lines))
+
+    def format_player(self, player: Player):
+        """
+        :return list[str]: The Player's lines of the Card Distribution
+        """
+        if player.is_me:
+            lines = [
+                f"{COLORS.CYAN}++ Player {player.number} (YOU!){COLORS.RESET}",
+                f"      {COLORS.CYAN}Hand:{COLORS.RESET}      {color_cards(player.hand)}",
+            ]
+        else:
+            # For non-user Players, indicate the size of the Player's HAND, even if not all cards in the HAND are known
+            lines = [
+                f"++ {COLORS.WHITE}Player {player.number}{COLORS.RESET} [{len(player.hand)}/{player.hand_size}]",
+                f"      Hand:      {color_cards(player.hand)}",
+            ]
+        if len(player.possibles):
+            lines += self.format_cards("      Possibles: ", player.possibles).split('\n')
+        return lines
 
     @staticmethod
-    def print_cards(prefix: str, cards: dict):
+    def print_cards(prefix: str, cards):
         """
         Print a collection of cards, grouped by category (SUSPECT, WEAPON, ROOM)
 
         :param str prefix:
-        :param dict cards: the dict representation of a ClueCardSet
+        :param CardSet|dict cards: A ClueCardSet, or its dict representation
         """
-        s = prefix
-        indent = f"\n{' ' * len(prefix)}"
-        ctr = 0
-        for cat in CATEGORIES:
-            cat_cards = cards.get(cat.__name__, set())
-            if cat_cards:
-                s += f"{indent if ctr else ''}{cat.__name__}: {color_cards(cat_cards)}"
-                ctr += 1
-        print(s)
-
+        print(Engine.format_cards(prefix, cards))
 
-def print_separator_line():
-    print(f"\n----------------------------------------------------------")
+    @staticmethod
+    def format_cards(prefix: str, cards):
+        """
+        :return str: The collection of cards as print_cards() logs it
+        """
+        mask = cards_to_mask(card for cat_cards in cards.values() for card in cat_cards) \
+            if isinstance(cards, dict) else cards_to_mask(cards)
+        indent = f"\n{' ' * len(prefix)}"
+        return prefix + indent.join(
+            f"{name}: {color_mask(mask & category_mask)}"
+            for name, category_mask in CATEGORY_MASKS.items() if mask & category_mask
+        )
 
 
 def print_color(color, msg_str):
@@ -491,8 +1110,18 @@ def _colorize(card):
     :param str card:
     :return str:
     """
-    color_code = COLORMAP[CARD_TO_CATEGORY[card.lower()]]
-    return color_code + card + COLORS.RESET
+    return colorize(card)
+
+
+def color_probabilities(probabilities: dict):
+    """
+    Wrap each card in ANSI color codes and follow it with its probability, most likely cards first
+
+    :param dict probabilities:  card -> probability
+    :return str:
+    """
+    ranked = sorted(probabilities.items(), key=lambda x: (-x[1], SORT_ORDER[CARD_TO_CATEGORY[x[0]]], x[0]))
+    return '[' + ', '.join([f"{colorize(card)} {p:.0%}" for card, p in ranked]) + ']'
 
 
 def color_cards(cards):
@@ -504,17 +1133,18 @@ def color_cards(cards):
     :return:                    Input wrapped in ANSI color codes (with RESET terminator included)
     """
     if isinstance(cards, str):
-        return _colorize(cards)
+        return colorize(cards)
+    elif isinstance(cards, CardSet):
+        # The colorized string of every set of cards shown is cached, by bitmask
+        return color_mask(cards.mask)
     elif hasattr(cards, '__iter__'):
         sorted_cards = sorted(cards, key=lambda x: (SORT_ORDER[CARD_TO_CATEGORY[x]], x))
-        return '[' + ', '.join([_colorize(card) for card in sorted_cards]) + ']'
+        return '[' + ', '.join([colorize(card) for card in sorted_cards]) + ']'
     else:
         raise ValueError("Input to color_card() neither a string nor an iterable!")
 
 
-PICKLE_STATE = 'engine_state.pkl'
-PICKLE_GAME = 'game_play.pkl'
-ALLOWABLE_INPUTS = ['pass', 'update', 'has', 'lacks']
+ALLOWABLE_INPUTS = ['pass', 'update', 'whatif', 'forced', 'undo', 'redo', 'has', 'lacks']
 
 
 def handle_input(prompt: str = 'Default Prompt:', splitter: str = ','):
@@ -548,11 +1178,65 @@ def handle_input(prompt: str = 'Default Prompt:', splitter: str = ','):
 def main():
     """
     Launch the Engine, which operates from the user's POV playing the game
-    This function also configures the interpreter to dump the game's state upon closure,
+    This function also records the game in a journal as it's played,
         so that if a particular game state caused the Engine to crash, you can return to that
         game after examining and resolving the bug.
+
+    With --script, play a whole game script (see game_script.py) without prompting instead.
+    With --profile, count and time the Engine's deductive rules (see instrumentation.py).
+    With --rivals, also show how close each rival is to accusing (see perspectives.py).
+    With --no-background, work out the probabilities and suggestions before every prompt instead of while it waits
+        (see background.py).
     """
-    os.system('cls' if os.name == 'nt' else 'clear')
+    parser = argparse.ArgumentParser(description="A Deduction Engine for the Board Game 'Clue'")
+    parser.add_argument('--script', help="Play the game script in this file ('-' for stdin) without prompting")
+    parser.add_argument('--batch-size', type=int, help="Run the deductions every this many script lines "
+                                                       "(default once, after the whole script)")
+    parser.add_argument('--jsonl', action='store_true', help="Write what the Engine knows as a line of JSON "
+                                                             "after every batch of script lines")
+    parser.add_argument('--no-ansi', action='store_true', help="Don't color the output or redraw the board in place "
+                                                               "(the default when output isn't a terminal)")
+    parser.add_argument('--rivals', action='store_true', help="Estimate how close each rival is to accusing, "
+                                                              "from what they've seen")
+    parser.add_argument('--no-background', action='store_true',
+                        help="Work out the probabilities before every prompt, instead of in the background while it waits")
+    parser.add_argument('--profile', help="Profile the deductive rules, writing a JSON trace to this file "
+                                          "(or folded stacks for a flame graph, if it ends in '.folded')")
+    args = parser.parse_args()
+
+    ansi = supports_ansi() and not args.no_ansi
+    use_ansi(ansi)
+    profiler = DeductionProfiler() if args.profile else None
+    try:
+        if args.script:
+            play_script(args, profiler)
+        else:
+            play_interactive(profiler, BoardRenderer(ansi=ansi), rivals=args.rivals, background=not args.no_background)
+    finally:
+        if profiler:
+            profiler.write(args.profile)
+            profiler.print_summary(file=sys.stderr)
+
+
+def play_script(args, profiler=None):
+    """Play a game script without prompting"""
+    stream = sys.stdin if args.script == '-' else open(args.script)
+    try:
+        run_script(stream, batch_size=args.batch_size, jsonl=args.jsonl, profiler=profiler)
+    except ScriptError as e:
+        print(f"{args.script}:\n{e}", file=sys.stderr)
+        sys.exit(1)
+    except ScriptContradiction as e:
+        print(f"{args.script}:{e.line_number}: Contradicts what the Engine knows: {e.error}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        stream.close()
+
+
+def play_interactive(profiler=None, renderer=None, rivals=False, background=True):
+    """Set up the game from the user's input, and play it Turn by Turn"""
+    renderer = renderer or BoardRenderer()
+    renderer.clear()
     print_color(COLORS.CYAN, "\n\t\tWelcome to Clue Solver!")
     print_color(COLORS.WHITE, "\tA Deduction Engine for the Board Game 'Clue'\n")
 
@@ -562,40 +1246,35 @@ def main():
         f"  This ensures that any extra cards are dealt to the first Players\n"
     )
 
-    time.sleep(0.5)
-
     num_players = int(handle_input("Enter Number of Players: "))
     my_player_number = int(handle_input("\nEnter Your Player Number (Gameplay rotation position): "))
     my_hand = handle_input(f"\nEnter Your Hand, comma-separated (e.g. '{COLORS.GREEN}knife,hall,pipe,...{COLORS.RESET}'): ").split(',')
     eng = Engine(num_players=num_players, my_player_number=my_player_number, my_hand=my_hand)
+    eng.renderer = renderer
+    if rivals:
+        eng.perspectives = Perspectives()
+    if background:
+        from background import Analyst
+
+        eng.analyst = Analyst()
+    if profiler:
+        profiler.attach(eng)
 
     """
-    After a game terminates, either through natural completion or from a crash,
-    pickle and dump the game state locally for debugging purposes.
+    Record the game in a journal as it's played, Turn by Turn, so that if the Engine crashes
+        (or the terminal is closed) the game is not lost.
     Use the module rerun.py to "pick up where you left off" once you (think you) have fixed the bug!
     """
-    def dump_engine_state(*args):
-        print(f"Dumping Pickled Engine State to {PICKLE_STATE}")
-        with open(PICKLE_STATE, "wb") as f:
-            dill.dump(eng, f)
-
-    def dump_gameplay(*args):
-        gameplay_info = [
-            eng.num_players,
-            eng.my_player_number,
-            eng.my_hand,
-            eng.turn_sequence,
-        ]
-        print(f'Dumping Gameplay Info to {PICKLE_GAME}')
-        with open(PICKLE_GAME, 'wb') as f:
-            dill.dump(gameplay_info, f)
-
-    atexit.register(dump_engine_state)
-    atexit.register(dump_gameplay)
+    eng.journal = GameJournal(JOURNAL_FILE)
+    eng.journal.record_setup(num_players, my_player_number, my_hand)
 
     # Start the game!
-    os.system('cls' if os.name == 'nt' else 'clear')
-    eng.run()
+    renderer.clear()
+    try:
+        eng.run()
+    finally:
+        if eng.analyst:
+            eng.analyst.close()
 
 
 if __name__ == '__main__':
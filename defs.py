@@ -2,9 +2,11 @@
 This module holds the constant values and class definitionsthat used by the solver Engine
 """
 import enum
+import json
+import os
 
 """
-These variables represent the sets of cards in the Clue deck.
+These variables represent the sets of cards in the classic Clue deck.
 You may alter these lists if your version of Clue has different names,
   e.g. the Online version released by Hasbro has a Ms. Orchid instead of Mrs. White,
   in which case you'd replace 'white' for 'orchid' in the SUSPECTS list
@@ -13,8 +15,55 @@ SUSPECT = enum.Enum('Suspect', ['white', 'plum', 'peacock', 'scarlet', 'mustard'
 WEAPON = enum.Enum('Weapon', ['rope', 'pipe', 'wrench', 'candlestick', 'knife', 'revolver'])
 ROOM = enum.Enum('Room', ['billiard', 'lounge', 'conservatory', 'kitchen', 'hall',
                           'dining', 'study', 'library', 'ballroom'])
+# The most Players the classic deck is dealt to
+CLASSIC_MAX_PLAYERS = 6
 
-CATEGORIES = [SUSPECT, WEAPON, ROOM]
+
+def load_deck(path):
+    """
+    Read a deck config file, for variants of Clue with other cards, more categories or more Players, e.g.
+
+        {"categories": {"Suspect": ["white", "plum", ...], "Weapon": [...], "Room": [...]}, "max_players": 10}
+
+    One card of each category is a Murder Card. Card names are single lower-case words.
+
+    :param str path:
+    :return tuple[list[enum.Enum], int]: The card categories, and the most Players the deck can be dealt to
+    """
+    with open(path) as f:
+        config = json.load(f)
+    categories = config.get('categories')
+    if not isinstance(categories, dict) or not categories:
+        raise ValueError(f"{path}: a deck needs 'categories', each a list of cards")
+
+    seen = set()
+    for name, cards in categories.items():
+        if not isinstance(cards, list) or not cards:
+            raise ValueError(f"{path}: category '{name}' has no cards")
+        for card in cards:
+            if not isinstance(card, str) or not card.isalpha() or not card.islower():
+                raise ValueError(f"{path}: cards are named with a single lower-case word, not '{card}'")
+            if card in seen:
+                raise ValueError(f"{path}: '{card}' is in more than one category")
+            seen.add(card)
+
+    # Every Player must be dealt at least one card
+    num_dealt = len(seen) - len(categories)
+    max_players = config.get('max_players', CLASSIC_MAX_PLAYERS)
+    if not isinstance(max_players, int) or not 2 <= max_players <= num_dealt:
+        raise ValueError(f"{path}: max_players must be 2 to {num_dealt}, not {max_players}")
+    return [enum.Enum(name, cards) for name, cards in categories.items()], max_players
+
+
+"""
+The deck in play is the classic deck, unless the CLUE_DECK environment variable names a deck config file,
+  e.g. >>> CLUE_DECK=decks/master_detective.json python3 clue_solver.py
+"""
+DECK_FILE = os.environ.get('CLUE_DECK')
+if DECK_FILE:
+    CATEGORIES, MAX_PLAYERS = load_deck(DECK_FILE)
+else:
+    CATEGORIES, MAX_PLAYERS = [SUSPECT, WEAPON, ROOM], CLASSIC_MAX_PLAYERS
 ALL_CARDS = {value for category in CATEGORIES for value in category.__members__}
 NUM_CARDS = len(ALL_CARDS)
 CARD_TO_CATEGORY = {m: c.__name__ for c in CATEGORIES for m in c.__members__}
@@ -37,45 +86,209 @@ class COLORS:
 
 # It's pretty when each of the card categories is a different color.
 # It also helps with visual organization when the tool presents its deductions to the user
-COLORMAP = dict(Suspect=COLORS.RED, Weapon=COLORS.YELLOW, Room=COLORS.BLUE)
+CATEGORY_COLORS = [COLORS.RED, COLORS.YELLOW, COLORS.BLUE, COLORS.MAGENTA, COLORS.GREEN, COLORS.CYAN]
+COLORMAP = {c.__name__: CATEGORY_COLORS[i % len(CATEGORY_COLORS)] for i, c in enumerate(CATEGORIES)}
 
 
-class ClueCardSet(object):
+# Every card gets a fixed bit position, ordered by category then by Enum definition order.
+# Card collections are stored as integer bitmasks over these positions (see CardSet)
+CARD_ORDER = tuple(value for category in CATEGORIES for value in category.__members__)
+CARD_BITS = {card: 1 << i for i, card in enumerate(CARD_ORDER)}
+CATEGORY_MASKS = {c.__name__: sum(CARD_BITS[m] for m in c.__members__) for c in CATEGORIES}
+ALL_CARDS_MASK = (1 << NUM_CARDS) - 1
+
+
+def cards_to_mask(cards) -> int:
     """
-    ClueCardSet is some code magic that allows collection of Clue game cards to be
-    stored as a dict of lists (keeping the cards separated by category),
-    but represented as an unordered set
+    Convert a CardSet, a bitmask, a single card, or an iterable of cards to a bitmask.
+        Values that aren't Clue cards are dropped.
+    """
+    if isinstance(cards, CardSet):
+        return cards.mask
+    if isinstance(cards, int):
+        return cards
+    if isinstance(cards, str):
+        return CARD_BITS.get(cards, 0)
+    mask = 0
+    for card in cards:
+        mask |= CARD_BITS.get(card, 0)
+    return mask
+
 
-    e.g. If ('plum', 'knife', 'hall', 'rope') were a set of cards, behind the scenes
-    it would be treated like {'Suspect': ['plum'], 'Room':['hall'], 'Weapon':['knife', 'rope']}
+def mask_to_bits(mask: int):
+    """Yield each bit set in mask as its own single-bit mask, lowest first"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit
+        mask ^= low_bit
 
-    I did things this way both as a challenge to myself, and because it made certain pieces of logic more elegant
-    (and hopefully made no pieces of logic less elegant!)
 
-    Each ClueCardSet object is linked to the class object that created it as a variable.
-    Thus, all the dunder's you see here.
+def mask_to_cards(mask: int):
+    """Yield the cards whose bits are set in mask, in CARD_ORDER"""
+    while mask:
+        low_bit = mask & -mask
+        yield CARD_ORDER[low_bit.bit_length() - 1]
+        mask ^= low_bit
 
-    When interacting with a CCS as a set, do not use .update() as this will not function properly.
-    Instead, add elements to the set with:   set = set | other_set
 
-    # TODO implement .update() for the set representation of a ClueCardSet, though not necessary because for the time being we can just do:   set = set | other_set
+class CardSet(object):
+    """
+    A mutable set of Clue cards, backed by a single integer bitmask (one bit per card in CARD_ORDER).
+
+    It supports the usual set API (len, in, iteration, |, &, -, ^, the in-place versions, .copy(), .add(), ...)
+    and accepts either another CardSet or any iterable of card names as the other operand.
+    In-place operations only rebind the integer mask, so they don't allocate any new containers.
+    """
+    __slots__ = ('mask',)
+
+    def __init__(self, cards=()):
+        self.mask = cards_to_mask(cards)
+
+    @classmethod
+    def from_mask(cls, mask: int):
+        card_set = cls.__new__(cls)
+        card_set.mask = mask
+        return card_set
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __iter__(self):
+        return mask_to_cards(self.mask)
+
+    def __contains__(self, card):
+        return bool(self.mask & CARD_BITS.get(card, 0))
+
+    def __eq__(self, other):
+        if isinstance(other, CardSet):
+            return self.mask == other.mask
+        if isinstance(other, (set, frozenset)):
+            return len(other) == len(self) and all(card in self for card in other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"CardSet({set(self)})"
+
+    def __or__(self, other):
+        return CardSet.from_mask(self.mask | cards_to_mask(other))
+
+    def __and__(self, other):
+        return CardSet.from_mask(self.mask & cards_to_mask(other))
+
+    def __sub__(self, other):
+        return CardSet.from_mask(self.mask & ~cards_to_mask(other))
+
+    def __xor__(self, other):
+        return CardSet.from_mask(self.mask ^ cards_to_mask(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __rsub__(self, other):
+        return CardSet.from_mask(cards_to_mask(other) & ~self.mask)
+
+    def __ior__(self, other):
+        self.mask |= cards_to_mask(other)
+        return self
+
+    def __iand__(self, other):
+        self.mask &= cards_to_mask(other)
+        return self
+
+    def __isub__(self, other):
+        self.mask &= ~cards_to_mask(other)
+        return self
+
+    def __ixor__(self, other):
+        self.mask ^= cards_to_mask(other)
+        return self
+
+    def __le__(self, other):
+        return not self.mask & ~cards_to_mask(other)
+
+    def __ge__(self, other):
+        return not cards_to_mask(other) & ~self.mask
+
+    def issubset(self, other):
+        return self <= other
+
+    def issuperset(self, other):
+        return self >= other
+
+    def isdisjoint(self, other):
+        return not self.mask & cards_to_mask(other)
+
+    def copy(self):
+        return CardSet.from_mask(self.mask)
+
+    def add(self, card):
+        self.mask |= CARD_BITS.get(card, 0)
+
+    def discard(self, card):
+        self.mask &= ~CARD_BITS.get(card, 0)
+
+    def remove(self, card):
+        if card not in self:
+            raise KeyError(card)
+        self.discard(card)
+
+    def clear(self):
+        self.mask = 0
+
+    def update(self, *others):
+        for other in others:
+            self.mask |= cards_to_mask(other)
+
+    def by_category(self):
+        """Return the cards grouped by category name, omitting categories with no cards"""
+        cards_by_category = {}
+        for category_name, category_mask in CATEGORY_MASKS.items():
+            if self.mask & category_mask:
+                cards_by_category[category_name] = set(mask_to_cards(self.mask & category_mask))
+        return cards_by_category
+
+
+class ClueCardSet(object):
+    """
+    ClueCardSet is some code magic that allows a collection of Clue game cards to be
+    stored compactly as a bitmask (a CardSet), but read and written like a set.
+    The same collection is also viewable as a dict of card sets keyed by category,
+    via the '<name>_dict' alias.
+
+    e.g. If ('plum', 'knife', 'hall', 'rope') were a set of cards, the '_dict' alias
+    would present it as {'Suspect': {'plum'}, 'Weapon': {'knife', 'rope'}, 'Room': {'hall'}}
+
+    Reading the attribute returns the instance's live CardSet, so in-place operators
+    (|=, &=, -=) update it without building any new containers.
+    Use .copy() if you need a snapshot that won't change along with the instance.
+    Assigning any iterable of cards overwrites the contents of the live CardSet.
     """
     def __set_name__(self, owner, name):
         """Create the alias for the dict version of the card set"""
-        self.name = name + '_dict'
+        self.name = name
+        setattr(owner, name + '_dict', property(lambda instance: getattr(instance, name).by_category()))
 
     def __get__(self, instance, owner):
-        """Convert the dict card collection to a set"""
-        cards_by_category = instance.__dict__[self.name]
-        return set([c for category_cards in cards_by_category.values() for c in category_cards])
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            card_set = instance.__dict__[self.name] = CardSet()
+            return card_set
 
-    def __set__(self, instance, cards: set[str]):
-        """Convert the set card collection to a dict"""
-        instance.__dict__[self.name] = {}
-        for category in CATEGORIES:
-            clues = set(category.__members__) & cards
-            if clues:
-                instance.__dict__[self.name][category.__name__] = clues
+    def __set__(self, instance, cards):
+        card_set = instance.__dict__.get(self.name)
+        if card_set is None:
+            instance.__dict__[self.name] = CardSet(cards)
+        elif card_set is not cards:
+            card_set.mask = cards_to_mask(cards)
 
 
 class Player(object):
@@ -102,9 +315,6 @@ class Player(object):
         :param is_me:
         :param cards:
         """
-        self.hand_dict = {}
-        self.possibles_dict = {}
-
         # is_me indicates that the Player instance is YOUR Player instance
         self.is_me = is_me
         if cards is None:
@@ -142,9 +352,6 @@ class Turn(object):
     possible_reveals = ClueCardSet()
 
     def __init__(self, number: int = 0, suggestion=None, suggester: Player = None, revealer: Player = None, is_pass=False):
-        self.suggestion_dict = {}
-        self.possible_reveals_dict = {}
-
         if suggestion is None:
             suggestion = set()
         self.number = number
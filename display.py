@@ -0,0 +1,181 @@
+"""
+Rendering of the board (the Card Distribution, the Turn history, the probabilities and suggestions) to the terminal.
+
+Each Turn's board is built into a single frame and written to the terminal with one write.
+The text of every Player and every past Turn is kept from one frame to the next,
+    and only rebuilt when what the Engine knows about that Player or Turn changes.
+On a terminal that understands ANSI escape codes, only the lines of the frame that changed are redrawn,
+    in place, so little more than the new deductions crosses a slow (e.g. SSH) connection.
+Without ANSI escape codes, the board is written out in full and in plain text, one frame after another.
+"""
+import os
+import shutil
+import sys
+from functools import lru_cache
+
+from defs import COLORS, COLORMAP, CARD_TO_CATEGORY, SORT_ORDER, mask_to_cards
+from probability import DealProbabilities
+
+# The ANSI codes of COLORS, for turning them back on after use_ansi(False)
+_ANSI_CODES = {name: code for name, code in vars(COLORS).items() if not name.startswith('_')}
+_COLORMAP_CODES = dict(COLORMAP)
+
+# Rows below the board kept free for the Turn prompts. If the board doesn't fit above them,
+#   the terminal scrolls and the board is redrawn in full rather than line by line
+PROMPT_ROWS = 8
+
+SEPARATOR = '----------------------------------------------------------'
+
+# Colorized card names, by card
+_colored_cards = {}
+
+
+def supports_ansi(stream=None):
+    """
+    Whether ANSI escape codes written to the stream will be understood, i.e. it's a terminal,
+        and neither the NO_COLOR convention nor a 'dumb' TERM says otherwise
+
+    :param stream: Default stdout
+    :return bool:
+    """
+    stream = stream or sys.stdout
+    isatty = getattr(stream, 'isatty', None)
+    return bool(isatty and isatty()) and 'NO_COLOR' not in os.environ and os.environ.get('TERM') != 'dumb'
+
+
+def use_ansi(enabled):
+    """
+    Turn the colors of all the tool's output on or off
+
+    :param bool enabled:
+    """
+    for name, code in _ANSI_CODES.items():
+        setattr(COLORS, name, code if enabled else '')
+    for category, code in _COLORMAP_CODES.items():
+        COLORMAP[category] = code if enabled else ''
+    _colored_cards.clear()
+    color_mask.cache_clear()
+
+
+def colorize(card):
+    """
+    Wrap the card in the ANSI color code of its category
+
+    :param str card:
+    :return str:
+    """
+    try:
+        return _colored_cards[card]
+    except KeyError:
+        colored = _colored_cards[card] = COLORMAP[CARD_TO_CATEGORY[card.lower()]] + card + COLORS.RESET
+        return colored
+
+
+@lru_cache(maxsize=4096)
+def color_mask(mask):
+    """
+    The colorized list of the cards in a bitmask, sorted by category then name
+
+    :param int mask:
+    :return str:
+    """
+    sorted_cards = sorted(mask_to_cards(mask), key=lambda card: (SORT_ORDER[CARD_TO_CATEGORY[card]], card))
+    return '[' + ', '.join([colorize(card) for card in sorted_cards]) + ']'
+
+
+class BoardRenderer(object):
+    """Draws the board on the terminal each Turn, redrawing only what changed since the last Turn"""
+    def __init__(self, out=None, ansi=None, rows=None):
+        """
+        :param out:         Where to draw the board (default stdout)
+        :param bool ansi:   Whether to move the cursor with ANSI escape codes (default if out supports them)
+        :param int rows:    The terminal's height (default looked up on each frame)
+        """
+        # stdout is looked up on each write, so an Engine holding a renderer can still be copied
+        self.out = out
+        self.ansi = supports_ansi(out) if ansi is None else ansi
+        self.rows = rows
+        # The text of each Player and past Turn, with the state it was built from: key -> (state, lines)
+        self._sections = {}
+        # The lines of the board now on the screen, or None if it has to be redrawn in full
+        self._screen = None
+
+    def invalidate(self):
+        """Redraw the whole board next time, e.g. after other output may have scrolled it off the screen"""
+        self._screen = None
+
+    def clear(self):
+        """Clear the terminal (without starting a 'clear' process)"""
+        if self.ansi:
+            self._write('\033[H\033[2J')
+        self._screen = None
+
+    def render(self, eng, probabilities=None, suggestions=False):
+        """
+        Draw the board
+
+        :param Engine eng:
+        :param DealProbabilities probabilities: The card probabilities to show, if any
+        :param bool suggestions:                Whether to show the suggestions the user could make
+        """
+        frame = self.frame(eng, probabilities, suggestions)
+        if not self.ansi:
+            self._write('\n'.join(frame) + '\n')
+            return
+
+        fits = len(frame) + PROMPT_ROWS <= (self.rows or shutil.get_terminal_size().lines)
+        if self._screen is None or not fits:
+            buffer = ['\033[H\033[2J', '\n'.join(frame), '\n']
+            self._screen = frame if fits else None
+        else:
+            buffer = [
+                f"\033[{row};1H{line}\033[K"
+                for row, line in enumerate(frame, start=1)
+                if row > len(self._screen) or self._screen[row - 1] != line
+            ]
+            # Clear what's left of the last board, and the prompts after it
+            buffer.append(f"\033[{len(frame) + 1};1H\033[J")
+            self._screen = frame
+        self._write(''.join(buffer))
+
+    def frame(self, eng, probabilities=None, suggestions=False):
+        """
+        The lines of the board
+
+        :return list[str]:
+        """
+        frame = ['', SEPARATOR, f"\t\t\t{COLORS.WHITE}CARD DISTRIBUTION{COLORS.RESET}"]
+        for player in eng.all_players:
+            frame += self._section(('player', player.number), (player.hand.mask, player.possibles.mask),
+                                   eng.format_player, player)
+        frame += ['', f"{COLORS.GREEN}Past Turns:{COLORS.RESET}"]
+        for turn in eng.past_turns():
+            state = (turn.suggester.number, turn.revealer.number, turn.suggestion.mask, turn.possible_reveals.mask)
+            frame += self._section(('turn', turn.number), state, lambda past_turn: [eng.format_past_turn(past_turn)], turn)
+        # With an analyst, the probabilities and suggestions were worked out in the background (see background.py)
+        analyzed = eng.analyst is not None
+        frame += eng.format_analysis() if analyzed else eng.format_probabilities(probabilities)
+        frame += eng.format_rivals()
+        if eng.accusation:
+            frame += ['', f"** Murder Cards: {color_mask(eng.accusation.mask)}"]
+        if suggestions and analyzed:
+            frame += eng.format_analyzed_suggestions()
+        elif suggestions and isinstance(probabilities, DealProbabilities):
+            frame += eng.format_suggestions(probabilities)
+        if eng.notices:
+            frame += [''] + eng.notices
+        return frame
+
+    def _section(self, key, state, build, item):
+        cached = self._sections.get(key)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        lines = build(item)
+        self._sections[key] = (state, lines)
+        return lines
+
+    def _write(self, text):
+        # One write per frame
+        out = self.out or sys.stdout
+        out.write(text)
+        out.flush()
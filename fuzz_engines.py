@@ -0,0 +1,324 @@
+"""
+Differential fuzzing of the Engine's deductions: play random games through the reference Engine and through
+    a candidate implementation side by side, and check that they know exactly the same after every action.
+
+The games are dealt and played truthfully (see simulator.py), with
+    > passes
+    > suggestions of one of your own cards, so that you're the Revealer
+    > UPDATEs that a Player HAS or LACKS a card, between the Turns
+An implementation is an Engine-like class and the method that runs its deductions, e.g. 'clue_solver:Engine.reprocess_all_turns_for_info'
+    (or one of the names in IMPLEMENTATIONS). The class takes the same arguments as Engine,
+    and must offer the same attributes and methods that game_script.apply_action() uses.
+After every action both know the same when they agree on
+    > every Player's HAND and POSSIBLES
+    > the accusation
+    > the possible reveals of every Turn that isn't totally processed yet (and which Turns those are)
+    > the complaint, if the action led to a contradiction
+
+'provenance' checks the rules that justify the Engine's deductions (see provenance.py) against the Engine's own:
+    it's an Engine that knows only what its Provenance deduces.
+
+A game on which they disagree is shrunk to a short game script that still makes them disagree, ready to replay:
+    the game is cut off after the first action they disagree on, then Turns are turned into passes, UPDATEs are dropped,
+    and whole rounds of passes are dropped, for as long as they still disagree.
+
+    >>> python3 fuzz_engines.py --games 100000 --candidate worklist --processes 8
+"""
+import argparse
+import importlib
+import multiprocessing
+import random
+import time
+
+from clue_solver import Engine
+from defs import ALL_CARDS_MASK, CATEGORIES, CARD_TO_CATEGORY, MAX_PLAYERS
+from game_script import apply_action
+from provenance import ENVELOPE, track
+from simulator import deal, random_suggestion, respond
+
+# Implementations by name, as 'module:Class.method' (see load_implementation())
+IMPLEMENTATIONS = {
+    'rescan': 'clue_solver:Engine.reprocess_all_turns_for_info',
+    'worklist': 'clue_solver:Engine.process_turns_for_info',
+    'matrix': 'propagation:MatrixEngine.process_turns_for_info',
+    'provenance': 'fuzz_engines:ProvenanceEngine.deduce_from_provenance',
+}
+REFERENCE = 'rescan'
+# Games handed to a worker process at a time
+CHUNK_SIZE = 16
+
+
+class ProvenanceEngine(Engine):
+    """An Engine that knows only what its Provenance deduces, to check the two sets of rules against each other"""
+    def deduce_from_provenance(self):
+        """Set every Player's HAND and POSSIBLES, the accusation and the Turns to what the Provenance deduces"""
+        provenance = track(self)
+        if provenance.contradiction:
+            raise provenance.contradiction
+        has, lacks = provenance.has, provenance.lacks
+        for player in self.all_players:
+            player.hand = has[player.number]
+            player.possibles = ALL_CARDS_MASK & ~has[player.number] & ~lacks[player.number]
+        self.accusation = has[ENVELOPE]
+        for turn in self.turn_sequence:
+            if turn.totally_processed:
+                continue
+            revealer = turn.revealer.number
+            # Once the Revealer is known to hold one of the suggested cards, there's nothing more to learn
+            turn.totally_processed = bool(has[revealer] & turn.suggestion.mask)
+            turn.possible_reveals = turn.suggestion.mask & ~lacks[revealer]
+
+
+def load_implementation(spec):
+    """
+    :param str spec:    A name in IMPLEMENTATIONS, or 'module:Class.method'
+    :return tuple[type, str]: The Engine-like class, and the name of the method running its deductions
+    """
+    spec = IMPLEMENTATIONS.get(spec, spec)
+    module_name, _, qualified_name = spec.partition(':')
+    class_name, _, method_name = qualified_name.rpartition('.')
+    if not module_name or not class_name:
+        raise ValueError(f"expected an implementation name or 'module:Class.method', found '{spec}'")
+    return getattr(importlib.import_module(module_name), class_name), method_name
+
+
+def random_script(seed, num_turns=60, pass_rate=0.15, reveal_rate=0.2, update_rate=0.1, num_players=None):
+    """
+    Play a random game, as actions in the format of game_script.ScriptReader.parse_batch()
+
+    :param seed:
+    :param int num_turns:
+    :param float pass_rate:     The chance that a Player passes on their Turn
+    :param float reveal_rate:   The chance that a suggestion includes one of your cards
+    :param float update_rate:   The chance of an UPDATE after each Turn
+    :param int num_players:     Default 3 to MAX_PLAYERS, at random
+    :return dict: The game's setup, as in bench_clue_solver.RECORDED_GAMES, and its 'actions'
+    """
+    rng = random.Random(seed)
+    num_players = num_players or rng.randint(3, MAX_PLAYERS)
+    my_player_number = rng.randint(1, num_players)
+    _, hands = deal(rng, num_players)
+    my_hand = hands[my_player_number]
+
+    actions = []
+    for turn_number in range(1, num_turns + 1):
+        suggester_num = (turn_number % num_players) or num_players
+        if rng.random() < pass_rate:
+            actions.append(('pass', turn_number))
+        else:
+            suggestion = random_suggestion(rng)
+            if suggester_num != my_player_number and rng.random() < reveal_rate:
+                mine = rng.choice(my_hand)
+                suggestion = [mine if CARD_TO_CATEGORY[card] == CARD_TO_CATEGORY[mine] else card
+                              for card in suggestion]
+            revealer_num, shown_card = respond(rng, hands, suggester_num, suggestion)
+            revealed_card = shown_card if suggester_num == my_player_number else None
+            actions.append(('turn', turn_number, suggestion, revealer_num, revealed_card))
+
+        if rng.random() < update_rate:
+            player_num = rng.choice([number for number in hands if number != my_player_number])
+            card = rng.choice([card for category in CATEGORIES for card in category.__members__])
+            update = 'has' if card in hands[player_num] else 'lacks'
+            actions.append(('update', turn_number + 1, player_num, update, card))
+    return dict(num_players=num_players, my_player_number=my_player_number, my_hand=my_hand, actions=actions)
+
+
+def deductions(eng):
+    """
+    Everything the Engine has deduced, independent of the order the deductions were made in
+
+    :param eng: An Engine, or an Engine-like implementation
+    :return tuple:
+    """
+    return (
+        [(player.hand.mask, player.possibles.mask) for player in eng.all_players],
+        eng.accusation.mask,
+        [(turn.totally_processed, 0 if turn.totally_processed else turn.possible_reveals.mask)
+         for turn in eng.turn_sequence],
+    )
+
+
+def play(script, implementation):
+    """
+    Play the script through a fresh instance of the implementation, yielding what it knows after every action
+
+    :param dict script:                         As from random_script()
+    :param tuple[type, str] implementation:     As from load_implementation()
+    :return Iterator[tuple]:    As from deductions(), or ('contradiction', the complaint), after which the game stops
+    """
+    engine_class, method_name = implementation
+    eng = engine_class(script['num_players'], script['my_player_number'], list(script['my_hand']))
+    for action in script['actions']:
+        try:
+            apply_action(eng, action)
+            getattr(eng, method_name)()
+        except ValueError as e:
+            yield 'contradiction', str(e)
+            return
+        yield deductions(eng)
+
+
+def first_disagreement(script, candidate, reference):
+    """
+    :param dict script:             As from random_script()
+    :param tuple[type, str] candidate:
+    :param tuple[type, str] reference:
+    :return int|None: The index of the first action after which they know different things, if any
+    """
+    for index, (candidate_knows, reference_knows) in enumerate(zip(play(script, candidate),
+                                                                   play(script, reference))):
+        if candidate_knows != reference_knows:
+            return index
+    return None
+
+
+def renumber(actions):
+    """
+    :param list[tuple] actions:
+    :return list[tuple]: The actions, with the Turns numbered 1, 2, ... and each UPDATE numbered as the next Turn
+    """
+    renumbered = []
+    turn_number = 1
+    for action in actions:
+        renumbered.append((action[0], turn_number) + action[2:])
+        if action[0] != 'update':
+            turn_number += 1
+    return renumbered
+
+
+def shrink(script, candidate, reference):
+    """
+    Shrink a script the implementations disagree on to one, as short and plain as we can find, that they still do
+
+    :param dict script:                 As from random_script()
+    :param tuple[type, str] candidate:
+    :param tuple[type, str] reference:
+    :return dict: The shrunk script
+    """
+    def disagree(actions):
+        return first_disagreement(dict(script, actions=actions), candidate, reference) is not None
+
+    index = first_disagreement(script, candidate, reference)
+    actions = script['actions'][:index + 1]
+
+    # Turns become passes and UPDATEs are dropped, many at a time and then one at a time
+    chunk = max(1, len(actions) // 2)
+    while True:
+        changed = False
+        start = 0
+        while start < len(actions):
+            plainer = actions[:start]
+            for action in actions[start:start + chunk]:
+                if action[0] == 'turn':
+                    plainer.append(('pass', action[1]))
+                elif action[0] == 'pass':
+                    plainer.append(action)
+            plainer += actions[start + chunk:]
+            if plainer != actions and disagree(plainer):
+                actions = plainer
+                changed = True
+            start += chunk
+        if chunk == 1 and not changed:
+            break
+        chunk = max(1, chunk // 2)
+
+    # Dropping a whole round of passes leaves every later Turn with the same Suggester
+    num_players = script['num_players']
+    start = 0
+    while start < len(actions):
+        block = actions[start:start + num_players]
+        if len(block) == num_players and all(action[0] == 'pass' for action in block):
+            shorter = renumber(actions[:start] + actions[start + num_players:])
+            if disagree(shorter):
+                actions = shorter
+                continue
+        start += 1
+    return dict(script, actions=renumber(actions))
+
+
+def script_lines(script):
+    """
+    :param dict script: As from random_script()
+    :return list[str]: The script as a game script (see game_script.py), e.g. for 'clue_solver.py --script'
+    """
+    lines = [f"players {script['num_players']}", f"me {script['my_player_number']}",
+             f"hand {','.join(script['my_hand'])}"]
+    for action in script['actions']:
+        if action[0] == 'pass':
+            lines.append('pass')
+        elif action[0] == 'update':
+            _, _, player_num, update, card = action
+            lines.append(f"{player_num},{update},{card}")
+        else:
+            _, _, suggestion, revealer_num, revealed_card = action
+            lines.append(f"{','.join(suggestion)},{revealer_num}" + (f":{revealed_card}" if revealed_card else ''))
+    return lines
+
+
+def fuzz_game(args):
+    """
+    Play one random game through both implementations (in a worker process)
+
+    :param tuple args: (seed, candidate spec, reference spec, keyword arguments for random_script())
+    :return tuple[int, int, list[str]|None]: The seed, the number of actions played,
+                                                and the shrunk game script if the implementations disagreed
+    """
+    seed, candidate_spec, reference_spec, options = args
+    candidate, reference = load_implementation(candidate_spec), load_implementation(reference_spec)
+    script = random_script(seed, **options)
+    if first_disagreement(script, candidate, reference) is None:
+        return seed, len(script['actions']), None
+    return seed, len(script['actions']), script_lines(shrink(script, candidate, reference))
+
+
+def fuzz(seeds, candidate=REFERENCE, reference=REFERENCE, processes=None, chunk_size=CHUNK_SIZE, **options):
+    """
+    Fuzz the candidate against the reference on a random game per seed, in a pool of worker processes
+
+    :param Iterable seeds:
+    :param str candidate:   As for load_implementation()
+    :param str reference:   As for load_implementation()
+    :param int processes:   Worker processes (default one per CPU)
+    :param int chunk_size:  Games handed to a worker at a time
+    :param options:         Passed on to random_script()
+    :return Iterator[tuple[int, int, list[str]|None]]: As from fuzz_game(), in no particular order
+    """
+    # Fail fast on a mistyped implementation, rather than in every worker
+    load_implementation(candidate), load_implementation(reference)
+    tasks = ((seed, candidate, reference, options) for seed in seeds)
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(fuzz_game, tasks, chunksize=chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that two implementations of the Engine deduce the same")
+    parser.add_argument('--candidate', default='worklist',
+                        help=f"One of {', '.join(IMPLEMENTATIONS)}, or 'module:Class.method'")
+    parser.add_argument('--reference', default=REFERENCE, help="As for --candidate")
+    parser.add_argument('--games', type=int, default=10000, help="Number of random games to play")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first game")
+    parser.add_argument('--turns', type=int, default=60, help="Turns per game")
+    parser.add_argument('--processes', type=int, help="Worker processes (default one per CPU)")
+    parser.add_argument('--max-failures', type=int, default=5, help="Stop after this many disagreeing games")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games = actions = failures = 0
+    for seed, num_actions, lines in fuzz(range(args.seed, args.seed + args.games), args.candidate,
+                                         args.reference, args.processes, num_turns=args.turns):
+        games += 1
+        actions += num_actions
+        if lines:
+            failures += 1
+            print(f"\nGame {seed}: {args.candidate} and {args.reference} disagree after the last line of")
+            print('\n'.join(lines))
+            if failures >= args.max_failures:
+                break
+    elapsed = time.perf_counter() - start
+    print(f"\nPlayed {games} games ({actions} Turns and UPDATEs) in {elapsed:.2f}s: "
+          f"{actions / elapsed if elapsed else 0:.0f} actions/second, {failures} disagreeing")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
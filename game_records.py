@@ -0,0 +1,234 @@
+"""
+A compact binary format for archived games, and a memory-mapped reader for whole corpora of them.
+
+Every record is 16 bytes, little-endian. A game is a header record followed by one record per Turn or UPDATE,
+    and a corpus file is any number of games, one after another:
+
+    header:     magic b'CG', version, num_players, my_player_number, number of cards in the deck,
+                    number of records that follow (uint16), my HAND (uint64 card bitmask)
+    record:     kind (TURN, PASS, HAS or LACKS), suggester (the Player, for an UPDATE), revealer,
+                    revealed card (index into CARD_ORDER, or -1), Turn number (uint16), padding,
+                    suggestion (uint64 card bitmask)
+
+The reader maps the file into memory rather than reading it, so a corpus of millions of Turns is opened
+    instantly, and its records can be counted and filtered as numpy arrays. Python objects are only built
+    for a game's Turns when the game is replayed.
+
+    >>> python3 game_records.py convert archive/ corpus.cgr      (archived games, as read by analyze_games.py)
+    >>> python3 game_records.py stats corpus.cgr
+"""
+import argparse
+import os
+
+import numpy as np
+
+from defs import CARD_ORDER, NUM_CARDS, cards_to_mask, mask_to_cards
+
+MAGIC = b'CG'
+RECORD_VERSION = 1
+TURN, PASS, HAS, LACKS = 0, 1, 2, 3
+_UPDATE_KINDS = {'has': HAS, 'lacks': LACKS}
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S2'), ('version', 'u1'), ('num_players', 'u1'), ('my_player_number', 'u1'), ('num_cards', 'u1'),
+    ('num_records', '<u2'), ('my_hand', '<u8'),
+])
+RECORD_DTYPE = np.dtype([
+    ('kind', 'u1'), ('suggester', 'u1'), ('revealer', 'u1'), ('revealed', 'i1'), ('number', '<u2'), ('pad', 'V2'),
+    ('suggestion', '<u8'),
+])
+assert HEADER_DTYPE.itemsize == RECORD_DTYPE.itemsize == 16
+
+
+def encode_game(num_players, my_player_number, my_hand, actions):
+    """
+    :param int num_players:
+    :param int my_player_number:
+    :param list[str] my_hand:
+    :param list[tuple] actions: As from game_script.ScriptReader.parse_batch()
+    :return bytes: The game's header and records
+    """
+    if NUM_CARDS > 64:
+        raise ValueError(f"Game records hold decks of at most 64 cards, not {NUM_CARDS}")
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0] = (MAGIC, RECORD_VERSION, num_players, my_player_number, NUM_CARDS, len(actions), cards_to_mask(my_hand))
+
+    rows = []
+    for action in actions:
+        if action[0] == 'pass':
+            rows.append((PASS, 0, 0, -1, action[1], b'', 0))
+        elif action[0] == 'update':
+            _, turn_number, player_num, update, card = action
+            rows.append((_UPDATE_KINDS[update], player_num, 0, CARD_ORDER.index(card), turn_number, b'', 0))
+        else:
+            _, turn_number, suggestion, revealer_num, revealed_card = action
+            suggester_num = (turn_number % num_players) or num_players
+            revealed = CARD_ORDER.index(revealed_card) if revealed_card else -1
+            rows.append((TURN, suggester_num, revealer_num, revealed, turn_number, b'', cards_to_mask(suggestion)))
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    return header.tobytes() + records.tobytes()
+
+
+class GameRecord(object):
+    """One game of a corpus: views onto the mapped file, until the game is decoded"""
+    def __init__(self, header, records):
+        """
+        :param np.void header:          A HEADER_DTYPE record
+        :param np.ndarray records:      The game's RECORD_DTYPE records
+        """
+        self.header = header
+        self.records = records
+
+    @property
+    def num_players(self):
+        return int(self.header['num_players'])
+
+    @property
+    def my_player_number(self):
+        return int(self.header['my_player_number'])
+
+    @property
+    def my_hand(self):
+        return list(mask_to_cards(int(self.header['my_hand'])))
+
+    def actions(self):
+        """
+        :return list[tuple]: The game's Turns and UPDATEs, as from game_script.ScriptReader.parse_batch()
+        """
+        actions = []
+        columns = [self.records[field].tolist()
+                   for field in ('kind', 'suggester', 'revealer', 'revealed', 'number', 'suggestion')]
+        for kind, suggester, revealer, revealed, number, suggestion in zip(*columns):
+            if kind == PASS:
+                actions.append(('pass', number))
+            elif kind == TURN:
+                revealed_card = CARD_ORDER[revealed] if revealed >= 0 else None
+                actions.append(('turn', number, list(mask_to_cards(suggestion)), revealer, revealed_card))
+            else:
+                actions.append(('update', number, suggester, 'has' if kind == HAS else 'lacks', CARD_ORDER[revealed]))
+        return actions
+
+    def replay(self):
+        """
+        Feed the game into a fresh Engine and run its deductions
+
+        :return Engine:
+        """
+        from clue_solver import Engine
+        from game_script import ingest
+
+        eng = Engine(self.num_players, self.my_player_number, self.my_hand)
+        ingest(eng, self.actions())
+        return eng
+
+
+class GameCorpus(object):
+    """A memory-mapped file of game records"""
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        if size % RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a whole number of {RECORD_DTYPE.itemsize}-byte game records")
+        self._raw = (np.memmap(path, dtype=RECORD_DTYPE, mode='r') if size
+                     else np.zeros(0, dtype=RECORD_DTYPE))
+        self._headers = self._raw.view(HEADER_DTYPE)
+        # The index of each game's header record
+        self.offsets = self._index()
+
+    def _index(self):
+        offsets = []
+        position = 0
+        num_cards = None
+        while position < len(self._raw):
+            header = self._headers[position]
+            if header['magic'] != MAGIC or header['version'] != RECORD_VERSION:
+                raise ValueError(f"{self.path}: no game header at record {position}")
+            if num_cards is None:
+                num_cards = int(header['num_cards'])
+                if num_cards != NUM_CARDS:
+                    raise ValueError(f"{self.path} holds games for a deck of {num_cards} cards, not {NUM_CARDS}")
+            offsets.append(position)
+            position += 1 + int(header['num_records'])
+        if position != len(self._raw):
+            raise ValueError(f"{self.path}: the last game is cut short")
+        return np.array(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        offset = int(self.offsets[index])
+        header = self._headers[offset]
+        return GameRecord(header, self._raw[offset + 1:offset + 1 + int(header['num_records'])])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def records(self):
+        """
+        :return np.ndarray: Every Turn and UPDATE record of every game (a copy, without the game headers)
+        """
+        is_record = np.ones(len(self._raw), dtype=bool)
+        is_record[self.offsets] = False
+        return self._raw[is_record]
+
+
+def write_corpus(path, games):
+    """
+    :param str path:
+    :param Iterable[tuple[int, int, list[str], list[tuple]]] games: As from analyze_games.LOADERS
+    :return int: The number of games written
+    """
+    num_games = 0
+    with open(path, 'wb') as f:
+        for game in games:
+            f.write(encode_game(*game))
+            num_games += 1
+    return num_games
+
+
+def convert(directory, path):
+    """
+    Convert every archived game under the directory into a single corpus file.
+    Games that can't be read are skipped, and reported.
+
+    :param str directory:
+    :param str path:
+    :return int: The number of games converted
+    """
+    from analyze_games import LOADERS, find_games
+
+    def games():
+        for game_path in find_games(directory):
+            try:
+                yield LOADERS[os.path.splitext(game_path)[1]](game_path)
+            except Exception as e:
+                print(f"Skipping {game_path}: {type(e).__name__}: {e}")
+
+    return write_corpus(path, games())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert archived games to game records, or summarize a corpus")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help="Convert a directory of archived games into a corpus")
+    convert_parser.add_argument('directory')
+    convert_parser.add_argument('output')
+    stats_parser = subparsers.add_parser('stats', help="Count the games, Turns and passes of a corpus")
+    stats_parser.add_argument('corpus')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        num_games = convert(args.directory, args.output)
+        print(f"Wrote {num_games} games to {args.output}")
+        return
+
+    corpus = GameCorpus(args.corpus)
+    kinds = np.bincount(corpus.records()['kind'], minlength=LACKS + 1)
+    print(f"{args.corpus}: {len(corpus)} games, {kinds[TURN] + kinds[PASS]} Turns "
+          f"({kinds[PASS]} passes), {kinds[HAS] + kinds[LACKS]} UPDATEs")
+
+
+if __name__ == '__main__':
+    main()
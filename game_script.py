@@ -0,0 +1,309 @@
+"""
+Non-interactive play: feed the Engine a whole game script from a file or stdin, instead of typing it in Turn by Turn.
+
+A game script starts with the game's setup, then has one line per Turn or UPDATE, in the same grammar as the prompts.
+Blank lines and lines starting with '#' are ignored.
+
+    players 4
+    me 1
+    hand candlestick,lounge,ballroom,white,scarlet
+    pass
+    plum,revolver,billiard,3
+    mustard,rope,hall,3:rope        <-- You were the Suggester, and Player 3 showed you the rope
+    mustard,pipe,hall,0
+    2,lacks,rope
+    3,has,green
+
+Every line of a batch is checked before any of it reaches the Engine, and the Engine's deductions
+    are run once per batch rather than once per Turn.
+If a batch contradicts what the Engine knows, it's played again a line at a time to find the line that does.
+
+    >>> python3 clue_solver.py --script game.txt
+    >>> cat game.txt | python3 clue_solver.py --script - --batch-size 10 --jsonl
+"""
+import json
+
+from defs import CATEGORIES, ALL_CARDS, CARD_TO_CATEGORY, MAX_PLAYERS, Turn
+
+SETUP_KEYS = ('players', 'me', 'hand')
+
+
+class ScriptError(ValueError):
+    """One or more lines of a game script could not be understood"""
+    def __init__(self, errors):
+        """
+        :param list[tuple[int, str]] errors: (line number, what's wrong with the line)
+        """
+        self.errors = errors
+        super().__init__('\n'.join(f"line {line_number}: {error}" for line_number, error in errors))
+
+
+class ScriptContradiction(ValueError):
+    """A line of a game script contradicts what the Engine knows from the lines before it"""
+    def __init__(self, line_number, error):
+        """
+        :param int line_number:
+        :param ValueError error:    The Engine's complaint
+        """
+        self.line_number = line_number
+        self.error = error
+        super().__init__(f"line {line_number}: Contradicts what the Engine knows: {error}")
+
+
+def numbered_lines(stream):
+    """
+    Yield the meaningful lines of a game script, skipping blank lines and comments
+
+    :param Iterable[str] stream:
+    :return Iterator[tuple[int, str]]: (line number, lower-cased line)
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.split('#', maxsplit=1)[0].strip().lower()
+        if line:
+            yield line_number, line
+
+
+def parse_setup(lines):
+    """
+    Read the setup lines at the start of a game script
+
+    :param Iterator[tuple[int, str]] lines: As from numbered_lines()
+    :return tuple[int, int, list[str]]: The number of Players, your Player number, and your HAND
+    """
+    setup = {}
+    errors = []
+    for key in SETUP_KEYS:
+        line_number, line = next(lines, (None, ''))
+        name, _, value = line.partition(' ')
+        if name != key:
+            errors.append((line_number, f"expected the '{key}' setup line, found '{line}'"))
+            continue
+        setup[key] = value.strip()
+    if errors:
+        raise ScriptError(errors)
+
+    hand = setup['hand'].split(',')
+    if not setup['players'].isdigit() or not 2 <= int(setup['players']) <= MAX_PLAYERS:
+        errors.append((None, f"the number of players must be 2 to {MAX_PLAYERS}, not '{setup['players']}'"))
+    elif not setup['me'].isdigit() or not 1 <= int(setup['me']) <= int(setup['players']):
+        errors.append((None, f"your Player number must be 1 to {setup['players']}, not '{setup['me']}'"))
+    errors += [(None, f"unknown card '{card}' in your hand") for card in hand if card not in ALL_CARDS]
+    if errors:
+        raise ScriptError(errors)
+    return int(setup['players']), int(setup['me']), hand
+
+
+class ScriptReader(object):
+    """
+    Checks the Turn and UPDATE lines of a game script, keeping count of the Turns so far
+        to know whose Turn each line is
+    """
+    def __init__(self, num_players, my_player_number, turn_number=1):
+        self.num_players = num_players
+        self.my_player_number = my_player_number
+        self.turn_number = turn_number
+
+    def parse_batch(self, lines):
+        """
+        Check every line of a batch, reporting every mistake at once
+
+        :param list[tuple[int, str]] lines:  As from numbered_lines()
+        :return list[tuple]: The batch's actions, one of
+                                ('pass', turn number)
+                                ('turn', turn number, suggestion, revealer number, revealed card or None)
+                                ('update', turn number, player number, 'has' or 'lacks', card)
+        """
+        actions = []
+        errors = []
+        turn_number = self.turn_number
+        for line_number, line in lines:
+            try:
+                actions.append(self.parse_line(line, turn_number))
+            except ValueError as e:
+                errors.append((line_number, str(e)))
+            if not self.is_update(line):
+                # Even a mistaken Turn line takes up a Turn, so later lines are checked against the right Suggester
+                turn_number += 1
+        if errors:
+            raise ScriptError(errors)
+        self.turn_number = turn_number
+        return actions
+
+    @staticmethod
+    def is_update(line):
+        fields = line.split(',')
+        return len(fields) == 3 and fields[1] in ('has', 'lacks')
+
+    def parse_line(self, line, turn_number):
+        if line == 'pass':
+            return 'pass', turn_number
+
+        if self.is_update(line):
+            player_num, action, card = line.split(',')
+            self._check_player_number(player_num, allow_nobody=False)
+            self._check_cards([card])
+            return 'update', turn_number, int(player_num), action, card
+
+        details, _, revealed_card = line.partition(':')
+        fields = details.split(',')
+        if len(fields) != len(CATEGORIES) + 1:
+            cards = ','.join(['card'] * len(CATEGORIES))
+            raise ValueError(f"expected 'pass', '{cards},revealer' or 'player,has|lacks,card', found '{line}'")
+        suggestion, revealer_num = fields[:-1], fields[-1]
+        self._check_cards(suggestion)
+        if sorted(CARD_TO_CATEGORY[card] for card in suggestion) != sorted(category.__name__ for category in CATEGORIES):
+            raise ValueError(f"a suggestion needs one card from each category, not {', '.join(suggestion)}")
+        self._check_player_number(revealer_num, allow_nobody=True)
+
+        suggester_num = (turn_number % self.num_players) or self.num_players
+        revealer_num = int(revealer_num)
+        if revealer_num == suggester_num:
+            raise ValueError(f"Player {suggester_num} can't reveal a card for their own suggestion on Turn {turn_number}")
+        if revealed_card:
+            if suggester_num != self.my_player_number:
+                raise ValueError(f"Turn {turn_number} is Player {suggester_num}'s, so you weren't shown a card")
+            if revealed_card not in suggestion:
+                raise ValueError(f"'{revealed_card}' is not one of the suggested cards")
+        elif suggester_num == self.my_player_number and revealer_num:
+            raise ValueError(f"Turn {turn_number} is yours: add the card you were shown, e.g. '{line}:{suggestion[0]}'")
+        return 'turn', turn_number, suggestion, revealer_num, revealed_card or None
+
+    def _check_player_number(self, player_num, allow_nobody):
+        lowest = 0 if allow_nobody else 1
+        if not player_num.isdigit() or not lowest <= int(player_num) <= self.num_players:
+            raise ValueError(f"the Player number must be {lowest} to {self.num_players}, not '{player_num}'")
+
+    @staticmethod
+    def _check_cards(cards):
+        unknown = [card for card in cards if card not in ALL_CARDS]
+        if unknown:
+            raise ValueError(f"unknown card(s): {', '.join(unknown)}")
+
+
+def ingest(eng, actions):
+    """
+    Feed a batch of checked actions into the Engine, then run the Engine's deductions once
+
+    :param Engine eng:
+    :param list[tuple] actions: As from ScriptReader.parse_batch()
+    """
+    for action in actions:
+        apply_action(eng, action)
+    eng.process_turns_for_info()
+
+
+def find_contradiction(eng, played):
+    """
+    Play the lines one at a time, running the Engine's deductions after each, up to the first that contradicts them
+
+    :param Engine eng:                          A new Engine
+    :param list[tuple[int, tuple]] played:      (line number, action), of lines that contradict the Engine together
+    :return ScriptContradiction:
+    """
+    for line_number, action in played:
+        try:
+            apply_action(eng, action)
+            eng.process_turns_for_info()
+        except ValueError as e:
+            return ScriptContradiction(line_number, e)
+    raise ValueError("the lines played one at a time don't contradict the Engine")
+
+
+def apply_action(eng, action):
+    """
+    Add a checked Turn to the Engine's Turn sequence, or apply a checked UPDATE, without running the deductions
+
+    :param Engine eng:
+    :param tuple action:    As from ScriptReader.parse_batch()
+    """
+    if action[0] == 'update':
+        _, _, player_num, update, card = action
+        eng.apply_update(player_num, update, card)
+        return
+    if action[0] == 'pass':
+        turn = Turn(number=action[1], is_pass=True)
+    else:
+        _, turn_number, suggestion, revealer_num, revealed_card = action
+        suggester_num = (turn_number % eng.num_players) or eng.num_players
+        turn = Turn(
+            number=turn_number,
+            suggestion=suggestion,
+            suggester=eng.get_player(suggester_num),
+            revealer=eng.get_player(revealer_num),
+        )
+        if revealed_card:
+            turn.revealed_card = revealed_card
+    eng.one_time_turn_deductions(turn)
+    eng.turn_sequence.append(turn)
+
+
+def engine_state(eng):
+    """
+    What the Engine knows, as a JSON-friendly dict
+
+    :param Engine eng:
+    :return dict:
+    """
+    return {
+        'turns': len(eng.turn_sequence) - 1,
+        'players': {
+            str(player.number): {'hand': sorted(player.hand), 'possibles': sorted(player.possibles)}
+            for player in eng.all_players
+        },
+        'accusation': sorted(eng.accusation),
+        'ready_to_accuse': eng.ready_to_accuse(),
+    }
+
+
+def batches(lines, batch_size=None):
+    """Split the lines into lists of batch_size lines (a single batch of them all if batch_size is None)"""
+    if batch_size is None:
+        yield list(lines)
+        return
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_script(stream, batch_size=None, jsonl=False, out=None, profiler=None):
+    """
+    Play a game script through a new Engine, one batch of lines at a time
+
+    :param Iterable[str] stream:    The game script, e.g. an open file or sys.stdin
+    :param int batch_size:          Lines per batch (default the whole script, checked before any is played)
+    :param bool jsonl:              Write what the Engine knows as a line of JSON after every batch,
+                                        rather than showing the final Card Distribution
+    :param out:                     Where to write the JSON lines (default stdout)
+    :param DeductionProfiler profiler:  Instruments the Engine's deductive rules, if given
+    :return Engine:
+    """
+    from clue_solver import Engine
+
+    lines = numbered_lines(stream)
+    num_players, my_player_number, my_hand = parse_setup(lines)
+    eng = Engine(num_players, my_player_number, my_hand)
+    if profiler:
+        profiler.attach(eng)
+    reader = ScriptReader(num_players, my_player_number, turn_number=len(eng.turn_sequence))
+    # (line number, action) of every line played so far
+    played = []
+
+    for batch in batches(lines, batch_size):
+        actions = reader.parse_batch(batch)
+        played += zip((line_number for line_number, _ in batch), actions)
+        try:
+            ingest(eng, actions)
+        except ValueError:
+            raise find_contradiction(Engine(num_players, my_player_number, my_hand), played) from None
+        if jsonl:
+            print(json.dumps(engine_state(eng), separators=(',', ':')), file=out, flush=True)
+
+    if not jsonl:
+        eng.print_player_hands(len(eng.turn_sequence))
+        eng.offer_turn_intel(ready=eng.ready_to_accuse())
+    return eng
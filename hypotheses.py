@@ -0,0 +1,155 @@
+"""
+"What if?" questions: what would the Engine deduce if a Player HAD (or LACKED) a card, without changing the real game.
+
+Each question is asked of a fork of the Engine's state. The fork shares the Turn sequence with the real game,
+    and only records what the deductions could change (every Player's HAND and POSSIBLES, and the open Turns,
+    as for UNDO), so it costs about as much as the deductions one Turn makes.
+The hypothetical facts are applied, the deductions are run, and the Engine is put back the way it was.
+
+A hypothesis that leads to a contradiction can't be true, so asking about every Player and every card
+    in a batch finds the cards that are forced: e.g. if Player 2 HAVING the rope contradicts what we know,
+    Player 2 must LACK the rope.
+
+    >>> what_if(eng, [(2, 'has', 'rope')]).describe()
+    >>> forced_facts(eng)
+"""
+from defs import CATEGORY_MASKS, CardSet, mask_to_cards
+
+
+class WhatIf(object):
+    """What the Engine would deduce from some hypothetical facts"""
+    def __init__(self, facts):
+        """
+        :param list[tuple[int, str, str]] facts: (Player number, 'has' or 'lacks', card)
+        """
+        self.facts = facts
+        # What about the facts is impossible, or None if they agree with everything known so far
+        self.contradiction = None
+        # The cards each Player would be known to HAVE, and to LACK, that aren't known now (by Player number)
+        self.new_hands = {}
+        self.new_lacks = {}
+        # The Murder Cards that would be known, that aren't known now
+        self.new_accusation = CardSet()
+
+    def describe(self):
+        """
+        :return list[str]: The deductions (or the contradiction), one line each
+        """
+        if self.contradiction:
+            return [f"Contradiction: {self.contradiction}"]
+        lines = [f"Player {number} would have {sorted(cards)}" for number, cards in self.new_hands.items()]
+        lines += [f"Player {number} would lack {sorted(cards)}" for number, cards in self.new_lacks.items()]
+        if self.new_accusation:
+            lines.append(f"Murder Cards would include {sorted(self.new_accusation)}")
+        return lines or ["Nothing new would be deduced"]
+
+
+def contradiction(eng):
+    """
+    Find anything impossible about what the Engine knows
+
+    :param Engine eng:
+    :return str|None: What's impossible, if anything
+    """
+    accusation = eng.accusation.mask
+    for category_name, category_mask in CATEGORY_MASKS.items():
+        if (accusation & category_mask).bit_count() > 1:
+            return f"more than one {category_name} would be a Murder Card"
+    placed = accusation
+    for player in eng.all_players:
+        doubly_placed = player.hand.mask & placed
+        if doubly_placed:
+            return f"{', '.join(mask_to_cards(doubly_placed))} would be in two places at once"
+        placed |= player.hand.mask
+        if len(player.hand) > player.hand_size:
+            return f"Player {player.number} would hold more than {player.hand_size} cards"
+        if len(player.hand) + len(player.possibles) < player.hand_size:
+            return f"Player {player.number} would hold fewer than {player.hand_size} cards"
+    return None
+
+
+def _test(eng, facts, snapshot):
+    """Apply the facts to the Engine, run its deductions and compare, then restore the Engine from the snapshot"""
+    result = WhatIf(facts)
+    before = [(player.hand.mask, player.possibles.mask) for player in eng.all_players]
+    accusation = eng.accusation.mask
+    try:
+        for player_num, action, card in facts:
+            player = eng.get_player(player_num)
+            if action == 'has' and card not in player.hand and card not in player.possibles:
+                result.contradiction = f"Player {player_num} can't have {card}"
+                return result
+            if action == 'lacks' and card in player.hand:
+                result.contradiction = f"Player {player_num} has {card}"
+                return result
+            eng.apply_update(player_num, action, card)
+        try:
+            eng.process_turns_for_info()
+        except ValueError as e:
+            result.contradiction = str(e)
+            return result
+        result.contradiction = contradiction(eng)
+        if result.contradiction:
+            return result
+
+        for player, (hand, possibles) in zip(eng.all_players, before):
+            if player.hand.mask & ~hand:
+                result.new_hands[player.number] = CardSet.from_mask(player.hand.mask & ~hand)
+            lacks = possibles & ~player.possibles.mask & ~player.hand.mask
+            if lacks:
+                result.new_lacks[player.number] = CardSet.from_mask(lacks)
+        result.new_accusation = CardSet.from_mask(eng.accusation.mask & ~accusation)
+        return result
+    finally:
+        snapshot.restore(eng)
+
+
+def fork(eng):
+    """
+    Record the Engine's state, to put it back after asking what if
+
+    :param Engine eng:
+    :return EngineSnapshot:
+    """
+    from clue_solver import EngineSnapshot
+
+    return EngineSnapshot(eng, eng._open_turns())
+
+
+def what_if(eng, facts):
+    """
+    What would the Engine deduce if the facts were true? The Engine is left as it was.
+
+    :param Engine eng:
+    :param list[tuple[int, str, str]] facts:   (Player number, 'has' or 'lacks', card)
+    :return WhatIf:
+    """
+    return _test(eng, list(facts), fork(eng))
+
+
+def what_ifs(eng, hypotheses):
+    """
+    Ask what if of a batch of hypotheses, each on its own fork of the same Engine state
+
+    :param Engine eng:
+    :param Iterable[list[tuple[int, str, str]]] hypotheses:
+    :return list[WhatIf]:
+    """
+    snapshot = fork(eng)
+    return [_test(eng, list(facts), snapshot) for facts in hypotheses]
+
+
+def forced_facts(eng):
+    """
+    Find every card a Player must HAVE or LACK, because supposing otherwise leads to a contradiction
+
+    :param Engine eng:
+    :return list[tuple[int, str, str, str]]: (Player number, 'has' or 'lacks', card, the contradiction otherwise)
+    """
+    hypotheses = [(player.number, action, card)
+                  for player in eng.other_players for card in player.possibles for action in ('has', 'lacks')]
+    forced = []
+    for (player_num, action, card), result in zip(hypotheses, what_ifs(eng, [[fact] for fact in hypotheses])):
+        if result.contradiction:
+            forced.append((player_num, 'lacks' if action == 'has' else 'has', card, result.contradiction))
+    return forced
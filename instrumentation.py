@@ -0,0 +1,175 @@
+"""
+Instrumentation of the Engine's deductive rules, for finding out which rules do the work and where the time goes.
+
+A DeductionProfiler attached to an Engine records, for every rule:
+    calls, hits (calls that produced new information) and wall time,
+    both in total and for each call of process_turns_for_info(), along with how many rounds
+    the deductions took to settle.
+Nothing is recorded, and nothing slows down, unless a profiler is attached: attaching wraps
+    the Engine's rule methods on that one Engine instance.
+
+    >>> python3 clue_solver.py --profile trace.json        (Chrome / Perfetto trace, plus the counters)
+    >>> python3 clue_solver.py --profile trace.folded      (folded stacks, e.g. for flamegraph.pl)
+"""
+import json
+import time
+
+# The deductive rules that are counted and timed
+RULES = ('process_revealed_turn', 'deduce_murder_cards', 'check_players_hand_size', 'remove_set_from_possibles')
+# The deduction passes, each timed as a whole
+PASSES = ('process_turns_for_info', 'reprocess_all_turns_for_info')
+
+
+class RuleStats(object):
+    """Counters for one rule"""
+    __slots__ = ('calls', 'hits', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {'calls': self.calls, 'hits': self.hits, 'ms': self.seconds * 1000}
+
+
+class DeductionProfiler(object):
+    """Counts and times the deductive rules of the Engines it is attached to"""
+    def __init__(self):
+        self.rules = {name: RuleStats() for name in RULES}
+        # One record per deduction pass: its Turn count, rounds, wall time and per-rule counters
+        self.passes = []
+        # Chrome trace events, one per rule call
+        self.events = []
+        # Self time in microseconds, by call stack ('outer;inner'), for flame graphs
+        self.folded = {}
+        self._stack = []
+        self._child_seconds = []
+        self._current_pass = None
+        self._epoch = time.perf_counter()
+
+    def attach(self, eng):
+        """
+        Start instrumenting the Engine's rules
+
+        :param Engine eng:
+        :return Engine: eng
+        """
+        for name in RULES:
+            setattr(eng, name, self._wrap_rule(name, getattr(eng, name)))
+        for name in PASSES:
+            setattr(eng, name, self._wrap_pass(eng, name, getattr(eng, name)))
+        return eng
+
+    @staticmethod
+    def detach(eng):
+        """Stop instrumenting the Engine, restoring its own methods"""
+        for name in RULES + PASSES:
+            eng.__dict__.pop(name, None)
+
+    def _wrap_rule(self, name, func):
+        if name == 'remove_set_from_possibles':
+            # Hits when any Player's POSSIBLES actually shrank
+            def rule(players, cards):
+                before = [player.possibles.mask for player in players]
+                self._enter(name)
+                try:
+                    func(players, cards)
+                finally:
+                    elapsed = self._exit(name)
+                after = [player.possibles.mask for player in players]
+                self._count(name, elapsed, before != after)
+        else:
+            def rule(*args, **kwargs):
+                self._enter(name)
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    elapsed = self._exit(name)
+                self._count(name, elapsed, bool(result))
+                return result
+        return rule
+
+    def _wrap_pass(self, eng, name, func):
+        def deduction_pass(*args, **kwargs):
+            outer_pass = self._current_pass
+            self._current_pass = {
+                'pass': name,
+                'turns': len(eng.turn_sequence) - 1,
+                'rules': {rule: RuleStats() for rule in RULES},
+            }
+            self._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = self._exit(name)
+                record = self._current_pass
+                record['rounds'] = eng.last_deduction_rounds
+                record['ms'] = elapsed * 1000
+                record['rules'] = {rule: stats.as_dict() for rule, stats in record['rules'].items() if stats.calls}
+                self.passes.append(record)
+                self._current_pass = outer_pass
+        return deduction_pass
+
+    def _enter(self, name):
+        self._stack.append((name, time.perf_counter()))
+        self._child_seconds.append(0.0)
+
+    def _exit(self, name):
+        """Close the innermost timed call, recording it, and return its wall time in seconds"""
+        stack_key = ';'.join(frame for frame, _ in self._stack)
+        _, start = self._stack.pop()
+        end = time.perf_counter()
+        elapsed = end - start
+        child_seconds = self._child_seconds.pop()
+        if self._child_seconds:
+            self._child_seconds[-1] += elapsed
+
+        self.folded[stack_key] = self.folded.get(stack_key, 0) + (elapsed - child_seconds) * 1e6
+        self.events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                            'ts': (start - self._epoch) * 1e6, 'dur': elapsed * 1e6})
+        return elapsed
+
+    def _count(self, name, elapsed, hit):
+        for stats in (self.rules[name], self._current_pass['rules'][name] if self._current_pass else None):
+            if stats is not None:
+                stats.calls += 1
+                stats.hits += hit
+                stats.seconds += elapsed
+        self.events[-1]['args'] = {'hit': hit}
+
+    def summary(self):
+        """
+        :return dict: The totals for each rule and for the deduction passes
+        """
+        return {
+            'rules': {name: stats.as_dict() for name, stats in self.rules.items()},
+            'passes': len(self.passes),
+            'rounds': sum(record['rounds'] for record in self.passes),
+            'pass_ms': sum(record['ms'] for record in self.passes),
+        }
+
+    def write_json(self, path):
+        """Write the counters, each deduction pass, and a Chrome trace (chrome://tracing, Perfetto) of every call"""
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'passes': self.passes, 'traceEvents': self.events}, f)
+
+    def write_folded(self, path):
+        """Write the self time (microseconds) of each call stack in the folded format read by flamegraph.pl"""
+        with open(path, 'w') as f:
+            for stack, microseconds in sorted(self.folded.items()):
+                f.write(f"{stack} {round(microseconds)}\n")
+
+    def write(self, path):
+        """Write a folded-stacks file if path ends in '.folded', and a JSON trace otherwise"""
+        if path.endswith('.folded'):
+            self.write_folded(path)
+        else:
+            self.write_json(path)
+
+    def print_summary(self, file=None):
+        summary = self.summary()
+        print(f"{summary['passes']} deduction passes, {summary['rounds']} rounds, {summary['pass_ms']:.2f}ms", file=file)
+        print(f"   {'rule':<28}{'calls':>8}{'hits':>8}{'ms':>10}", file=file)
+        for name, stats in summary['rules'].items():
+            print(f"   {name:<28}{stats['calls']:>8}{stats['hits']:>8}{stats['ms']:>10.3f}", file=file)
@@ -0,0 +1,138 @@
+"""
+The game journal: an append-only record of a game, written as it is played.
+
+Each accepted Turn and each UPDATE is appended to the journal as one line of JSON,
+    and flushed to disk before the game moves on, so a game survives the process being killed.
+Writing a record costs the same on Turn 60 as on Turn 1.
+
+Records only hold card names and Player numbers, never pickled objects,
+    so a journal can be replayed by any version of the Engine that reads its record version.
+
+    {"v":1,"type":"setup","num_players":4,"my_player_number":1,"my_hand":["rope","hall","white","knife","study"]}
+    {"v":1,"type":"turn","number":1,"pass":true}
+    {"v":1,"type":"turn","number":2,"suggestion":["plum","rope","hall"],"suggester":2,"revealer":3,"revealed":null}
+    {"v":1,"type":"update","number":3,"player":2,"action":"lacks","card":"rope"}
+    {"v":1,"type":"undo","steps":1}
+"""
+import json
+import os
+
+from defs import Turn
+
+JOURNAL_FILE = 'game_journal.jsonl'
+JOURNAL_VERSION = 1
+
+
+class GameJournal(object):
+    """Appends records to a game journal file, syncing each one to disk"""
+    def __init__(self, path=JOURNAL_FILE, new_game=True):
+        """
+        :param str path:
+        :param bool new_game:   Start a fresh journal, rather than appending to an existing one
+        """
+        self.path = path
+        self._file = open(path, 'w' if new_game else 'a', encoding='utf-8')
+
+    def record_setup(self, num_players, my_player_number, my_hand):
+        self._append(dict(type='setup', num_players=num_players,
+                          my_player_number=my_player_number, my_hand=list(my_hand)))
+
+    def record_turn(self, turn: Turn):
+        if turn.is_pass:
+            self._append({'type': 'turn', 'number': turn.number, 'pass': True})
+            return
+        self._append(dict(
+            type='turn',
+            number=turn.number,
+            suggestion=sorted(turn.suggestion),
+            suggester=turn.suggester.number,
+            revealer=turn.revealer.number,
+            revealed=turn.revealed_card if turn.suggester.is_me else None,
+        ))
+
+    def record_update(self, turn_number, player_num, action, card):
+        self._append(dict(type='update', number=turn_number, player=player_num, action=action, card=card))
+
+    def record_undo(self, steps):
+        self._append(dict(type='undo', steps=steps))
+
+    def record_redo(self):
+        self._append(dict(type='redo'))
+
+    def close(self):
+        self._file.close()
+
+    def _append(self, record: dict):
+        self._file.write(json.dumps(dict(v=JOURNAL_VERSION, **record), separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def read_journal(path=JOURNAL_FILE):
+    """
+    Stream the records of a game journal.
+    A final line cut short (the process was killed while writing it) is skipped.
+
+    :param str path:
+    :return Iterator[dict]:
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.endswith('\n'):
+                return
+            record = json.loads(line)
+            if record.get('v') != JOURNAL_VERSION:
+                raise ValueError(f"{path}:{line_number}: unsupported journal record version {record.get('v')}")
+            yield record
+
+
+def replay_journal(path=JOURNAL_FILE):
+    """
+    Rebuild the Engine from a game journal, applying every Turn and UPDATE in the order they were recorded
+
+    :param str path:
+    :return Engine:
+    """
+    from clue_solver import Engine
+
+    records = read_journal(path)
+    setup = next(records, None)
+    if setup is None or setup['type'] != 'setup':
+        raise ValueError(f"{path} does not start with a game setup record")
+    eng = Engine(setup['num_players'], setup['my_player_number'], setup['my_hand'])
+
+    for record in records:
+        if record['type'] == 'update':
+            eng.checkpoint(f"Turn {record['number']}: UPDATE Player {record['player']} {record['action']} {record['card']}")
+            eng.apply_update(record['player'], record['action'], record['card'])
+            continue
+        if record['type'] == 'undo':
+            eng.undo(record['steps'])
+            continue
+        if record['type'] == 'redo':
+            eng.redo()
+            continue
+        if record['type'] != 'turn':
+            raise ValueError(f"{path}: unknown journal record type '{record['type']}'")
+        if record['number'] != len(eng.turn_sequence):
+            raise ValueError(f"{path}: expected Turn {len(eng.turn_sequence)}, found Turn {record['number']}")
+        if record.get('pass'):
+            suggester_num = (record['number'] % eng.num_players) or eng.num_players
+            eng.checkpoint(f"Turn {record['number']}: Player {suggester_num} passed")
+            turn = Turn(number=record['number'], is_pass=True)
+        else:
+            eng.checkpoint(f"Turn {record['number']}: Player {record['suggester']} suggested "
+                           f"{','.join(record['suggestion'])},{record['revealer']}")
+            turn = Turn(
+                number=record['number'],
+                suggestion=record['suggestion'],
+                suggester=eng.get_player(record['suggester']),
+                revealer=eng.get_player(record['revealer']),
+            )
+            if record['revealed']:
+                turn.revealed_card = record['revealed']
+        eng.one_time_turn_deductions(turn)
+        eng.turn_sequence.append(turn)
+
+    eng.process_turns_for_info()
+    return eng
@@ -0,0 +1,137 @@
+"""
+Load test for service.py: play many simulated games against the service at once,
+    one HTTP request per Turn, and report sessions/second and request latency.
+
+    >>> python3 load_test_service.py --sessions 200 --concurrency 20
+    >>> python3 load_test_service.py --url 127.0.0.1:8080      (test a service that's already running)
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from service import ClueService
+from simulator import percentile, random_game
+
+
+class Client(object):
+    """A keep-alive HTTP/JSON connection to the service"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        # Seconds taken by each request
+        self.latencies = []
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, body=None):
+        """
+        :return tuple[int, dict]: The HTTP status and JSON response
+        """
+        payload = json.dumps(body).encode() if body is not None else b''
+        start = time.perf_counter()
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: clue\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        response = json.loads(await self.reader.readexactly(length))
+        self.latencies.append(time.perf_counter() - start)
+        return status, response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_session(client: Client, seed, num_turns):
+    """Play one simulated game through the service, Turn by Turn"""
+    game = random_game(seed, num_turns=num_turns)
+    status, response = await client.request('POST', '/games', {
+        'num_players': game['num_players'], 'my_player_number': game['my_player_number'], 'my_hand': game['my_hand'],
+    })
+    if status != 201:
+        raise RuntimeError(f"Creating game {seed} failed: {response}")
+    path = f"/games/{response['game_id']}"
+    for line in game['turns']:
+        status, response = await client.request('POST', f"{path}/turns", {'lines': [line]})
+        if status != 200:
+            raise RuntimeError(f"Game {seed}, '{line}' failed: {response}")
+    await client.request('GET', path)
+    await client.request('DELETE', path)
+
+
+async def run_load_test(host, port, sessions=200, concurrency=20, num_turns=60):
+    """
+    Play the sessions with the given number of clients playing at once
+
+    :return dict: The headline numbers, also logged to the console
+    """
+    clients = [await Client.connect(host, port) for _ in range(concurrency)]
+    queue = asyncio.Queue()
+    for seed in range(sessions):
+        queue.put_nowait(seed)
+
+    async def client_loop(client):
+        while not queue.empty():
+            await play_session(client, queue.get_nowait(), num_turns)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop(client) for client in clients])
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    report = {
+        'sessions': sessions,
+        'sessions_per_second': sessions / elapsed,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'latency_ms_p50': percentile(latencies, 0.50) * 1000,
+        'latency_ms_p99': percentile(latencies, 0.99) * 1000,
+        'latency_ms_max': latencies[-1] * 1000,
+    }
+    print(f"{sessions} sessions of {num_turns} Turns, {concurrency} at a time, in {elapsed:.2f}s: "
+          f"{report['sessions_per_second']:.1f} sessions/second, {report['requests_per_second']:.0f} requests/second")
+    print(f"  Request latency: p50 {report['latency_ms_p50']:.2f}ms, p99 {report['latency_ms_p99']:.2f}ms, "
+          f"max {report['latency_ms_max']:.2f}ms")
+    return report
+
+
+async def main_async(args):
+    if args.url:
+        host, _, port = args.url.partition(':')
+        return await run_load_test(host, int(port or 8080), args.sessions, args.concurrency, args.turns)
+
+    service = ClueService(args.workers)
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await run_load_test('127.0.0.1', port, args.sessions, args.concurrency, args.turns)
+    finally:
+        server.close()
+        service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Clue Solver service")
+    parser.add_argument('--url', help="host:port of a running service (default: start one in this process)")
+    parser.add_argument('--workers', type=int, help="Worker processes of the service started here")
+    parser.add_argument('--sessions', type=int, default=200, help="Games to play")
+    parser.add_argument('--concurrency', type=int, default=20, help="Games played at once")
+    parser.add_argument('--turns', type=int, default=60, help="Turns per game")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+How close each rival is to accusing: a model, per opponent, of what that Player can have deduced so far.
+
+Every Player sees the same public information about a Turn: who suggested what, who had none of it,
+    and who showed a card. Each Turn's public facts are worked out once (see provenance.turn_input())
+    and shared by every rival's model. On top of them, each rival's model gets what only that rival saw,
+    as far as the Engine can tell:
+    > the rival's own HAND, i.e. everything the Engine knows the rival HAS or LACKS
+    > the card shown to the rival on their own suggestion, once the Engine has worked out which it was
+        (or when you showed it, and only one of the suggested cards was yours to show)
+The models apply the Engine's rules (see provenance.py), so each estimate is a lower bound:
+    a rival knows at least this much, and maybe more.
+
+The models are brought up to date on every Turn by adding only the new inputs, so the cost of a Turn
+    is one settling of each rival's model, whatever Turn of the game it is.
+
+    >>> rivals = Perspectives()
+    >>> rivals.update(eng)
+    >>> rivals.describe()
+"""
+from defs import ALL_CARDS_MASK, CARD_BITS, CATEGORY_MASKS
+from provenance import ENVELOPE, HAS, LACKS, Input, Provenance, engine_keys, turn_input
+
+
+class Perspective(object):
+    """What one rival can have deduced"""
+    def __init__(self, player_num, num_players, hand_sizes):
+        """
+        :param int player_num:
+        :param int num_players:
+        :param dict[int, int] hand_sizes:   Every Player's hand size, by number
+        """
+        self.player_num = player_num
+        self.knowledge = Provenance(num_players, hand_sizes)
+        # What the rival knows of their own HAND, as far as the Engine knows, already added to the model
+        self.own_hand = 0
+        self.own_lacks = 0
+        # The rival's suggestions whose shown card hasn't been added to the model yet
+        self.unseen_reveals = []
+
+    def murder_candidates(self):
+        """
+        :return dict[str, int]: How many cards of each category could still be the Murder Card, as far as the rival knows
+        """
+        in_envelope = ALL_CARDS_MASK & ~self.knowledge.lacks[ENVELOPE]
+        return {name: (in_envelope & category_mask).bit_count() for name, category_mask in CATEGORY_MASKS.items()}
+
+    def ready_to_accuse(self):
+        return all(candidates == 1 for candidates in self.murder_candidates().values())
+
+    def progress(self):
+        """
+        :return float: From 0, knowing nothing of the Murder Cards, to 1, ready to accuse
+        """
+        candidates = self.murder_candidates()
+        return sum((CATEGORY_MASKS[name].bit_count() - left) / (CATEGORY_MASKS[name].bit_count() - 1)
+                   for name, left in candidates.items()) / len(candidates)
+
+    def _update_private(self, eng):
+        """
+        :param Engine eng:
+        :return list[Input]: What the rival saw that the others didn't, since the last update
+        """
+        player = eng.get_player(self.player_num)
+        hand = player.hand.mask & ~self.own_hand
+        lacks = ALL_CARDS_MASK & ~player.hand.mask & ~player.possibles.mask & ~self.own_lacks
+        inputs = []
+        if hand or lacks:
+            self.own_hand |= hand
+            self.own_lacks |= lacks
+            inputs.append(Input(f"Player {self.player_num}'s own hand",
+                                [(self.player_num, hand, HAS), (self.player_num, lacks, LACKS)]))
+
+        unseen = []
+        for turn in self.unseen_reveals:
+            shown_card = shown_to_suggester(eng, turn)
+            if shown_card:
+                inputs.append(Input(f"Turn {turn.number}: Player {self.player_num} was shown {shown_card}",
+                                    [(turn.revealer.number, CARD_BITS[shown_card], HAS)]))
+            elif not turn.totally_processed:
+                # Otherwise the Engine will never work out which card it was
+                unseen.append(turn)
+        self.unseen_reveals = unseen
+        return inputs
+
+
+def shown_to_suggester(eng, turn):
+    """
+    :param Engine eng:
+    :param Turn turn:
+    :return str|None: The card the Revealer showed the Suggester, if the Engine knows it
+    """
+    if turn.revealed_card:
+        return turn.revealed_card
+    if turn.revealer.is_me and len(turn.possible_reveals) == 1:
+        # You showed the only suggested card you have
+        return next(iter(turn.possible_reveals))
+    return None
+
+
+class Perspectives(object):
+    """A Perspective for every rival, kept up to date with the Engine"""
+    def __init__(self):
+        self.rivals: dict[int, Perspective] = {}
+        # The Engine inputs (see provenance.engine_keys()) the models are up to date with
+        self.keys: list = []
+
+    def update(self, eng):
+        """
+        Add the Turns since the last update to every rival's model, along with whatever else each rival saw.
+        The models are only rebuilt when Turns or UPDATEs were undone.
+
+        :param Engine eng:
+        """
+        keys = engine_keys(eng)
+        if not self.rivals or self.keys != keys[:len(self.keys)]:
+            hand_sizes = {player.number: player.hand_size for player in eng.all_players}
+            self.rivals = {player.number: Perspective(player.number, eng.num_players, hand_sizes)
+                           for player in eng.other_players}
+            self.keys = []
+
+        # The public facts of each new Turn, worked out once for every rival
+        new_turns = [key for key in keys[len(self.keys):] if not isinstance(key, (str, tuple))]
+        public = [turn_input(eng, turn) for turn in new_turns]
+        self.keys = keys
+
+        for rival in self.rivals.values():
+            rival.unseen_reveals += [turn for turn in new_turns
+                                     if turn.suggester.number == rival.player_num and turn.revealer.number]
+            rival.knowledge.add(public + rival._update_private(eng))
+
+    def describe(self):
+        """
+        :return list[str]: Each rival's progress toward accusing, one line each
+        """
+        lines = []
+        for number, rival in self.rivals.items():
+            if rival.knowledge.contradiction:
+                lines.append(f"   Player {number}: can't tell ({rival.knowledge.contradiction.reason})")
+                continue
+            candidates = rival.murder_candidates()
+            if rival.ready_to_accuse():
+                status = "could accuse now"
+            else:
+                status = ', '.join(f"{left} {name}s" for name, left in candidates.items() if left > 1) + " left"
+            lines.append(f"   Player {number}: {rival.progress():.0%} ({status})")
+        return lines
@@ -0,0 +1,613 @@
+"""
+This module estimates how likely each card is to be in each Player's HAND, or to be one of the Murder Cards,
+    given everything the solver Engine has deduced so far.
+
+Every deal of the cards that agrees with the Engine's knowledge is considered equally likely.
+A deal agrees with the Engine's knowledge when:
+    > every Player holds exactly .hand_size cards, all of them from their HAND or POSSIBLES
+    > the Murder envelope holds exactly one card per category, including every card of the accusation
+    > the Revealer of every unprocessed Turn holds at least one of that Turn's possible reveals
+
+The deals can be counted without listing them (count_deals(), fast from Turn 1 on in small games),
+    listed one by one (enumerate_deals(), fast once most cards are pinned down), or sampled (see sampler.py).
+
+    >>> count_deals(DealConstraints.from_engine(eng)).probability(0, 'rope')
+"""
+import itertools
+import math
+
+from defs import ALL_CARDS_MASK, CATEGORIES, CATEGORY_MASKS, CARD_ORDER, mask_to_bits
+
+
+# The most open Turn constraints the last two Players may have for their deals to be counted by inclusion-exclusion
+MAX_PAIR_TURNS = 10
+# How many partial deals enumerate_deals() lists between calls of should_stop()
+STOP_CHECK_STEPS = 256
+# The most inclusion-exclusion terms, and memoized sub-counts in all, for count_deals() to work through
+MAX_COUNT_TERMS = 256
+MAX_COUNT_STATES = 20000
+
+
+class EnumerationTooLarge(Exception):
+    """Raised when enumerating the consistent deals would take more than the allotted number of steps"""
+
+
+class SamplingFailed(Exception):
+    """
+    Raised when none of the random deals drawn agree with what the Engine knows.
+    That only means the sample was unlucky: unlike a ValueError from counting or listing the deals,
+        it doesn't show that no deal agrees.
+    """
+
+
+class EstimationCancelled(Exception):
+    """Raised when the probabilities stop being worked out because should_stop() said they're no longer wanted"""
+
+
+class DealConstraints(object):
+    """
+    A snapshot of what the Engine knows about the deal, stored as plain integers and tuples
+        so that it is cheap to copy between processes and can't be changed by later Turns.
+
+    For each Player (in the order of Engine.all_players) we keep
+        .numbers        the Player's number
+        .hands          the mask of cards KNOWN to be in the Player's HAND
+        .candidates     the mask of cards that could be in the Player's HAND (HAND + POSSIBLES)
+        .hand_sizes     the number of cards dealt to the Player
+    .accusation is the mask of the Murder Cards known so far, and .turn_constraints holds a
+        (player index, possible reveals mask) pair for every Turn that hasn't been totally processed
+    """
+    def __init__(self, numbers, hands, candidates, hand_sizes, accusation=0, turn_constraints=()):
+        self.numbers = tuple(numbers)
+        self.hands = tuple(hands)
+        self.candidates = tuple(candidates)
+        self.hand_sizes = tuple(hand_sizes)
+        self.accusation = accusation
+        self.turn_constraints = tuple(turn_constraints)
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Take a snapshot of the Engine's current knowledge"""
+        players = engine.all_players
+        index_by_number = {player.number: i for i, player in enumerate(players)}
+        turn_constraints = []
+        for turn in engine.turn_sequence:
+            if turn.totally_processed or turn.revealer is None or turn.revealer.number not in index_by_number:
+                continue
+            turn_constraints.append((index_by_number[turn.revealer.number], turn.possible_reveals.mask))
+        return cls(
+            numbers=[player.number for player in players],
+            hands=[player.hand.mask for player in players],
+            candidates=[player.hand.mask | player.possibles.mask for player in players],
+            hand_sizes=[player.hand_size for player in players],
+            accusation=engine.accusation.mask,
+            turn_constraints=turn_constraints,
+        )
+
+    def murder_candidates(self):
+        """
+        Return, per category, the list of card bits that could be that category's Murder Card
+
+        :return list[list[int]]:
+        """
+        known_hands = 0
+        for hand in self.hands:
+            known_hands |= hand
+        candidates = []
+        for category in CATEGORIES:
+            category_mask = CATEGORY_MASKS[category.__name__]
+            cards = category_mask & ~known_hands
+            if self.accusation & category_mask:
+                cards &= self.accusation
+            candidates.append(list(mask_to_bits(cards)))
+        return candidates
+
+
+class DealProbabilities(object):
+    """
+    The marginal probability of each card being in each Player's HAND and in the Murder envelope,
+        accumulated from the number of consistent deals in which that happens.
+    """
+    def __init__(self, constraints: DealConstraints, player_counts, murder_counts, num_deals, exact=True):
+        self.constraints = constraints
+        self.num_deals = num_deals
+        self.exact = exact
+        self._player_counts = player_counts
+        self._murder_counts = murder_counts
+
+    def player_probabilities(self, player_number):
+        """
+        :param int player_number:
+        :return dict[str, float]: The probability of each card being in the Player's HAND
+        """
+        counts = self._player_counts[self.constraints.numbers.index(player_number)]
+        return {card: counts[i] / self.num_deals for i, card in enumerate(CARD_ORDER) if counts[i]}
+
+    def murder_probabilities(self):
+        """
+        :return dict[str, float]: The probability of each card being a Murder Card
+        """
+        return {card: self._murder_counts[i] / self.num_deals
+                for i, card in enumerate(CARD_ORDER) if self._murder_counts[i]}
+
+    def probability(self, player_number, card):
+        """The probability that the Player holds the card (player_number 0 means the Murder envelope)"""
+        if player_number == 0:
+            return self.murder_probabilities().get(card, 0.0)
+        return self.player_probabilities(player_number).get(card, 0.0)
+
+
+def enumerate_deals(constraints: DealConstraints, max_steps=None, should_stop=None):
+    """
+    Exactly count the deals consistent with the constraints, tallying how often each card
+        lands with each Player and in the Murder envelope.
+
+    Deals are built one Player at a time, starting with the most constrained Player, by choosing which of
+        their candidate cards fill the rest of their HAND. A branch is abandoned as soon as
+        > a later Player can no longer fill their HAND, or
+        > a remaining card has no Player left who could hold it, or
+        > a Player's HAND misses every possible reveal of a Turn they revealed a card in.
+    The last Player's HAND is forced, so complete deals are counted without being listed card by card.
+
+    :param DealConstraints constraints:
+    :param int max_steps:   Give up (raising EnumerationTooLarge) after this many partial deals
+    :param should_stop:     Called every so often; give up (raising EstimationCancelled) once it returns True
+    :return DealProbabilities:
+    """
+    num_players = len(constraints.numbers)
+    known_hands = 0
+    for hand in constraints.hands:
+        known_hands |= hand
+    needs = [size - hand.bit_count() for size, hand in zip(constraints.hand_sizes, constraints.hands)]
+    if min(needs, default=0) < 0:
+        raise ValueError("A Player is known to hold more cards than they were dealt")
+
+    # Turns whose Revealer is already known to hold one of the possible reveals don't constrain anything
+    turn_masks = [[] for _ in range(num_players)]
+    for player_index, reveals in constraints.turn_constraints:
+        if not reveals & constraints.hands[player_index]:
+            turn_masks[player_index].append(reveals)
+
+    for player_index, masks in enumerate(turn_masks):
+        if masks and not needs[player_index]:
+            raise ValueError(f"Player {constraints.numbers[player_index]}'s HAND can't hold a card they revealed")
+
+    player_counts = [[0] * len(CARD_ORDER) for _ in range(num_players)]
+    murder_counts = [0] * len(CARD_ORDER)
+    steps = 0
+
+    def count_deals(order, position, remaining):
+        """Count the ways to deal `remaining` to the Players order[position:], tallying as we go"""
+        nonlocal steps
+        steps += 1
+        if max_steps is not None and steps > max_steps:
+            raise EnumerationTooLarge(f"More than {max_steps} partial deals to enumerate")
+        if should_stop is not None and not steps % STOP_CHECK_STEPS and should_stop():
+            raise EstimationCancelled()
+
+        player_index = order[position]
+        free = constraints.candidates[player_index] & remaining
+        need = needs[player_index]
+        if free.bit_count() < need:
+            return 0
+
+        later_players = order[position + 1:]
+        if len(later_players) == 1:
+            deals = count_pair_deals(player_index, later_players[0], remaining)
+            if deals is not None:
+                return deals
+        if not later_players:
+            # The last Player must take every card that's left
+            if free != remaining or remaining.bit_count() != need:
+                return 0
+            if not _satisfies_turns(constraints.hands[player_index] | remaining, turn_masks[player_index]):
+                return 0
+            for bit in mask_to_bits(remaining):
+                player_counts[player_index][bit.bit_length() - 1] += 1
+            return 1
+
+        total = 0
+        for chosen in _combinations(free, need):
+            hand = constraints.hands[player_index] | chosen
+            if not _satisfies_turns(hand, turn_masks[player_index]):
+                continue
+            rest = remaining & ~chosen
+            # Every remaining card needs someone who could still hold it,
+            #   and every later Player needs enough cards to fill their HAND
+            coverable = 0
+            for later_index in later_players:
+                later_free = constraints.candidates[later_index] & rest
+                if later_free.bit_count() < needs[later_index]:
+                    break
+                coverable |= later_free
+            else:
+                if rest & ~coverable:
+                    continue
+                completions = count_deals(order, position + 1, rest)
+                if completions:
+                    total += completions
+                    for bit in mask_to_bits(chosen):
+                        player_counts[player_index][bit.bit_length() - 1] += completions
+        return total
+
+    def count_pair_deals(first_index, second_index, remaining):
+        """
+        Count the ways to split `remaining` between the last two Players without listing them:
+            cards only one of them could hold are forced, and the rest (the shared cards) can be divided
+            between them in any way that leaves each Player holding a possible reveal of each of their Turns.
+        The Turn constraints are folded in by inclusion-exclusion over the Turns not already satisfied.
+
+        :return int|None: The number of deals, or None if there are too many open Turns to fold in
+        """
+        first_free = constraints.candidates[first_index] & remaining
+        second_free = constraints.candidates[second_index] & remaining
+        if remaining & ~(first_free | second_free):
+            return 0
+        shared = first_free & second_free
+        first_forced = first_free & ~shared
+        second_forced = second_free & ~shared
+        num_shared = shared.bit_count()
+        first_takes = needs[first_index] - first_forced.bit_count()
+        if first_takes < 0 or first_takes > num_shared or \
+                second_forced.bit_count() + num_shared - first_takes != needs[second_index]:
+            return 0
+
+        first_open = _open_turns(turn_masks[first_index], constraints.hands[first_index] | first_forced, shared)
+        second_open = _open_turns(turn_masks[second_index], constraints.hands[second_index] | second_forced, shared)
+        if first_open is None or second_open is None:
+            return 0
+        if len(first_open) + len(second_open) > MAX_PAIR_TURNS:
+            return None
+
+        # Each term is (sign, shared cards the first Player must not take, shared cards the first Player must take):
+        #   the first Player misses its Turns in `avoid`, the second Player misses its Turns in `must`
+        terms = [(1, 0, 0)]
+        for reveals in first_open:
+            terms += [(-sign, avoid | reveals, must) for sign, avoid, must in terms if not reveals & must]
+        for reveals in second_open:
+            terms += [(-sign, avoid, must | reveals) for sign, avoid, must in terms if not reveals & avoid]
+
+        def count_choices(avoid, must):
+            if len(terms) == 1:
+                return _num_combinations(num_shared - (avoid | must).bit_count(), first_takes - must.bit_count())
+            return sum(
+                sign * _num_combinations(num_shared - (term_avoid | term_must | avoid | must).bit_count(),
+                                         first_takes - (term_must | must).bit_count())
+                for sign, term_avoid, term_must in terms
+                if not (term_avoid | avoid) & (term_must | must)
+            )
+
+        deals = count_choices(0, 0)
+        if not deals:
+            return 0
+        first_counts = player_counts[first_index]
+        second_counts = player_counts[second_index]
+        for bit in mask_to_bits(first_forced):
+            first_counts[bit.bit_length() - 1] += deals
+        for bit in mask_to_bits(second_forced):
+            second_counts[bit.bit_length() - 1] += deals
+        for bit in mask_to_bits(shared):
+            first_deals = count_choices(0, bit)
+            first_counts[bit.bit_length() - 1] += first_deals
+            second_counts[bit.bit_length() - 1] += deals - first_deals
+        return deals
+
+    num_deals = 0
+    unknown = ((1 << len(CARD_ORDER)) - 1) & ~known_hands
+    for murder_cards in itertools.product(*constraints.murder_candidates()):
+        envelope = sum(murder_cards)
+        remaining = unknown & ~envelope
+        if remaining.bit_count() != sum(needs):
+            continue
+        # Branch on the Players constrained by Turns first, and among those the Players with the fewest
+        #   ways to fill their HAND, leaving unconstrained Players for the end where they can be counted in bulk
+        order = sorted(
+            (i for i in range(num_players) if needs[i]),
+            key=lambda i: _num_combinations((constraints.candidates[i] & remaining).bit_count(), needs[i])
+        )
+        if not order:
+            deals = 1 if not remaining else 0
+        else:
+            deals = count_deals(order, 0, remaining)
+        if deals:
+            num_deals += deals
+            for bit in murder_cards:
+                murder_counts[bit.bit_length() - 1] += deals
+
+    if not num_deals:
+        raise ValueError("No deal of the cards is consistent with what the Engine knows")
+
+    # Cards KNOWN to be in a Player's HAND are there in every deal
+    for player_index, hand in enumerate(constraints.hands):
+        for bit in mask_to_bits(hand):
+            player_counts[player_index][bit.bit_length() - 1] = num_deals
+
+    return DealProbabilities(constraints, player_counts, murder_counts, num_deals)
+
+
+def estimate_probabilities(constraints: DealConstraints, max_steps=None, time_budget=None, should_stop=None):
+    """
+    Work out the probabilities the quickest way there is: count the deals without listing them (see count_deals()),
+        or list them one by one (see enumerate_deals()), or when there are too many of them,
+        estimate the probabilities from a random sample (see sampler.py)
+
+    :param DealConstraints constraints:
+    :param int max_steps:       The most steps to spend listing deals before switching to sampling
+    :param float time_budget:   The most seconds to spend sampling deals
+    :param should_stop:         Called every so often while listing or sampling deals; returning True gives up
+    :return DealProbabilities|None: None if no deal of the cards agrees with the constraints, or if given up
+    :raises SamplingFailed:     If the deals had to be sampled, and none of those drawn agree with the constraints
+    """
+    from sampler import sample_deals
+
+    try:
+        try:
+            return count_deals(constraints)
+        except EnumerationTooLarge:
+            pass
+        try:
+            return enumerate_deals(constraints, max_steps=max_steps, should_stop=should_stop)
+        except EnumerationTooLarge:
+            return sample_deals(constraints, time_budget=time_budget, should_stop=should_stop)
+    except (ValueError, EstimationCancelled):
+        return None
+
+
+def count_deals(constraints: DealConstraints, max_terms=MAX_COUNT_TERMS, max_states=MAX_COUNT_STATES):
+    """
+    Exactly count the deals consistent with the constraints, and how often each card lands with each Player
+        and in the Murder envelope, without listing a single deal.
+
+    The Murder envelope is dealt as one more "Player" per category, holding one card of its category.
+    Cards that the same Players (and envelope categories) could be holding are interchangeable,
+        so they're grouped, and the deals are counted by how many cards of each group each Player takes
+        (see _count_hands()). The sub-counts are memoized on the cards each Player still needs,
+        or on the cards still left in each group, which are few enough states even on Turn 1,
+        when the deals themselves number in the billions.
+
+    The Turn constraints don't factor over Players like this, so they're folded in by inclusion-exclusion:
+        the count of deals where the Revealers of some open Turns hold none of their possible reveals
+        is just a count with those cards taken out of their POSSIBLES.
+
+    :param DealConstraints constraints:
+    :param int max_terms:   Give up (raising EnumerationTooLarge) on more inclusion-exclusion terms than this
+    :param int max_states:  Give up (raising EnumerationTooLarge) on more memoized sub-counts than this, in all
+    :return DealProbabilities:
+    """
+    num_players = len(constraints.numbers)
+    known_hands = 0
+    for hand in constraints.hands:
+        known_hands |= hand
+    possibles = [candidates & ~hand for candidates, hand in zip(constraints.candidates, constraints.hands)]
+    needs = [size - hand.bit_count() for size, hand in zip(constraints.hand_sizes, constraints.hands)]
+    if min(needs, default=0) < 0:
+        raise ValueError("A Player is known to hold more cards than they were dealt")
+
+    # The open Turns, each Player's reduced to the smallest of any nested possible reveals
+    turn_masks = [set() for _ in range(num_players)]
+    for player_index, reveals in constraints.turn_constraints:
+        if not reveals & constraints.hands[player_index]:
+            turn_masks[player_index].add(reveals & possibles[player_index])
+    open_turns = [(player_index, reveals) for player_index, masks in enumerate(turn_masks) for reveals in masks
+                  if not any(other != reveals and not other & ~reveals for other in masks)]
+    if any(not reveals for _, reveals in open_turns):
+        raise ValueError("A Player can't hold any card they might have revealed")
+
+    # Inclusion-exclusion terms: the cards taken out of each Player's POSSIBLES -> coefficient.
+    #   A term that leaves a Player too few cards counts no deals, and neither does anything built on it.
+    terms = {(0,) * num_players: 1}
+    for player_index, reveals in open_turns:
+        for avoid, coefficient in list(terms.items()):
+            if (possibles[player_index] & ~(avoid[player_index] | reveals)).bit_count() < needs[player_index]:
+                continue
+            extended = avoid[:player_index] + (avoid[player_index] | reveals,) + avoid[player_index + 1:]
+            terms[extended] = terms.get(extended, 0) - coefficient
+            if not terms[extended]:
+                del terms[extended]
+        if len(terms) > max_terms:
+            raise EnumerationTooLarge(f"More than {max_terms} inclusion-exclusion terms to count")
+
+    unknown = ALL_CARDS_MASK & ~known_hands
+    murder_candidates = [sum(bits) for bits in constraints.murder_candidates()]
+    player_counts = [[0] * len(CARD_ORDER) for _ in range(num_players)]
+    murder_counts = [0] * len(CARD_ORDER)
+    num_deals = 0
+    states_left = max_states
+    for avoid, coefficient in terms.items():
+        # The owners dealt the unknown cards: every Player still to be dealt cards, then each envelope category
+        owners = [(possibles[i] & ~avoid[i], needs[i], i) for i in range(num_players) if needs[i]]
+        owners += [(candidates, 1, None) for candidates in murder_candidates]
+        deals, owner_counts, num_states = _count_hands(unknown, owners, states_left)
+        states_left -= num_states
+        if not deals:
+            continue
+        num_deals += coefficient * deals
+        for (_, _, player_index), counts in zip(owners, owner_counts):
+            tally = murder_counts if player_index is None else player_counts[player_index]
+            for index, count in counts.items():
+                tally[index] += coefficient * count
+
+    if not num_deals:
+        raise ValueError("No deal of the cards is consistent with what the Engine knows")
+
+    # Cards KNOWN to be in a Player's HAND are there in every deal
+    for player_index, hand in enumerate(constraints.hands):
+        for bit in mask_to_bits(hand):
+            player_counts[player_index][bit.bit_length() - 1] = num_deals
+
+    return DealProbabilities(constraints, player_counts, murder_counts, num_deals)
+
+
+def _count_hands(cards, owners, max_states):
+    """
+    Count the ways to deal the cards so that each owner gets exactly as many as they need, all from their candidates
+
+    The cards are grouped by which owners could hold them, since the cards of a group are interchangeable.
+    A deal is then a table of how many cards of each group each owner gets, with every owner's row adding up
+        to the cards they need and every group's column adding up to its size, and it comes about in
+        (size of the group)! / (product of the entries)! ways per group.
+    The tables are counted by _count_tables(), along whichever of owners and groups makes fewer partial tables.
+
+    :param int cards:                           Mask of the cards to deal
+    :param list[tuple[int, int, ...]] owners:   (candidates mask, number of cards needed, ...)
+    :param int max_states:                      Give up (raising EnumerationTooLarge) on more sub-counts than this
+    :return tuple[int, list[dict[int, int]], int]: The number of deals, for each owner the number of deals
+                                                    giving them each card (by index into CARD_ORDER),
+                                                    and the number of sub-counts memoized
+    """
+    owner_counts = [{} for _ in owners]
+    needs = [need for _, need, *_ in owners]
+    groups = {}
+    for bit in mask_to_bits(cards):
+        holders = sum(1 << i for i, (candidates, *_) in enumerate(owners) if candidates & bit)
+        if not holders:
+            return 0, owner_counts, 0
+        groups[holders] = groups.get(holders, 0) | bit
+    # Groups with the same owners next to each other keep fewer owners partly dealt at a time
+    group_holders = sorted(groups)
+    sizes = [groups[holders].bit_count() for holders in group_holders]
+    holders_of = [[i for i in range(len(owners)) if holders >> i & 1] for holders in group_holders]
+
+    # A partial table is summed up by what's left of the sums along the other side
+    if math.prod(size + 1 for size in sizes) <= math.prod(need + 1 for need in needs):
+        groups_of = [[g for g, holders in enumerate(holders_of) if i in holders] for i in range(len(owners))]
+        num_deals, given, num_states = _count_tables(needs, sizes, groups_of, True, max_states)
+        cell_counts = {(i, g): count for (i, g), count in given.items()}
+    else:
+        num_deals, given, num_states = _count_tables(sizes, needs, holders_of, False, max_states)
+        cell_counts = {(i, g): count for (g, i), count in given.items()}
+
+    for (i, g), count in cell_counts.items():
+        # Every card of the group is equally likely to be among those the owner gets
+        for bit in mask_to_bits(groups[group_holders[g]]):
+            owner_counts[i][bit.bit_length() - 1] = count // sizes[g]
+    return num_deals, owner_counts, num_states
+
+
+def _count_tables(row_sums, column_sums, cells, columns_are_groups, max_states):
+    """
+    Count the tables of non-negative entries with the given row and column sums, and entries only in the given cells,
+        each weighted by the product, down every column (or along every row, if those are the groups of cards),
+        of C(what's left of the sum, entry) for each entry in turn.
+
+    The table is filled in one cell at a time, row by row. A partially filled table is summed up by its state:
+        what's left of each column's sum, and of the current row's.
+        > count_from(step, state) is the weight of the ways to finish the table from that state (memoized)
+        > ways_to[state] is the weight of the ways to reach that state, step by step
+
+    :param list[int] row_sums:
+    :param list[int] column_sums:
+    :param list[list[int]] cells:       The columns each row may have entries in
+    :param bool columns_are_groups:
+    :param int max_states:              Give up (raising EnumerationTooLarge) on more sub-counts than this
+    :return tuple[int, dict[tuple[int, int], int], int]: The total weight, the weighted sum of each cell's entry,
+                                                        and the number of sub-counts memoized
+    """
+    if sum(row_sums) != sum(column_sums) or any(total and not cells[row] for row, total in enumerate(row_sums)):
+        return 0, {}, 0
+    last_row = {}
+    for row, columns in enumerate(cells):
+        for column in columns:
+            last_row[column] = row
+    if any(total and column not in last_row for column, total in enumerate(column_sums)):
+        return 0, {}, 0
+
+    # Each step is (row, column, the row's sum if it's the row's first cell, the columns done with after it)
+    steps = []
+    for row, columns in enumerate(cells):
+        finished = tuple(column for column in columns if last_row[column] == row)
+        steps += [(row, column, row_sums[row] if position == 0 else None,
+                   finished if position == len(columns) - 1 else None)
+                  for position, column in enumerate(columns)]
+
+    def moves(position, lefts, row_left):
+        """Yield (the state after the step, the entry, its weight)"""
+        _, column, _, finished = steps[position]
+        column_left = lefts[column]
+        if finished is not None:
+            # The row's last cell takes whatever is left of the row's sum
+            entries = [row_left] if row_left <= column_left else []
+        else:
+            entries = range(min(row_left, column_left) + 1)
+        for entry in entries:
+            after = lefts if not entry else lefts[:column] + (column_left - entry,) + lefts[column + 1:]
+            if finished is not None:
+                if any(after[done] for done in finished):
+                    continue
+                next_row_left = steps[position + 1][2] if position + 1 < len(steps) else 0
+            else:
+                next_row_left = row_left - entry
+            weight = math.comb(column_left if columns_are_groups else row_left, entry)
+            yield (after, next_row_left), entry, weight
+
+    memo = {}
+
+    def count_from(position, state):
+        if position == len(steps):
+            return 1
+        key = (position, state)
+        if key not in memo:
+            if len(memo) >= max_states:
+                raise EnumerationTooLarge(f"More than {max_states} sub-counts to memoize")
+            memo[key] = sum(weight * count_from(position + 1, after) for after, _, weight in moves(position, *state))
+        return memo[key]
+
+    start = (tuple(column_sums), steps[0][2] if steps else 0)
+    total = count_from(0, start)
+    entries = {}
+    if not total:
+        return 0, entries, len(memo)
+
+    ways_to = {start: 1}
+    for position, (row, column, _, _) in enumerate(steps):
+        entry_total = 0
+        ways_after = {}
+        for state, ways_before in ways_to.items():
+            for after, entry, weight in moves(position, *state):
+                completions = count_from(position + 1, after)
+                if not completions:
+                    continue
+                entry_total += ways_before * weight * completions * entry
+                ways_after[after] = ways_after.get(after, 0) + ways_before * weight
+        if entry_total:
+            entries[(row, column)] = entry_total
+        ways_to = ways_after
+    return total, entries, len(memo)
+
+
+def _open_turns(turn_masks, hand, shared):
+    """
+    Reduce a Player's Turn constraints to the ones the shared cards still have to satisfy,
+        keeping only the smallest of any nested possible reveals
+
+    :return list[int]|None: The open possible reveals (within shared), or None if a Turn can't be satisfied
+    """
+    open_turns = set()
+    for reveals in turn_masks:
+        if reveals & hand:
+            continue
+        if not reveals & shared:
+            return None
+        open_turns.add(reveals & shared)
+    return [reveals for reveals in open_turns
+            if not any(other != reveals and not other & ~reveals for other in open_turns)]
+
+
+def _satisfies_turns(hand, turn_masks):
+    """Whether the HAND holds at least one possible reveal from every Turn"""
+    for reveals in turn_masks:
+        if not hand & reveals:
+            return False
+    return True
+
+
+def _combinations(mask, k):
+    """Yield every mask made of exactly k of the bits set in mask"""
+    for bits in itertools.combinations(list(mask_to_bits(mask)), k):
+        yield sum(bits)
+
+
+def _num_combinations(n, k):
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
@@ -0,0 +1,254 @@
+"""
+Constraint propagation over a matrix of everything the Engine knows about who holds each card.
+The Engine applies the same rules to its bitmasks (see deduce_murder_cards() and check_players_hand_size()),
+    which for a single game is faster than building the matrix; MatrixEngine applies them on the matrix instead,
+    as an independent implementation to check the Engine's against (see fuzz_engines.py).
+
+Row 0 of the matrix is the Murder envelope and row n is Player n; there is one column per card, in CARD_ORDER.
+Each entry is HAS, LACKS, or UNKNOWN (still in the Player's POSSIBLES, or not yet ruled out of the envelope).
+The rules are applied to whole rows, columns and categories at once:
+    > Rows:         a Player holds exactly .hand_size cards
+    > Columns:      every card has exactly one owner, among the Players and the Murder envelope
+    > Categories:   the Murder envelope holds exactly one card of each category
+
+e.g. once the Suspect is solved, every other Suspect is out of the envelope, so a Suspect only one Player
+    still POSSIBLY has must be in that Player's HAND.
+"""
+import numpy as np
+
+from clue_solver import Engine
+from defs import ALL_CARDS_MASK, CARD_ORDER, CATEGORIES, CATEGORY_MASKS, NUM_CARDS
+
+HAS, UNKNOWN, LACKS = 1, 0, -1
+
+_NUM_BYTES = (NUM_CARDS + 7) // 8
+
+
+def masks_to_matrix(masks):
+    """
+    :param list[int] masks:
+    :return np.ndarray: One row of booleans per mask, one column per card in CARD_ORDER
+    """
+    data = np.frombuffer(b''.join(mask.to_bytes(_NUM_BYTES, 'little') for mask in masks), dtype=np.uint8)
+    bits = np.unpackbits(data.reshape(len(masks), _NUM_BYTES), axis=1, count=NUM_CARDS, bitorder='little')
+    return bits.astype(bool)
+
+
+def matrix_to_masks(bits):
+    """
+    :param np.ndarray bits: One row of booleans per mask, as from masks_to_matrix()
+    :return list[int]:
+    """
+    packed = np.packbits(bits, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+# The cards of each category (rows, in the order of CATEGORIES)
+CATEGORY_MATRIX = masks_to_matrix([CATEGORY_MASKS[category.__name__] for category in CATEGORIES])
+_CATEGORY_NAMES = [category.__name__ for category in CATEGORIES]
+
+
+def knowledge_matrix(eng):
+    """
+    :param Engine eng:
+    :return np.ndarray: What the Engine knows about every Player and the Murder envelope, as HAS/UNKNOWN/LACKS
+    """
+    accusation = eng.accusation.mask
+    hands = [player.hand.mask for player in eng.all_players]
+    # A card is out of the envelope once a Player holds it, or once its category's Murder Card is known
+    out_of_envelope = 0
+    for hand in hands:
+        out_of_envelope |= hand
+    for category_mask in CATEGORY_MASKS.values():
+        if accusation & category_mask:
+            out_of_envelope |= category_mask & ~accusation
+    envelope_possibles = ALL_CARDS_MASK & ~out_of_envelope & ~accusation
+
+    held = masks_to_matrix([accusation] + hands)
+    possible = masks_to_matrix([envelope_possibles] + [player.possibles.mask for player in eng.all_players])
+    return np.where(held, HAS, np.where(possible, UNKNOWN, LACKS)).astype(np.int8)
+
+
+def exclude_held_cards(matrix, columns=slice(None)):
+    """
+    A card one owner HAS is LACKED by every other owner
+
+    :param np.ndarray matrix:
+    :param columns:             The cards to examine (default all)
+    :return bool: Whether anything was deduced
+    """
+    block = matrix[:, columns]
+    lacked = (block == UNKNOWN) & (block == HAS).any(axis=0)
+    if not lacked.any():
+        return False
+    block[lacked] = LACKS
+    matrix[:, columns] = block
+    return True
+
+
+def assign_sole_owners(matrix, columns=slice(None)):
+    """
+    A card that only one owner could still have is that owner's
+
+    :param np.ndarray matrix:
+    :param columns:             The cards to examine (default all)
+    :return bool: Whether anything was deduced
+    """
+    block = matrix[:, columns]
+    owners = (block != LACKS).sum(axis=0)
+    if (owners == 0).any():
+        orphans = np.asarray(CARD_ORDER)[columns][owners == 0]
+        raise ValueError(f"No Player nor the Murder envelope can be holding: {set(orphans)}")
+    held = (block == UNKNOWN) & (owners == 1)
+    if not held.any():
+        return False
+    block[held] = HAS
+    matrix[:, columns] = block
+    return True
+
+
+def apply_murder_categories(matrix, categories=None):
+    """
+    The Murder envelope holds exactly one card of each category
+
+    :param np.ndarray matrix:
+    :param np.ndarray categories:   Which rows of CATEGORY_MATRIX to examine (default all)
+    :return bool: Whether anything was deduced
+    """
+    in_category = CATEGORY_MATRIX if categories is None else CATEGORY_MATRIX[categories]
+    names = np.asarray(_CATEGORY_NAMES)[slice(None) if categories is None else categories]
+    envelope = matrix[0]
+    solved = (in_category & (envelope == HAS)).sum(axis=1)
+    still_open = (in_category & (envelope != LACKS)).sum(axis=1)
+    if (solved > 1).any():
+        raise ValueError(
+            f"Multiple cards from the same category are considered out of play!: {', '.join(names[solved > 1])}"
+        )
+    if (still_open == 0).any():
+        raise ValueError(
+            f"All cards from the same category are considered in play, which is impossible!: {', '.join(names[still_open == 0])}"
+        )
+    unknown = envelope == UNKNOWN
+    # The rest of a solved category is out of the envelope, and the last card left in the envelope is the Murder Card
+    lacked = unknown & in_category[solved == 1].any(axis=0)
+    held = unknown & in_category[still_open == 1].any(axis=0)
+    if not (lacked.any() or held.any()):
+        return False
+    envelope[lacked] = LACKS
+    envelope[held] = HAS
+    return True
+
+
+def apply_hand_sizes(matrix, rows, hand_sizes):
+    """
+    A Player holds exactly .hand_size cards: once that many are known the rest are LACKED,
+        and once only that many are possible they are all HELD
+
+    :param np.ndarray matrix:
+    :param list[int] rows:          The Players to examine, by number
+    :param list[int] hand_sizes:    The hand size of each of those Players
+    :return bool: Whether anything was deduced
+    """
+    hand_sizes = np.asarray(hand_sizes)
+    block = matrix[rows]
+    unknown = block == UNKNOWN
+    held = (block == HAS).sum(axis=1)
+    still_open = (block != LACKS).sum(axis=1)
+    lacked = unknown & (held == hand_sizes)[:, None]
+    completed = unknown & (still_open == hand_sizes)[:, None]
+    if not (lacked.any() or completed.any()):
+        return False
+    block[lacked] = LACKS
+    block[completed] = HAS
+    matrix[rows] = block
+    return True
+
+
+def category_columns(categories):
+    """
+    :param categories:  Card categories, e.g. CATEGORIES
+    :return tuple[np.ndarray, np.ndarray]: Which rows of CATEGORY_MATRIX they are, and which columns their cards are
+    """
+    selected = np.array([category in categories for category in CATEGORIES])
+    return selected, CATEGORY_MATRIX[selected].any(axis=0)
+
+
+def propagate_card_owners(matrix, categories=CATEGORIES):
+    """
+    Apply the column and Murder-envelope rules to the cards of the categories until they deduce nothing more
+
+    :param np.ndarray matrix:
+    :param categories:          The card categories to examine (default all)
+    :return bool: Whether anything was deduced
+    """
+    selected, columns = category_columns(categories)
+    got_info = False
+    while True:
+        changed = exclude_held_cards(matrix, columns)
+        changed |= apply_murder_categories(matrix, selected)
+        changed |= assign_sole_owners(matrix, columns)
+        if not changed:
+            return got_info
+        got_info = True
+
+
+def propagate(matrix, rows, hand_sizes):
+    """
+    Apply every rule to the whole matrix until they deduce nothing more
+
+    :param np.ndarray matrix:
+    :param list[int] rows:          The Players whose hand sizes to apply, by number
+    :param list[int] hand_sizes:    The hand size of each of those Players
+    :return bool: Whether anything was deduced
+    """
+    hand_sizes = np.asarray(hand_sizes)
+    got_info = False
+    while True:
+        changed = apply_hand_sizes(matrix, rows, hand_sizes)
+        changed |= exclude_held_cards(matrix)
+        changed |= apply_murder_categories(matrix)
+        changed |= assign_sole_owners(matrix)
+        if not changed:
+            return got_info
+        got_info = True
+
+
+class MatrixEngine(Engine):
+    """The Engine, with its murder deductions and hand-size checks made on the knowledge matrix"""
+    def deduce_murder_cards(self, categories=CATEGORIES, enqueue_turn=None):
+        matrix = knowledge_matrix(self)
+        if not propagate_card_owners(matrix, categories):
+            return False
+        self.apply_knowledge_matrix(matrix, enqueue_turn)
+        return True
+
+    def check_players_hand_size(self, players=None):
+        players = self.other_players if players is None else players
+        if not players:
+            return False
+        matrix = knowledge_matrix(self)
+        if not apply_hand_sizes(matrix, [player.number for player in players], [player.hand_size for player in players]):
+            return False
+        # No other Player can possibly be holding the cards newly found in a HAND
+        exclude_held_cards(matrix[1:])
+        self.apply_knowledge_matrix(matrix)
+        return True
+
+    def apply_knowledge_matrix(self, matrix, enqueue_turn=None):
+        """
+        Overwrite every Player's HAND and POSSIBLES, and the accusation, with the knowledge matrix
+
+        :param np.ndarray matrix:   As from knowledge_matrix()
+        :param enqueue_turn:        Called with each Turn whose possible reveals lost a newly found Murder Card
+        """
+        accusation, *hands = matrix_to_masks(matrix == HAS)
+        possibles = matrix_to_masks(matrix[1:] == UNKNOWN)
+        for player, hand, player_possibles in zip(self.all_players, hands, possibles):
+            player.hand = hand
+            player.possibles = player_possibles
+
+        new_murder_cards = accusation & ~self.accusation.mask
+        if new_murder_cards:
+            self.accusation = accusation
+            # A Clue can not be a revealed card in a Turn, so update the Turns that might have revealed it
+            self._eliminate_from_turns(new_murder_cards, enqueue_turn)
@@ -0,0 +1,427 @@
+"""
+Why the Engine knows what it knows: every deduced fact (a card in a HAND, a card out of a Player's POSSIBLES,
+    a Murder Card) carries a justification naming the rule that produced it and the inputs it rests on.
+
+The inputs are your own HAND, each Turn and each UPDATE. A fact's support is a bitmask over them, so the support
+    of a deduction is just the union of the supports of the facts it was drawn from, e.g.
+        Player 3 showed a card from (plum, rope, hall)      Turn 5
+        Player 3 LACKS plum                                  Turn 2
+        Player 3 LACKS hall                                  UPDATE
+        => Player 3 HAS rope, by 'revealed card'             Turn 5 + Turn 2 + UPDATE
+
+The rules are those of the Engine (see process_revealed_turn(), deduce_murder_cards() and check_players_hand_size()),
+    kept on the side of it: one owner per card, one Murder Card per category, hand sizes, and the card revealed
+    in each Turn. 'python3 fuzz_engines.py --candidate provenance' checks that they still deduce exactly what the
+    Engine does, so change them along with the Engine's.
+
+When the facts contradict each other, the support of the contradiction is a set of inputs that can't all be true.
+    It is narrowed down to a minimal such set by dropping one input at a time and re-deriving the facts
+    of only the inputs that are left, which for a handful of inputs is far cheaper than replaying the game.
+
+    >>> conflict = find_conflict(eng)
+    >>> conflict.describe() if conflict else explain(eng, 3, 'rope')
+"""
+from defs import ALL_CARDS_MASK, CARD_BITS, CATEGORY_MASKS, mask_to_bits, mask_to_cards
+
+HAS, LACKS = 'has', 'lacks'
+# The row of the Murder envelope; row n is Player n, as in propagation.py
+ENVELOPE = 0
+
+
+class Input(object):
+    """Something the Engine was told: your HAND, a Turn or an UPDATE"""
+    def __init__(self, description, facts=(), clause=None):
+        """
+        :param str description:
+        :param list[tuple[int, int, str]] facts:    (row, card mask, HAS or LACKS) known outright
+        :param tuple[int, int] clause:              (row, card mask): the row HAS at least one of the cards
+        """
+        self.description = description
+        self.facts = list(facts)
+        self.clause = clause
+
+
+class Contradiction(ValueError):
+    """Facts that can't all be true, and the inputs they rest on"""
+    def __init__(self, reason, support):
+        """
+        :param str reason:
+        :param int support: Bitmask of the inputs, by index
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.support = support
+
+
+class Conflict(object):
+    """A minimal set of inputs that contradict each other: leave out any one of them and the rest agree"""
+    def __init__(self, reason, inputs, latest):
+        """
+        :param str reason:
+        :param list[int] inputs:    The conflicting inputs, by index
+        :param list[Input] latest:  Every input so far
+        """
+        self.reason = reason
+        self.inputs = inputs
+        self.descriptions = [latest[index].description for index in inputs]
+
+    def describe(self):
+        """
+        :return list[str]: The contradiction, and the inputs that conflict, one line each
+        """
+        return [f"Contradiction: {self.reason}", "It follows from just these:"] + \
+            [f"  - {description}" for description in self.descriptions]
+
+
+class Provenance(object):
+    """What is known about who holds each card, with a justification for every fact"""
+    def __init__(self, num_players, hand_sizes):
+        """
+        :param int num_players:
+        :param dict[int, int] hand_sizes:   The number of cards each Player holds, by number
+                                                (only for the Players whose hand sizes the Engine applies)
+        """
+        self.num_players = num_players
+        self.hand_sizes = hand_sizes
+        self.rows = range(num_players + 1)
+        # The cards each row is known to HAVE, and to LACK
+        self.has = [0] * (num_players + 1)
+        self.lacks = [0] * (num_players + 1)
+        # (row, card bit, HAS or LACKS) -> (rule, support)
+        self.why: dict[tuple[int, int, str], tuple[str, int]] = {}
+        # (row, card mask, support) of each Turn whose revealed card is still unknown
+        self.clauses: list[tuple[int, int, int]] = []
+        # The inputs so far, and what identifies each one in the Engine (see engine_keys())
+        self.inputs: list[Input] = []
+        self.keys: list = []
+        # The first contradiction found; nothing more is deduced after it
+        self.contradiction: Contradiction | None = None
+
+    def add(self, inputs, keys=None):
+        """
+        Take in more inputs and deduce everything that follows from them
+
+        :param list[Input] inputs:
+        :param list keys:           What identifies each input in the Engine
+        """
+        start = len(self.inputs)
+        self.inputs += inputs
+        self.keys += keys if keys is not None else inputs
+        if self.contradiction:
+            return
+        try:
+            for index, entry in enumerate(inputs, start=start):
+                self._apply_input(index, entry)
+            self._settle()
+        except Contradiction as e:
+            self.contradiction = e
+
+    def justify(self, row, card):
+        """
+        :param int row:     A Player's number, or ENVELOPE
+        :param str card:
+        :return tuple[str, str, list[int]]|None: HAS or LACKS, the rule that found it, and the inputs it rests on;
+                                                    or None if it's not known yet
+        """
+        bit = CARD_BITS[card]
+        kind = HAS if self.has[row] & bit else LACKS if self.lacks[row] & bit else None
+        if kind is None:
+            return None
+        rule, support = self.why[(row, bit, kind)]
+        return kind, rule, [bit.bit_length() - 1 for bit in mask_to_bits(support)]
+
+    def replay(self, support):
+        """
+        Deduce what follows from only some of the inputs, keeping their indices
+
+        :param int support:     Bitmask of the inputs, by index
+        :return Contradiction|None: What's impossible about them, if anything
+        """
+        trial = Provenance(self.num_players, self.hand_sizes)
+        try:
+            for bit in mask_to_bits(support):
+                index = bit.bit_length() - 1
+                trial._apply_input(index, self.inputs[index])
+            trial._settle()
+        except Contradiction as e:
+            return e
+        return None
+
+    def minimal_conflict(self):
+        """
+        Narrow the support of the contradiction down to a set of inputs that still contradict each other,
+            but wouldn't without any one of them.
+        Every trial re-derives the facts of only the inputs still suspected, and a trial that still contradicts
+            narrows the suspects down to its own contradiction's support.
+
+        :return Conflict|None:
+        """
+        if not self.contradiction:
+            return None
+        found = self.contradiction
+        # Your own HAND is always taken as given, so it's only blamed if it's part of the final conflict
+        suspects = found.support | 1
+        for bit in mask_to_bits(found.support & ~1):
+            if not suspects & bit:
+                continue
+            trial = self.replay(suspects & ~bit)
+            if trial is not None:
+                found = trial
+                suspects = trial.support | 1
+        return Conflict(found.reason, [bit.bit_length() - 1 for bit in mask_to_bits(found.support)], self.inputs)
+
+    def _apply_input(self, index, entry):
+        support = 1 << index
+        for row, cards, kind in entry.facts:
+            for bit in mask_to_bits(cards):
+                self._set(row, bit, kind, 'given', support)
+        if entry.clause:
+            row, cards = entry.clause
+            self.clauses.append((row, cards, support))
+
+    def _set(self, row, bit, kind, rule, support):
+        """
+        Record a fact, unless it's already known
+
+        :return bool: Whether it's new
+        """
+        known, opposite, other_kind = ((self.has, self.lacks, LACKS) if kind == HAS
+                                       else (self.lacks, self.has, HAS))
+        if known[row] & bit:
+            return False
+        if opposite[row] & bit:
+            raise Contradiction(f"{_holder(row)} would both have and lack {_card(bit)}",
+                                support | self.why[(row, bit, other_kind)][1])
+        known[row] |= bit
+        self.why[(row, bit, kind)] = (rule, support)
+        return True
+
+    def _support(self, row, cards, kind):
+        """The union of the supports of the row's facts about the cards"""
+        support = 0
+        for bit in mask_to_bits(cards):
+            support |= self.why[(row, bit, kind)][1]
+        return support
+
+    def _settle(self):
+        """Apply every rule until they deduce nothing more"""
+        changed = True
+        while changed:
+            changed = self._exclude_held_cards()
+            changed |= self._assign_sole_owners()
+            changed |= self._apply_murder_categories()
+            changed |= self._apply_hand_sizes()
+            changed |= self._apply_clauses()
+
+    def _exclude_held_cards(self):
+        """A card one owner HAS is LACKED by every other owner"""
+        changed = False
+        for row in self.rows:
+            for other in self.rows:
+                if other == row:
+                    continue
+                for bit in mask_to_bits(self.has[row] & ~self.lacks[other]):
+                    changed |= self._set(other, bit, LACKS, 'one owner', self.why[(row, bit, HAS)][1])
+        return changed
+
+    def _assign_sole_owners(self):
+        """A card that only one owner could still have is that owner's"""
+        # The cards still open to at least one owner, and to at least two
+        open_once = open_twice = 0
+        for row in self.rows:
+            still_open = ALL_CARDS_MASK & ~self.lacks[row]
+            open_twice |= open_once & still_open
+            open_once |= still_open
+        orphans = ALL_CARDS_MASK & ~open_once
+        if orphans:
+            bit = orphans & -orphans
+            raise Contradiction(f"No Player nor the Murder envelope can be holding {_card(bit)}",
+                                self._column_support(bit))
+        changed = False
+        for bit in mask_to_bits(open_once & ~open_twice):
+            owner = next(row for row in self.rows if not self.lacks[row] & bit)
+            if not self.has[owner] & bit:
+                changed |= self._set(owner, bit, HAS, 'sole owner', self._column_support(bit))
+        return changed
+
+    def _column_support(self, bit):
+        support = 0
+        for row in self.rows:
+            if self.lacks[row] & bit:
+                support |= self.why[(row, bit, LACKS)][1]
+        return support
+
+    def _apply_murder_categories(self):
+        """The Murder envelope holds exactly one card of each category"""
+        changed = False
+        for category_name, category_mask in CATEGORY_MASKS.items():
+            solved = self.has[ENVELOPE] & category_mask
+            if solved.bit_count() > 1:
+                raise Contradiction(f"more than one {category_name} would be a Murder Card",
+                                    self._support(ENVELOPE, solved, HAS))
+            lacked = self.lacks[ENVELOPE] & category_mask
+            still_open = category_mask & ~lacked
+            if not still_open:
+                raise Contradiction(f"no {category_name} would be left to be the Murder Card",
+                                    self._support(ENVELOPE, lacked, LACKS))
+            if solved:
+                support = self.why[(ENVELOPE, solved, HAS)][1]
+                for bit in mask_to_bits(still_open & ~solved):
+                    changed |= self._set(ENVELOPE, bit, LACKS, 'murder category', support)
+            elif still_open.bit_count() == 1:
+                changed |= self._set(ENVELOPE, still_open, HAS, 'murder category',
+                                     self._support(ENVELOPE, lacked, LACKS))
+        return changed
+
+    def _apply_hand_sizes(self):
+        """A Player holds exactly .hand_size cards"""
+        changed = False
+        for row, hand_size in self.hand_sizes.items():
+            held = self.has[row]
+            still_open = ALL_CARDS_MASK & ~self.lacks[row]
+            if held.bit_count() > hand_size:
+                raise Contradiction(f"Player {row} would hold more than {hand_size} cards",
+                                    self._support(row, held, HAS))
+            if still_open.bit_count() < hand_size:
+                raise Contradiction(f"Player {row} would hold fewer than {hand_size} cards",
+                                    self._support(row, self.lacks[row], LACKS))
+            unknown = still_open & ~held
+            if not unknown:
+                continue
+            if held.bit_count() == hand_size:
+                support = self._support(row, held, HAS)
+                for bit in mask_to_bits(unknown):
+                    changed |= self._set(row, bit, LACKS, 'hand size', support)
+            elif still_open.bit_count() == hand_size:
+                support = self._support(row, self.lacks[row], LACKS)
+                for bit in mask_to_bits(unknown):
+                    changed |= self._set(row, bit, HAS, 'hand size', support)
+        return changed
+
+    def _apply_clauses(self):
+        """The Revealer of a Turn HAS one of the suggested cards: once all but one are LACKED, it's that one"""
+        changed = False
+        open_clauses = []
+        for row, cards, support in self.clauses:
+            if self.has[row] & cards:
+                continue
+            lacked = self.lacks[row] & cards
+            still_open = cards & ~lacked
+            if not still_open:
+                raise Contradiction(f"Player {row} can't have shown any of {', '.join(mask_to_cards(cards))}",
+                                    support | self._support(row, lacked, LACKS))
+            if still_open.bit_count() == 1:
+                changed |= self._set(row, still_open, HAS, 'revealed card', support | self._support(row, lacked, LACKS))
+            else:
+                open_clauses.append((row, cards, support))
+        self.clauses = open_clauses
+        return changed
+
+
+def _card(bit):
+    return next(mask_to_cards(bit))
+
+
+def _holder(row):
+    return 'the Murder envelope' if row == ENVELOPE else f"Player {row}"
+
+
+def engine_keys(eng):
+    """
+    :param Engine eng:
+    :return list: What identifies each of the Engine's inputs, in the order they came in:
+                    'setup' for your HAND, a Turn, or an UPDATE as (Turn number, Player number, action, card)
+    """
+    keys = ['setup']
+    updates = eng.updates
+    next_update = 0
+    for turn in eng.turn_sequence[1:]:
+        # An UPDATE is entered before the Turn of its number
+        while next_update < len(updates) and updates[next_update][0] <= turn.number:
+            keys.append(updates[next_update])
+            next_update += 1
+        if not turn.is_pass:
+            keys.append(turn)
+    return keys + updates[next_update:]
+
+
+def _engine_input(eng, key):
+    """
+    :param Engine eng:
+    :param key:         As from engine_keys()
+    :return Input:
+    """
+    if isinstance(key, str):
+        hand = eng.my_player.hand.mask
+        return Input(f"Your hand: {', '.join(mask_to_cards(hand))}",
+                     [(eng.my_player_number, hand, HAS), (eng.my_player_number, ALL_CARDS_MASK & ~hand, LACKS)])
+    if isinstance(key, tuple):
+        turn_number, player_num, action, card = key
+        return Input(f"UPDATE on Turn {turn_number}: Player {player_num} {action} {card}",
+                     [(player_num, CARD_BITS[card], HAS if action == 'has' else LACKS)])
+    return turn_input(eng, key, key.revealed_card if key.suggester.is_me else None)
+
+
+def turn_input(eng, turn, shown_card=None):
+    """
+    :param Engine eng:
+    :param Turn turn:
+    :param str shown_card:  The card the Revealer showed, as only the Suggester saw it
+                                (default only what every Player saw: that the Revealer showed a card)
+    :return Input:
+    """
+    suggestion = turn.suggestion.mask
+    # Those asked before the Revealer had none of the suggested cards
+    facts = [(player.number, suggestion, LACKS) for player in eng.get_non_revealing_responders(turn)]
+    description = f"Turn {turn.number}: Player {turn.suggester.number} suggested {', '.join(mask_to_cards(suggestion))}"
+    revealer = turn.revealer.number
+    if not revealer:
+        return Input(description + " and nobody showed a card", facts)
+    if shown_card:
+        facts.append((revealer, CARD_BITS[shown_card], HAS))
+        return Input(description + f" and Player {revealer} showed {'you ' if turn.suggester.is_me else ''}"
+                                   f"{shown_card}", facts)
+    shown = "you showed a card" if turn.revealer.is_me else f"Player {revealer} showed a card"
+    return Input(f"{description} and {shown}", facts, clause=(revealer, suggestion))
+
+
+def track(eng):
+    """
+    Bring the Engine's Provenance up to date with its Turns and UPDATEs.
+    New inputs are added to it, and it's only rebuilt when earlier inputs were undone.
+
+    :param Engine eng:
+    :return Provenance:
+    """
+    keys = engine_keys(eng)
+    provenance = eng.provenance
+    if provenance is None or provenance.keys != keys[:len(provenance.keys)]:
+        provenance = Provenance(eng.num_players, {player.number: player.hand_size for player in eng.other_players})
+    new_keys = keys[len(provenance.keys):]
+    provenance.add([_engine_input(eng, key) for key in new_keys], new_keys)
+    eng.provenance = provenance
+    return provenance
+
+
+def find_conflict(eng):
+    """
+    :param Engine eng:
+    :return Conflict|None: A minimal set of the Engine's inputs that contradict each other, if there is one
+    """
+    return track(eng).minimal_conflict()
+
+
+def explain(eng, player_num, card):
+    """
+    :param Engine eng:
+    :param int player_num:  0 for the Murder envelope
+    :param str card:
+    :return list[str]: What the Engine knows about whether the Player HAS the card, and why, one line each
+    """
+    provenance = track(eng)
+    found = provenance.justify(player_num, card)
+    if found is None:
+        return [f"Whether {_holder(player_num)} has {card} isn't known"]
+    kind, rule, inputs = found
+    return [f"{_holder(player_num)} {kind} {card} (by '{rule}'), from:"] + \
+        [f"  - {provenance.inputs[index].description}" for index in inputs]
@@ -0,0 +1,82 @@
+"""
+This module recommends what to suggest on YOUR Turn, by ranking every possible suggestion
+    (one card per category) by how much it's expected to teach you about the deal.
+
+The expected information gain of a suggestion is the entropy of its response (who reveals which card,
+    or nobody), minus the uncertainty that comes only from which card a Revealer chooses to show.
+Response probabilities come from the matrix of card probabilities, treating each card's owner
+    as independent of the others'. Every suggestion is scored at once with NumPy.
+"""
+import itertools
+
+import numpy as np
+
+from defs import CATEGORIES, CARD_ORDER
+from probability import DealProbabilities
+
+# Card indices (into CARD_ORDER) of every possible suggestion
+SUGGESTIONS = np.array(
+    list(itertools.product(*[[CARD_ORDER.index(card) for card in category.__members__] for category in CATEGORIES]))
+)
+
+# Every non-empty subset of a suggestion's cards that a responding Player might hold, and its size
+_HELD_SUBSETS = np.array(
+    [subset for subset in itertools.product([False, True], repeat=len(CATEGORIES)) if any(subset)]
+)
+_HELD_SUBSET_SIZES = _HELD_SUBSETS.sum(axis=1)
+
+
+def probability_matrix(probabilities: DealProbabilities, player_numbers):
+    """
+    :param DealProbabilities probabilities:
+    :param list[int] player_numbers:
+    :return np.ndarray: The probability of each card (columns, in CARD_ORDER) being held by each Player
+                        (rows, in the order given)
+    """
+    matrix = np.zeros((len(player_numbers), len(CARD_ORDER)))
+    for row, number in enumerate(player_numbers):
+        for card, p in probabilities.player_probabilities(number).items():
+            matrix[row, CARD_ORDER.index(card)] = p
+    return matrix
+
+
+def expected_information_gain(holder_probabilities: np.ndarray, suggestions: np.ndarray = SUGGESTIONS):
+    """
+    Score suggestions by expected information gain, in bits
+
+    :param np.ndarray holder_probabilities: The probability of each card being held by each responding Player,
+                                            rows in the order the Players respond to the suggestion
+    :param np.ndarray suggestions:          The card indices of each suggestion, one suggestion per row
+    :return np.ndarray: The expected gain of each suggestion
+    """
+    # held[i, s, c]: the chance that the i-th responder holds card c of suggestion s
+    held = holder_probabilities[:, suggestions]
+    # Chance that card c is not held by any of the first i (or i+1) responders
+    not_held_through = np.clip(1 - np.cumsum(held, axis=0), 0, 1)
+
+    # holds_exactly[i, s, h]: the chance that the i-th responder is the first to hold any of suggestion s's cards,
+    #   and holds exactly the cards of subset h (the others being held by nobody up to and including them)
+    factors = np.where(_HELD_SUBSETS[None, None, :, :], held[:, :, None, :], not_held_through[:, :, None, :])
+    holds_exactly = factors.prod(axis=3)
+    # The Revealer shows one of the cards they hold, each as likely as the others
+    reveals = np.einsum('ish,hc->isc', holds_exactly / _HELD_SUBSET_SIZES, _HELD_SUBSETS.astype(float))
+    nobody = not_held_through[-1].prod(axis=1)
+
+    outcomes = np.concatenate([reveals.transpose(1, 0, 2).reshape(len(suggestions), -1), nobody[:, None]], axis=1)
+    response_entropy = -np.sum(outcomes * np.log2(np.where(outcomes > 0, outcomes, 1)), axis=1)
+    choice_entropy = np.einsum('ish,h->s', holds_exactly, np.log2(_HELD_SUBSET_SIZES))
+    return response_entropy - choice_entropy
+
+
+def rank_suggestions(probabilities: DealProbabilities, responder_numbers, top=5):
+    """
+    Rank every possible suggestion by expected information gain
+
+    :param DealProbabilities probabilities:
+    :param list[int] responder_numbers: The Players who respond to the suggestion, in order of response
+    :param int top:                     How many suggestions to return
+    :return list[tuple[float, tuple[str, str, str]]]: (expected gain in bits, suggested cards), best first
+    """
+    gains = expected_information_gain(probability_matrix(probabilities, responder_numbers))
+    best = np.argsort(-gains, kind='stable')[:top]
+    return [(float(gains[i]), tuple(CARD_ORDER[card] for card in SUGGESTIONS[i])) for i in best]
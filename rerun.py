@@ -1,40 +1,18 @@
-import dill
-from defs import Turn
-from clue_solver import Engine, PICKLE_GAME
+"""
+Pick up a game where you left off, by replaying its journal (see journal.py) into a fresh Engine.
+Turns entered from here on are appended to the same journal.
 
+    >>> python3 rerun.py [path/to/game_journal.jsonl]
+"""
+import sys
 
-def get_turn_players(eng: Engine, turn: Turn):
-    eng_suggester = eng_revealer = None
-    if turn.suggester:
-        eng_suggester = eng.get_player(turn.suggester.number)
-    if turn.revealer:
-        eng_revealer = eng.get_player(turn.revealer.number)
-    return eng_suggester, eng_revealer
+from journal import GameJournal, JOURNAL_FILE, replay_journal
 
 
 def main():
-    with open(PICKLE_GAME, 'rb') as f:
-        game_info = dill.load(f)
-
-    # Unpack pickled state
-    num_players, my_player_num, my_hand, turn_sequence = game_info
-    eng = Engine(num_players, my_player_num, my_hand)
-    for turn in turn_sequence[1:]:  # Skip Turn 0; eng already has it
-        eng_suggester, eng_revealer = get_turn_players(eng, turn)
-        new_turn = Turn(
-            number=turn.number,
-            suggestion=turn.suggestion,
-            suggester=eng_suggester,
-            revealer=eng_revealer,
-            is_pass=turn.is_pass,
-        )
-        if new_turn.suggester and new_turn.suggester.is_me:
-            new_turn.revealed_card = turn.revealed_card
-        eng.one_time_turn_deductions(new_turn)
-        eng.turn_sequence.append(new_turn)
-
-    # Process all turns for info
-    eng.process_turns_for_info()
+    path = sys.argv[1] if len(sys.argv) > 1 else JOURNAL_FILE
+    eng = replay_journal(path)
+    eng.journal = GameJournal(path, new_game=False)
 
     # Resume play from where you left off
     eng.run()
@@ -0,0 +1,249 @@
+"""
+This module estimates card probabilities by drawing random deals consistent with the Engine's knowledge.
+Use it when there are too many consistent deals to count them all with probability.enumerate_deals(),
+    as happens in the first few Turns of a game.
+
+Deals are drawn by sequential importance sampling:
+    1. The Murder Cards are drawn uniformly from each category's candidates
+    2. Every other unknown card, most constrained first, goes to a random Player among those
+        who could be holding it and still have room in their HAND
+    3. The deal is dropped if a card had nowhere to go, or if an unprocessed Turn's Revealer
+        ended up without any of its possible reveals
+A deal is weighted by the number of choices made while dealing it (the inverse of the chance of drawing it),
+    so the weighted deals estimate the probabilities over all consistent deals, each equally likely.
+"""
+import atexit
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from defs import CARD_ORDER, mask_to_bits
+from probability import DealConstraints, DealProbabilities, EstimationCancelled, SamplingFailed
+
+# The number of deals drawn in each unit of work (a "chunk") handed to a process
+CHUNK_SIZE = 500
+
+_pool = None
+_pool_processes = None
+
+
+class DealSampler(object):
+    """
+    Draws random deals consistent with a DealConstraints snapshot.
+    The possible holders of each card are worked out once, so each deal is cheap to draw.
+    """
+    def __init__(self, constraints: DealConstraints):
+        self.constraints = constraints
+        known_hands = 0
+        for hand in constraints.hands:
+            known_hands |= hand
+        self.capacities = [size - hand.bit_count() for size, hand in zip(constraints.hand_sizes, constraints.hands)]
+        self.murder_candidates = constraints.murder_candidates()
+
+        unknown = ((1 << len(CARD_ORDER)) - 1) & ~known_hands
+        holders = {
+            bit: [i for i, capacity in enumerate(self.capacities) if capacity and constraints.candidates[i] & bit]
+            for bit in mask_to_bits(unknown)
+        }
+        # (card, possible holders), dealing the cards with the fewest possible holders first
+        self.cards = sorted(holders.items(), key=lambda item: len(item[1]))
+        # Turns already satisfied by the known HANDS can't rule out a deal
+        self.turn_constraints = [(index, reveals) for index, reveals in constraints.turn_constraints
+                                 if not reveals & constraints.hands[index]]
+
+    def draw(self, rng: random.Random):
+        """
+        Draw one deal
+
+        :return tuple[float, int, list[int]]|None:  The deal's weight, the Murder Cards' mask and every
+                                                    Player's HAND mask, or None if the deal was dropped
+        """
+        envelope = 0
+        for category_cards in self.murder_candidates:
+            envelope |= rng.choice(category_cards)
+
+        capacities = self.capacities[:]
+        hands = list(self.constraints.hands)
+        weight = 1.0
+        for bit, holders in self.cards:
+            if bit & envelope:
+                continue
+            options = [i for i in holders if capacities[i]]
+            if not options:
+                return None
+            holder = rng.choice(options)
+            weight *= len(options)
+            capacities[holder] -= 1
+            hands[holder] |= bit
+
+        for index, reveals in self.turn_constraints:
+            if not hands[index] & reveals:
+                return None
+        return weight, envelope, hands
+
+    def run_chunk(self, seed, num_draws, deadline=None, should_stop=None):
+        """
+        Draw num_draws deals, or as many as can be drawn before the deadline, or before should_stop() returns True
+
+        :param seed:            Seeds the chunk's random number generator
+        :param int num_draws:
+        :param float deadline:  time.time() after which to stop early
+        :param should_stop:     Called alongside the deadline check
+        :return tuple: (weighted per-Player card counts, weighted Murder card counts,
+                        total weight, total squared weight, deals drawn)
+        """
+        rng = random.Random(seed)
+        player_counts = [[0.0] * len(CARD_ORDER) for _ in self.capacities]
+        murder_counts = [0.0] * len(CARD_ORDER)
+        total_weight = total_squared_weight = 0.0
+        drawn = 0
+        while drawn < num_draws:
+            if not drawn % 50 and (deadline is not None and time.time() > deadline
+                                   or should_stop is not None and should_stop()):
+                break
+            drawn += 1
+            deal = self.draw(rng)
+            if deal is None:
+                continue
+            weight, envelope, hands = deal
+            total_weight += weight
+            total_squared_weight += weight * weight
+            for bit in mask_to_bits(envelope):
+                murder_counts[bit.bit_length() - 1] += weight
+            for counts, hand in zip(player_counts, hands):
+                for bit in mask_to_bits(hand):
+                    counts[bit.bit_length() - 1] += weight
+        return player_counts, murder_counts, total_weight, total_squared_weight, drawn
+
+
+class SampledProbabilities(DealProbabilities):
+    """
+    Card probabilities estimated from a weighted sample of the consistent deals, with confidence intervals
+    """
+    def __init__(self, constraints: DealConstraints, player_counts, murder_counts,
+                 total_weight, total_squared_weight, num_drawn):
+        super().__init__(constraints, player_counts, murder_counts, total_weight, exact=False)
+        self.num_drawn = num_drawn
+        # The number of equally-weighted deals that would give estimates as precise as these
+        self.effective_samples = total_weight * total_weight / total_squared_weight
+
+    def confidence_interval(self, player_number, card, z=1.96):
+        """
+        The Wilson score interval around the estimated probability that the Player holds the card
+            (player_number 0 means the Murder envelope). z=1.96 gives a 95% interval.
+
+        :return tuple[float, float]:
+        """
+        p = self.probability(player_number, card)
+        n = self.effective_samples
+        denominator = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def sample_deals(constraints: DealConstraints, num_samples=None, time_budget=None, processes=None, seed=None,
+                 should_stop=None):
+    """
+    Estimate card probabilities from random deals consistent with the constraints,
+        spreading the work across a pool of processes.
+    At least one of num_samples and time_budget should be given. With a seed and no time_budget,
+        the result is the same however many processes do the work.
+
+    :param DealConstraints constraints:
+    :param int num_samples:     Stop once this many deals have been drawn
+    :param float time_budget:   Stop after this many seconds
+    :param int processes:       The size of the process pool; 1 draws every deal in this process
+    :param seed:                Seed for a reproducible sample
+    :param should_stop:         Called every so often; give up (raising EstimationCancelled) once it returns True
+    :return SampledProbabilities:
+    :raises SamplingFailed:     If none of the deals drawn are consistent with the constraints
+    """
+    if num_samples is None and time_budget is None:
+        raise ValueError("sample_deals() needs a num_samples or a time_budget")
+    sampler = DealSampler(constraints)
+    deadline = None if time_budget is None else time.time() + time_budget
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    processes = processes or os.cpu_count() or 1
+
+    if num_samples is not None:
+        chunks = [min(CHUNK_SIZE, num_samples - start) for start in range(0, num_samples, CHUNK_SIZE)]
+    else:
+        chunks = None
+
+    results = []
+    if processes == 1:
+        for i, chunk_size in enumerate(chunks if chunks is not None else itertools.repeat(CHUNK_SIZE)):
+            results.append(sampler.run_chunk(f"{seed}:{i}", chunk_size, deadline, should_stop))
+            if should_stop is not None and should_stop():
+                raise EstimationCancelled()
+            if deadline is not None and time.time() > deadline:
+                break
+    else:
+        results = _run_chunks_in_pool(sampler, chunks, deadline, seed, processes, should_stop)
+
+    player_counts = [[0.0] * len(CARD_ORDER) for _ in constraints.numbers]
+    murder_counts = [0.0] * len(CARD_ORDER)
+    total_weight = total_squared_weight = 0.0
+    drawn = 0
+    for chunk_player_counts, chunk_murder_counts, chunk_weight, chunk_squared_weight, chunk_drawn in results:
+        for counts, chunk_counts in zip(player_counts, chunk_player_counts):
+            for i, count in enumerate(chunk_counts):
+                counts[i] += count
+        for i, count in enumerate(chunk_murder_counts):
+            murder_counts[i] += count
+        total_weight += chunk_weight
+        total_squared_weight += chunk_squared_weight
+        drawn += chunk_drawn
+
+    if not total_weight:
+        raise SamplingFailed(f"none of the {drawn} random deals drawn agree with what the Engine knows")
+    return SampledProbabilities(constraints, player_counts, murder_counts, total_weight, total_squared_weight, drawn)
+
+
+def _run_chunks_in_pool(sampler: DealSampler, chunks, deadline, seed, processes, should_stop=None):
+    """
+    Run the chunks of work in the process pool, in order of chunk index so the results are reproducible.
+    Without a fixed list of chunks, keep every process busy with new chunks until the deadline.
+    should_stop() is checked before each chunk is collected, since it can't be sent to the processes:
+        once it returns True, the chunks already queued are left to finish unread.
+    """
+    pool = _get_pool(processes)
+    chunk_sizes = iter(chunks) if chunks is not None else itertools.repeat(CHUNK_SIZE)
+    results = []
+    pending = []
+    num_chunks = 0
+    while True:
+        if should_stop is not None and should_stop():
+            raise EstimationCancelled()
+        # Keep only a couple of chunks per process queued, so that stopping doesn't leave the pool busy for long
+        while len(pending) < 2 * processes and (chunks is not None or time.time() < deadline):
+            chunk_size = next(chunk_sizes, None)
+            if chunk_size is None:
+                break
+            pending.append(pool.apply_async(sampler.run_chunk, (f"{seed}:{num_chunks}", chunk_size, deadline)))
+            num_chunks += 1
+        if not pending:
+            return results
+        results.append(pending.pop(0).get())
+
+
+def _get_pool(processes):
+    """Reuse one process pool for every call, since starting the processes costs more than a small sample"""
+    global _pool, _pool_processes
+    if _pool is None or _pool_processes != processes:
+        if _pool is not None:
+            _pool.terminate()
+        _pool = multiprocessing.Pool(processes)
+        _pool_processes = processes
+    return _pool
+
+
+@atexit.register
+def _close_pool():
+    if _pool is not None:
+        _pool.terminate()
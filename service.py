@@ -0,0 +1,290 @@
+"""
+A local HTTP/JSON service hosting many games at once, e.g. a whole game night's worth of tables.
+
+Each game is a session wrapping its own Engine. The asyncio event loop only handles HTTP;
+    every Engine lives in one of a pool of worker processes, and all of a game's deductions run there.
+A game always goes to the same worker, so its Turns are applied in order,
+    while a slow game can't hold up the games on the other workers, or the event loop.
+
+    >>> python3 service.py --port 8080 --workers 4
+
+    POST   /games                   {"num_players": 4, "my_player_number": 1, "my_hand": ["rope", ...]}
+    POST   /games/<id>/turns        {"lines": ["pass", "plum,rope,hall,3", "mustard,rope,hall,3:rope"]}
+    POST   /games/<id>/updates      {"player": 2, "action": "lacks", "card": "rope"}
+    GET    /games/<id>              HANDS, POSSIBLES, accusation and the Turn history
+    DELETE /games/<id>
+
+Turn lines follow the game script grammar (see game_script.py). Each request is all-or-nothing:
+    if any line is mistaken, or contradicts what the Engine knows, none of the request is applied.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from game_script import ScriptError, ScriptReader, engine_state, ingest, parse_setup
+
+# The most bytes of request body the service will read
+MAX_BODY_SIZE = 1 << 20
+
+# The Engines of the games this worker process hosts, by game ID
+_engines = {}
+
+
+class ServiceError(Exception):
+    """A request the service can't fulfil, and the HTTP status to answer it with"""
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def game_state(eng):
+    """
+    Everything the Engine knows about a game, as a JSON-friendly dict
+
+    :param Engine eng:
+    :return dict:
+    """
+    state = engine_state(eng)
+    state['turn_history'] = [
+        {
+            'number': turn.number,
+            'suggester': turn.suggester.number,
+            'revealer': turn.revealer.number,
+            'suggestion': sorted(turn.suggestion),
+            'possible_reveals': sorted(turn.possible_reveals),
+            'revealed_card': turn.revealed_card,
+        }
+        for turn in eng.turn_sequence if not turn.is_pass
+    ]
+    return state
+
+
+"""
+The work done in the worker processes. Each returns (HTTP status, JSON-friendly response)
+"""
+
+
+def _create_game(game_id, num_players, my_player_number, my_hand):
+    from clue_solver import Engine
+
+    _engines[game_id] = Engine(num_players, my_player_number, list(my_hand))
+    return 201, dict(game_state(_engines[game_id]), game_id=game_id)
+
+
+def _submit_lines(game_id, lines):
+    eng = _engines.get(game_id)
+    if eng is None:
+        return 404, {'error': f"No game {game_id}"}
+    reader = ScriptReader(eng.num_players, eng.my_player_number, turn_number=len(eng.turn_sequence))
+    try:
+        actions = reader.parse_batch(list(enumerate(line.strip().lower() for line in lines)))
+    except ScriptError as e:
+        return 400, {'error': 'Mistaken lines', 'errors': [[index, error] for index, error in e.errors]}
+
+    eng.checkpoint(f"Request for {len(actions)} line(s)")
+    try:
+        ingest(eng, actions)
+    except ValueError as e:
+        # The lines contradict what the Engine knows: take them back
+        eng.undo()
+        return 409, {'error': f"Contradicts what the Engine knows: {e}"}
+    # Nothing is undone once a request is applied, so don't keep its checkpoint for the rest of the game
+    eng.history.pop()
+    return 200, game_state(eng)
+
+
+def _get_game(game_id):
+    eng = _engines.get(game_id)
+    if eng is None:
+        return 404, {'error': f"No game {game_id}"}
+    return 200, game_state(eng)
+
+
+def _delete_game(game_id):
+    if _engines.pop(game_id, None) is None:
+        return 404, {'error': f"No game {game_id}"}
+    return 200, {'game_id': game_id}
+
+
+class ClueService(object):
+    """Routes HTTP requests to the worker process hosting each game"""
+    def __init__(self, workers=None):
+        """
+        :param int workers: The number of worker processes (default one per CPU)
+        """
+        self.workers = [ProcessPoolExecutor(max_workers=1) for _ in range(workers or os.cpu_count() or 1)]
+        self._game_ids = itertools.count(1)
+
+    def _worker(self, game_id):
+        return self.workers[game_id % len(self.workers)]
+
+    async def _run(self, game_id, func, *args):
+        worker = self._worker(game_id)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(worker, func, game_id, *args)
+        except BrokenProcessPool:
+            # The worker process died, taking its games with it: start a new one for the games to come
+            index = game_id % len(self.workers)
+            if self.workers[index] is worker:
+                self.workers[index] = ProcessPoolExecutor(max_workers=1)
+            raise ServiceError(500, f"The worker process hosting game {game_id} stopped, and its games are lost")
+
+    async def handle(self, method, path, body):
+        """
+        Answer one request
+
+        :param str method:
+        :param str path:
+        :param dict body:   The request's JSON body
+        :return tuple[int, dict]: The HTTP status and JSON-friendly response
+        """
+        parts = path.strip('/').split('/')
+        if parts[0] != 'games' or len(parts) > 3:
+            raise ServiceError(404, f"No such endpoint {path}")
+
+        if len(parts) == 1:
+            if method != 'POST':
+                raise ServiceError(405, f"{method} not allowed on {path}")
+            try:
+                num_players, my_player_number = int(body['num_players']), int(body['my_player_number'])
+                my_hand = list(body['my_hand'])
+            except (KeyError, TypeError, ValueError):
+                raise ServiceError(400, "A game needs num_players, my_player_number and my_hand")
+            # Check the setup just as a game script's would be
+            setup = [(1, f"players {num_players}"), (2, f"me {my_player_number}"), (3, f"hand {','.join(my_hand)}")]
+            try:
+                parse_setup(iter(setup))
+            except ScriptError as e:
+                raise ServiceError(400, 'Mistaken game setup', [error for _, error in e.errors])
+            return await self._run(next(self._game_ids), _create_game, num_players, my_player_number, my_hand)
+
+        if not parts[1].isdigit():
+            raise ServiceError(404, f"No game {parts[1]}")
+        game_id = int(parts[1])
+        if len(parts) == 2:
+            if method == 'GET':
+                return await self._run(game_id, _get_game)
+            if method == 'DELETE':
+                return await self._run(game_id, _delete_game)
+            raise ServiceError(405, f"{method} not allowed on {path}")
+
+        if method != 'POST':
+            raise ServiceError(405, f"{method} not allowed on {path}")
+        if parts[2] == 'turns':
+            lines = body.get('lines')
+            if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+                raise ServiceError(400, "Turns are submitted as a list of 'lines'")
+        elif parts[2] == 'updates':
+            try:
+                lines = [f"{int(body['player'])},{body['action']},{body['card']}"]
+            except (KeyError, TypeError, ValueError):
+                raise ServiceError(400, "An update needs a player, an action ('has' or 'lacks') and a card")
+            if body['action'] not in ('has', 'lacks'):
+                raise ServiceError(400, f"An update's action is 'has' or 'lacks', not '{body['action']}'")
+        else:
+            raise ServiceError(404, f"No such endpoint {path}")
+        return await self._run(game_id, _submit_lines, lines)
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the requests on one (keep-alive) HTTP connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', maxsplit=2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                try:
+                    if length > MAX_BODY_SIZE:
+                        raise ServiceError(413, "Request body too large")
+                    raw_body = await reader.readexactly(length) if length else b''
+                    try:
+                        body = json.loads(raw_body) if raw_body else {}
+                    except ValueError:
+                        raise ServiceError(400, "The request body is not JSON")
+                    if not isinstance(body, dict):
+                        raise ServiceError(400, "The request body must be a JSON object")
+                    try:
+                        status, response = await self.handle(method.upper(), path, body)
+                    except ServiceError:
+                        raise
+                    except Exception as e:
+                        # A bug in the service, not a mistaken request: answer it rather than drop the connection
+                        raise ServiceError(500, f"Internal error: {type(e).__name__}: {e}")
+                except ServiceError as e:
+                    status, response = e.status, {'error': str(e)}
+                    if e.errors:
+                        response['errors'] = e.errors
+
+                payload = json.dumps(response, separators=(',', ':')).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # The client hung up, or didn't speak HTTP
+            pass
+        except asyncio.CancelledError:
+            # The service is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        :return asyncio.Server:
+        """
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.shutdown(cancel_futures=True)
+
+
+_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+async def serve(host, port, workers):
+    service = ClueService(workers)
+    server = await service.start(host, port)
+    print(f"Clue Solver service on http://{host}:{port} with {len(service.workers)} worker process(es)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many Clue Solver games over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, help="Worker processes hosting the games (default one per CPU)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
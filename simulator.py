@@ -0,0 +1,187 @@
+"""
+A headless Clue game simulator, for measuring the Engine without anyone typing at the prompt.
+
+Games are dealt at random the way setup_players() expects (one Murder Card per category,
+    then the rest dealt one at a time starting with Player 1). Every suggestion is a random
+    Suspect, Weapon and Room, and every response is truthful. The Turns are fed straight into the Engine.
+
+    >>> python3 simulator.py --games 1000 --seed 0
+"""
+import argparse
+import random
+import statistics
+import time
+
+from defs import CATEGORIES, CARD_ORDER, MAX_PLAYERS, Turn
+from clue_solver import Engine, NOBODY
+
+
+def deal(rng: random.Random, num_players: int):
+    """
+    Deal a random game
+
+    :return tuple[list[str], dict[int, list[str]]]: The Murder Cards, and each Player's HAND by Player number
+    """
+    murder_cards = [rng.choice(list(category.__members__)) for category in CATEGORIES]
+    deck = [card for card in CARD_ORDER if card not in murder_cards]
+    rng.shuffle(deck)
+    hands = {number: deck[number - 1::num_players] for number in range(1, num_players + 1)}
+    return murder_cards, hands
+
+
+def respond(rng: random.Random, hands: dict, suggester_num: int, suggestion):
+    """
+    Find the first Player after the Suggester who holds a suggested card, and the card they show
+
+    :return tuple[int, str|None]: The Revealer's number (0 if nobody) and the card shown
+    """
+    num_players = len(hands)
+    for offset in range(1, num_players):
+        responder_num = (suggester_num + offset - 1) % num_players + 1
+        held = [card for card in suggestion if card in hands[responder_num]]
+        if held:
+            return responder_num, rng.choice(held)
+    return 0, None
+
+
+def random_suggestion(rng: random.Random):
+    return [rng.choice(list(category.__members__)) for category in CATEGORIES]
+
+
+def random_game(seed, num_turns=60, pass_rate=0.15, num_players=None):
+    """
+    Play a random game of num_turns Turns, recorded in the format of bench_clue_solver.RECORDED_GAMES
+
+    :param int num_players: Default 3 to MAX_PLAYERS, at random
+    :return dict:
+    """
+    rng = random.Random(seed)
+    num_players = num_players or rng.randint(3, MAX_PLAYERS)
+    my_player_number = rng.randint(1, num_players)
+    murder_cards, hands = deal(rng, num_players)
+
+    turns = []
+    for turn_number in range(1, num_turns + 1):
+        suggester_num = (turn_number % num_players) or num_players
+        if rng.random() < pass_rate:
+            turns.append('pass')
+            continue
+        suggestion = random_suggestion(rng)
+        revealer_num, shown_card = respond(rng, hands, suggester_num, suggestion)
+        line = f"{','.join(suggestion)},{revealer_num}"
+        if suggester_num == my_player_number and shown_card:
+            line += f":{shown_card}"
+        turns.append(line)
+    return dict(num_players=num_players, my_player_number=my_player_number,
+                my_hand=hands[my_player_number], turns=turns, murder_cards=murder_cards)
+
+
+class GameResult(object):
+    """What happened in one simulated game"""
+    def __init__(self, seed, num_players, turns_to_accuse, propagation_times):
+        self.seed = seed
+        self.num_players = num_players
+        # The Turn after which the Engine was ready to accuse, or None if it never was
+        self.turns_to_accuse = turns_to_accuse
+        # Seconds spent in process_turns_for_info() after each suggestion
+        self.propagation_times = propagation_times
+
+
+def simulate_game(seed, max_turns=300, pass_rate=0.15, num_players=None):
+    """
+    Play a random game through the Engine, Turn by Turn, until the Engine is ready to accuse
+
+    :param seed:
+    :param int max_turns:   Give up on the game after this many Turns
+    :param float pass_rate: The chance that a Player passes on their Turn
+    :param int num_players: Default 3 to MAX_PLAYERS, at random
+    :return GameResult:
+    """
+    rng = random.Random(seed)
+    num_players = num_players or rng.randint(3, MAX_PLAYERS)
+    my_player_number = rng.randint(1, num_players)
+    murder_cards, hands = deal(rng, num_players)
+    eng = Engine(num_players, my_player_number, list(hands[my_player_number]))
+
+    propagation_times = []
+    for turn_number in range(1, max_turns + 1):
+        suggester_num = (turn_number % num_players) or num_players
+        if rng.random() < pass_rate:
+            eng.turn_sequence.append(Turn(number=turn_number, is_pass=True))
+            continue
+
+        suggestion = random_suggestion(rng)
+        revealer_num, shown_card = respond(rng, hands, suggester_num, suggestion)
+        turn = Turn(
+            number=turn_number,
+            suggestion=suggestion,
+            suggester=eng.get_player(suggester_num),
+            revealer=eng.get_player(revealer_num) if revealer_num else NOBODY,
+        )
+        if suggester_num == my_player_number and shown_card:
+            turn.revealed_card = shown_card
+        eng.one_time_turn_deductions(turn)
+        eng.turn_sequence.append(turn)
+
+        start = time.perf_counter()
+        eng.process_turns_for_info()
+        propagation_times.append(time.perf_counter() - start)
+
+        if eng.ready_to_accuse():
+            if set(eng.accusation) != set(murder_cards):
+                raise ValueError(f"Game {seed}: the Engine accused {set(eng.accusation)}, not {murder_cards}")
+            return GameResult(seed, num_players, turn_number, propagation_times)
+    return GameResult(seed, num_players, None, propagation_times)
+
+
+def percentile(sorted_values, fraction):
+    """The value below which the given fraction of sorted_values fall (nearest rank)"""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_benchmark(num_games=1000, seed=0, max_turns=300):
+    """
+    Simulate a fixed corpus of games (seed, seed + 1, ...) and report the Engine's throughput
+
+    :return dict: The headline numbers, also logged to the console
+    """
+    start = time.perf_counter()
+    results = [simulate_game(seed + i, max_turns=max_turns) for i in range(num_games)]
+    elapsed = time.perf_counter() - start
+
+    turns_to_accuse = sorted(result.turns_to_accuse for result in results if result.turns_to_accuse is not None)
+    latencies = sorted(t for result in results for t in result.propagation_times)
+    report = {
+        'games': num_games,
+        'games_per_second': num_games / elapsed,
+        'games_solved': len(turns_to_accuse),
+        'turns_to_accuse_mean': statistics.mean(turns_to_accuse) if turns_to_accuse else None,
+        'turns_to_accuse_median': statistics.median(turns_to_accuse) if turns_to_accuse else None,
+        'propagations': len(latencies),
+        'propagation_ms_p50': percentile(latencies, 0.50) * 1000,
+        'propagation_ms_p90': percentile(latencies, 0.90) * 1000,
+        'propagation_ms_p99': percentile(latencies, 0.99) * 1000,
+        'propagation_ms_max': latencies[-1] * 1000,
+    }
+    print(f"Simulated {num_games} games (seeds {seed}-{seed + num_games - 1}) in {elapsed:.2f}s: "
+          f"{report['games_per_second']:.1f} games/second")
+    if turns_to_accuse:
+        print(f"  Ready to accuse in {len(turns_to_accuse)} games, after {report['turns_to_accuse_mean']:.1f} Turns "
+              f"on average (median {report['turns_to_accuse_median']})")
+    print(f"  process_turns_for_info() over {len(latencies)} Turns: "
+          f"p50 {report['propagation_ms_p50']:.3f}ms, p90 {report['propagation_ms_p90']:.3f}ms, "
+          f"p99 {report['propagation_ms_p99']:.3f}ms, max {report['propagation_ms_max']:.3f}ms")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Clue games through the Engine and report its throughput")
+    parser.add_argument('--games', type=int, default=1000, help="Number of games to simulate")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first game in the corpus")
+    parser.add_argument('--max-turns', type=int, default=300, help="Give up on a game after this many Turns")
+    args = parser.parse_args()
+    run_benchmark(num_games=args.games, seed=args.seed, max_turns=args.max_turns)
+
+
+if __name__ == '__main__':
+    main()
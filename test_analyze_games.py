@@ -0,0 +1,95 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import TestCase
+
+import analyze_games as ag
+import defs
+import journal as jn
+from bench_clue_solver import RECORDED_GAMES, feed, replay
+
+
+def script_text(game):
+    lines = [f"players {game['num_players']}", f"me {game['my_player_number']}", f"hand {','.join(game['my_hand'])}"]
+    return '\n'.join(lines + game['turns']) + '\n'
+
+
+class TestAnalyzeGames(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.game = RECORDED_GAMES['four_player_40_turns']
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_formats_agree(self):
+        """A game summarizes the same whether it was archived as a pickle, a journal or a script"""
+        eng = feed(self.game)
+        with open(self.path('game_play.pkl'), 'wb') as f:
+            pickle.dump([eng.num_players, eng.my_player_number, eng.my_hand, eng.turn_sequence], f)
+        journal = jn.GameJournal(self.path('game_journal.jsonl'))
+        journal.record_setup(eng.num_players, eng.my_player_number, eng.my_hand)
+        for turn in eng.turn_sequence[1:]:
+            journal.record_turn(turn)
+        journal.close()
+        with open(self.path('game.txt'), 'w') as f:
+            f.write(script_text(self.game))
+
+        paths = ag.find_games(self.directory.name)
+        self.assertEqual(len(paths), 3)
+        summaries = list(ag.analyze_games(paths, processes=2))
+        self.assertEqual([summary['game'] for summary in summaries], paths)
+        for summary in summaries:
+            del summary['game']
+        self.assertEqual(summaries[0], summaries[1])
+        self.assertEqual(summaries[0], summaries[2])
+
+        summary = summaries[0]
+        self.assertEqual(summary['turns'], len(self.game['turns']))
+        self.assertIsNone(summary['contradiction'])
+        self.assertTrue(all(summary['card_known_on_turn'][card] == 0 for card in self.game['my_hand']))
+        # Every card the Engine knows by the end of the game has the Turn it became known
+        expected = replay(self.game)
+        known = {card for card in defs.ALL_CARDS
+                 if card in expected.accusation or any(card in player.hand for player in expected.all_players)}
+        self.assertEqual(set(summary['card_known_on_turn']), known)
+
+    def test_legacy_pickled_cards(self):
+        """Before cards were stored as bitmasks, a card set was pickled as a dict of sets by category"""
+        turn = defs.Turn()
+        turn.__dict__.pop('suggestion', None)
+        turn.__dict__['suggestion_dict'] = {'Suspect': {'plum'}, 'Weapon': {'rope'}, 'Room': {'hall'}}
+        self.assertEqual(ag._cards(turn, 'suggestion'), {'plum', 'rope', 'hall'})
+
+    def test_journal_undo(self):
+        journal = jn.GameJournal(self.path('game_journal.jsonl'))
+        journal.record_setup(4, 1, self.game['my_hand'])
+        journal._append({'type': 'turn', 'number': 1, 'pass': True})
+        journal.record_update(2, 3, 'has', 'rope')
+        journal.record_undo(1)
+        journal._append({'type': 'turn', 'number': 2, 'suggestion': ['hall', 'plum', 'rope'],
+                         'suggester': 2, 'revealer': 3, 'revealed': None})
+        journal.close()
+        _, _, _, actions = ag.load_journal_game(self.path('game_journal.jsonl'))
+        self.assertEqual(actions, [('pass', 1), ('turn', 2, ['hall', 'plum', 'rope'], 3, None)])
+
+    def test_contradiction(self):
+        # Player 3 can't show Player 2 any card, since Player 1 (me) holds them all
+        game = dict(self.game, turns=['pass', 'white,candlestick,lounge,3'] + ['pass'] * 5)
+        with open(self.path('game.txt'), 'w') as f:
+            f.write(script_text(game))
+        summary = ag.analyze_game(self.path('game.txt'))
+        self.assertEqual(summary['contradiction']['turn'], 2)
+
+    def test_unreadable_game(self):
+        with open(self.path('game_play.pkl'), 'w') as f:
+            f.write('not a pickle')
+        self.assertIn('error', ag.analyze_game(self.path('game_play.pkl')))
+
+
+if __name__ == "__main__":
+    unittest.main()
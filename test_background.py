@@ -0,0 +1,145 @@
+import threading
+import unittest
+from unittest import TestCase, mock
+
+import background as bg
+import display
+from bench_clue_solver import RECORDED_GAMES, parse_turn, replay
+from probability import SamplingFailed, estimate_probabilities
+from recommender import rank_suggestions
+
+
+def add_turn(eng, line):
+    turn = parse_turn(eng, len(eng.turn_sequence), line)
+    eng.checkpoint(f"Turn {turn.number}")
+    eng.one_time_turn_deductions(turn)
+    eng.turn_sequence.append(turn)
+    eng.process_turns_for_info()
+
+
+def learn(eng, player_num, card):
+    eng.checkpoint(f"UPDATE Player {player_num} lacks {card}")
+    eng.apply_update(player_num, 'lacks', card)
+    eng.process_turns_for_info()
+
+
+class TestAnalyst(TestCase):
+    def setUp(self):
+        self.game = RECORDED_GAMES['four_player_40_turns']
+        self.engine = replay(dict(self.game, turns=self.game['turns'][:20]))
+        self.analyst = bg.Analyst()
+
+    def tearDown(self):
+        self.analyst.close()
+
+    def test_matches_analysis_on_the_spot(self):
+        analysis = self.analyst.latest(self.engine, timeout=10)
+        self.assertTrue(self.analyst.is_current(analysis, self.engine))
+        self.assertEqual(analysis.turn_number, 20)
+
+        constraints, responders, _ = bg.snapshot(self.engine)
+        probabilities = estimate_probabilities(constraints)
+        self.assertEqual(analysis.probabilities.num_deals, probabilities.num_deals)
+        self.assertEqual(analysis.suggestions, rank_suggestions(probabilities, responders))
+
+    def test_cached(self):
+        analysis = self.analyst.latest(self.engine, timeout=10)
+        # A pass teaches nothing, so its analysis is the one before
+        add_turn(self.engine, 'pass')
+        with mock.patch('background.estimate_probabilities') as estimate:
+            self.assertIs(self.analyst.latest(self.engine, timeout=0), analysis)
+            estimate.assert_not_called()
+        self.assertTrue(self.analyst.is_current(analysis, self.engine))
+
+        # Undoing an UPDATE goes back to the analysis before it
+        learn(self.engine, 2, 'conservatory')
+        self.assertIsNot(self.analyst.latest(self.engine, timeout=10), analysis)
+        self.engine.undo()
+        self.assertIs(self.analyst.get(self.analyst.request(self.engine)), analysis)
+
+    def test_stale_work_is_cancelled(self):
+        started, release = threading.Event(), threading.Event()
+        stop_checks = []
+
+        def slow_estimate(constraints, **budget):
+            started.set()
+            release.wait(10)
+            stop_checks.append(budget['should_stop']())
+            return estimate_probabilities(constraints, **budget)
+
+        with mock.patch('background.estimate_probabilities', side_effect=slow_estimate) as estimate:
+            first = self.analyst.request(self.engine)
+            started.wait(10)
+            learn(self.engine, 2, 'conservatory')
+            second = self.analyst.request(self.engine)
+            learn(self.engine, 4, 'hall')
+            third = self.analyst.request(self.engine)
+
+            # Nothing new is shown while the first analysis is still running
+            self.assertIsNone(self.analyst.latest(self.engine, timeout=0))
+            release.set()
+            latest = self.analyst.latest(self.engine, timeout=10)
+
+        self.assertIs(latest, self.analyst.get(third))
+        # The second never started, and the first was told to give up its probabilities, and isn't kept
+        self.assertEqual(estimate.call_count, 2)
+        self.assertEqual(stop_checks, [True, False])
+        self.assertIsNone(self.analyst.get(second))
+        self.assertIsNone(self.analyst.get(first))
+        self.assertIsNotNone(latest.suggestions)
+
+    def test_failed_sample_is_shown_but_not_kept(self):
+        with mock.patch('background.estimate_probabilities', side_effect=SamplingFailed('unlucky')) as estimate:
+            analysis = self.analyst.latest(self.engine, timeout=10)
+            self.assertIsInstance(analysis.probabilities, SamplingFailed)
+            self.assertIsNone(analysis.suggestions)
+            self.assertTrue(self.analyst.is_current(analysis, self.engine))
+            # Asking again has another go at it
+            self.analyst.latest(self.engine, timeout=10)
+        self.assertEqual(estimate.call_count, 2)
+        self.assertIsNone(self.analyst.get(analysis.key))
+
+
+class TestBoard(TestCase):
+    def setUp(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        self.engine = replay(dict(game, turns=game['turns'][:20]))
+        self.engine.analyst = bg.Analyst()
+        self.engine.renderer = display.BoardRenderer(out=mock.Mock(), ansi=False)
+
+    def tearDown(self):
+        self.engine.analyst.close()
+
+    def frame(self):
+        return '\n'.join(self.engine.renderer.frame(self.engine, suggestions=True))
+
+    def test_board(self):
+        release = threading.Event()
+
+        def slow_estimate(constraints, **budget):
+            release.wait(10)
+            return estimate_probabilities(constraints, **budget)
+
+        with mock.patch('background.estimate_probabilities', side_effect=slow_estimate):
+            self.engine.analyst.wait = 0
+            self.engine.render_board(suggestions=True)
+            self.assertIn('Being worked out in the background', self.frame())
+            release.set()
+
+        self.engine.analyst.wait = 10
+        self.engine.render_board(suggestions=True)
+        frame = self.frame()
+        self.assertIn('Murder Cards:', frame)
+        self.assertIn('Suggestions', frame)
+        self.assertNotIn('in the background', frame)
+
+        # Until the next UPDATE is worked out, the board shows the last one's
+        learn(self.engine, 2, 'conservatory')
+        analysis = self.engine.analysis
+        with mock.patch.object(self.engine.analyst, 'latest', return_value=analysis):
+            self.engine.render_board(suggestions=True)
+        self.assertIn('As of Turn 20: the latest are being worked out in the background', self.frame())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+from unittest import mock, TestCase
+
+import bench_clue_solver as bench
+
+
+class TestBenchmarks(TestCase):
+    def test_micro_benchmarks_run(self):
+        """Every micro-benchmark fixture must still be a consistent game state"""
+        for stage in bench.STAGES:
+            for name, (func, setup) in bench.micro_benchmarks(stage).items():
+                with self.subTest(stage=stage, benchmark=name):
+                    self.assertEqual(len(bench.time_it(func, 2, setup)), 2)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'min_ms': 1.0, 'median_ms': 1.0}, 'b': {'min_ms': 1.0, 'median_ms': 1.0}}
+        results = {'a': {'min_ms': 1.1, 'median_ms': 1.1}, 'b': {'min_ms': 1.5, 'median_ms': 1.5},
+                   'c': {'min_ms': 9.0, 'median_ms': 9.0}}
+        with mock.patch('builtins.print'):
+            self.assertEqual(bench.compare(results, baseline, threshold=0.2), ['b'])
+
+
+if __name__ == "__main__":
+    unittest.main()
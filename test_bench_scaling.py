@@ -0,0 +1,34 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+import bench_scaling
+import defs
+
+
+class TestScalingBenchmark(TestCase):
+    def test_scaled_deck(self):
+        deck = bench_scaling.scaled_deck(31, num_categories=4)
+        self.assertEqual([len(cards) for cards in deck['categories'].values()], [8, 8, 8, 7])
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(deck, f)
+        try:
+            categories, max_players = defs.load_deck(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(sum(len(category.__members__) for category in categories), 31)
+        self.assertEqual(max_players, 10)
+
+    def test_measure_deck(self):
+        """A game with another deck, and more Players than the classic deck allows, is solved in its own process"""
+        report = bench_scaling.measure_deck(bench_scaling.scaled_deck(40, num_categories=4), num_players=8, num_games=3)
+        self.assertEqual(report['cards'], 40)
+        self.assertEqual(report['players'], 8)
+        self.assertEqual(report['games_solved'], 3)
+        self.assertGreater(report['propagations'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
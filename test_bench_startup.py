@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+import bench_startup
+
+
+class TestStartupBenchmark(TestCase):
+    def test_first_prompt_needs_no_heavy_imports(self):
+        """Nothing the setup prompts don't need is imported before them"""
+        output = subprocess.run(
+            [sys.executable, '-c', "import sys, clue_solver; print(sorted({'numpy', 'multiprocessing'} & set(sys.modules)))"],
+            cwd=bench_startup.HERE, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
+
+    def test_time_to_prompt(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            ms = bench_startup.time_to_prompt([os.path.join(bench_startup.HERE, 'clue_solver.py')],
+                                              bench_startup.SETUP_PROMPT, cwd)
+            self.assertGreater(ms, 0)
+            # Nothing is written before the game is set up
+            self.assertEqual(os.listdir(cwd), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
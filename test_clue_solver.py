@@ -1,9 +1,14 @@
+import json
+import os
+import tempfile
 import unittest
 from unittest import mock, TestCase
 
 import clue_solver
 import clue_solver as cs
 import defs
+from bench_clue_solver import RECORDED_GAMES, parse_turn
+from simulator import random_game
 
 
 class TestGlobalMethods(TestCase):
@@ -37,6 +42,83 @@ class TestGlobalMethods(TestCase):
         output = cs._colorize(card.name)
         self.assertEqual(output, f"{card_color}{card.name}{defs.COLORS.RESET}")
 
+class TestCardSet(TestCase):
+    def test_set_operations(self):
+        """A CardSet should behave like a set of card names"""
+        cards = defs.CardSet(['plum', 'rope', 'hall'])
+        self.assertEqual(len(cards), 3)
+        self.assertIn('rope', cards)
+        self.assertNotIn('knife', cards)
+        self.assertEqual(cards, {'plum', 'rope', 'hall'})
+        self.assertEqual(cards | {'knife'}, {'plum', 'rope', 'hall', 'knife'})
+        self.assertEqual(cards & defs.CardSet(['hall', 'study']), {'hall'})
+        self.assertEqual(cards - {'plum'}, {'rope', 'hall'})
+        self.assertEqual({'plum', 'study'} - cards, {'study'})
+        # Non-card values are dropped
+        self.assertEqual(defs.CardSet(['hall', 'update']), {'hall'})
+
+    def test_in_place_operations(self):
+        """In-place operators mutate the CardSet they're applied to"""
+        cards = defs.CardSet(['plum', 'rope'])
+        same_cards = cards
+        cards |= {'hall'}
+        cards -= {'plum'}
+        self.assertIs(cards, same_cards)
+        self.assertEqual(cards, {'rope', 'hall'})
+        cards &= {'hall'}
+        self.assertEqual(cards, {'hall'})
+
+    def test_clue_card_set_attribute(self):
+        """Card set attributes accept any iterable of cards and expose a by-category view"""
+        player = defs.Player(number=2, size_hand=2)
+        player.hand = ['plum', 'rope', 'knife']
+        self.assertIsInstance(player.hand, defs.CardSet)
+        self.assertEqual(player.hand_dict, {'Suspect': {'plum'}, 'Weapon': {'rope', 'knife'}})
+        hand = player.hand
+        player.hand = set()
+        self.assertIs(player.hand, hand)
+        self.assertEqual(len(player.hand), 0)
+        self.assertEqual(player.hand_dict, {})
+
+
+class TestDeckConfig(TestCase):
+    def load(self, config):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(config, f)
+        try:
+            return defs.load_deck(f.name)
+        finally:
+            os.remove(f.name)
+
+    def test_load_deck(self):
+        categories, max_players = self.load({'categories': {'Suspect': ['white', 'plum'], 'Weapon': ['rope', 'pipe'],
+                                                            'Room': ['hall', 'study'], 'Motive': ['greed', 'fear']},
+                                             'max_players': 4})
+        self.assertEqual([category.__name__ for category in categories], ['Suspect', 'Weapon', 'Room', 'Motive'])
+        self.assertEqual(list(categories[-1].__members__), ['greed', 'fear'])
+        self.assertEqual(max_players, 4)
+
+    def test_mistaken_decks(self):
+        for config in [
+            {},
+            {'categories': {'Suspect': []}},
+            {'categories': {'Suspect': ['white', 'plum'], 'Weapon': ['plum', 'rope']}},
+            {'categories': {'Suspect': ['Mrs White', 'plum'], 'Weapon': ['rope', 'pipe']}},
+            {'categories': {'Suspect': ['white', 'plum'], 'Weapon': ['rope', 'pipe']}, 'max_players': 3},
+        ]:
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                self.load(config)
+
+    def test_ready_to_accuse_needs_one_card_per_category(self):
+        engine = cs.Engine(4, 1, ['rope', 'hall', 'white', 'knife', 'study'])
+        engine.accusation = {'plum', 'green', 'pipe'}
+        self.assertFalse(engine.ready_to_accuse())
+        engine.accusation = {'plum', 'pipe'}
+        self.assertFalse(engine.ready_to_accuse())
+        engine.accusation = {'plum', 'pipe', 'lounge'}
+        self.assertTrue(engine.ready_to_accuse())
+
+
 class EngineTestNoDeductionLogic(TestCase):
     def setUp(self):
         num_players = 4
@@ -67,7 +149,7 @@ class EngineTestNoDeductionLogic(TestCase):
         #   (len(player.hand) != player.hand_size), do nothing.
         player_cards = {}
         for p in self.engine.all_players:
-            player_cards[p.number] = {'hand':p.hand, 'possibles':p.possibles}
+            player_cards[p.number] = {'hand':p.hand.copy(), 'possibles':p.possibles.copy()}
         # Nothing should be affected when running the method
         self.engine.check_players_hand_size()
         for p in self.engine.all_players:
@@ -95,6 +177,24 @@ class EngineTestNoDeductionLogic(TestCase):
         self.assertEqual(len(self.player3.possibles), 0)
         self.assertFalse('billiard' in self.player2.possibles or 'wrench' in self.player2.possibles)
 
+    def test_deduce_murder_cards_sole_owner(self):
+        """Once a category is solved, a card of it that only one Player might hold is in that Player's HAND"""
+        self.engine.accusation = {'white'}
+        self.player2.hand = {'scarlet'}
+        self.player3.hand = {'mustard'}
+        for player in (self.player2, self.player3):
+            player.possibles -= {'peacock', 'scarlet', 'mustard'}
+        self.player4.possibles -= {'scarlet', 'mustard'}
+
+        self.assertTrue(self.engine.deduce_murder_cards())
+        self.assertIn('peacock', self.player4.hand)
+        self.assertNotIn('peacock', self.player4.possibles)
+        # Green could still be anyone's, but no longer the Murder Card's
+        for player in (self.player2, self.player3, self.player4):
+            self.assertIn('green', player.possibles)
+            self.assertNotIn('white', player.possibles)
+        self.assertEqual(self.engine.accusation, {'white'})
+
     @mock.patch("clue_solver.Engine.remove_set_from_possibles")
     @mock.patch("clue_solver.Engine.process_revealed_turn")
     def test_process_turn(self, mock_process, mock_remove):
@@ -143,5 +243,180 @@ class EngineTestNoDeductionLogic(TestCase):
             [1, 2, 3]
         )
 
+
+class EngineTestDeductionLogic(TestCase):
+    @staticmethod
+    def deductions(engine):
+        """Everything the Engine has deduced, independent of the order the deductions were made in"""
+        return (
+            [(player.hand.mask, player.possibles.mask) for player in engine.all_players],
+            engine.accusation.mask,
+            [(turn.totally_processed, 0 if turn.totally_processed else turn.possible_reveals.mask)
+             for turn in engine.turn_sequence],
+        )
+
+    def test_worklist_matches_full_rescan(self):
+        """process_turns_for_info() must reach the same deductions as reprocess_all_turns_for_info(), turn by turn"""
+        games = list(RECORDED_GAMES.values()) + [random_game(seed) for seed in range(30)]
+        for game in games:
+            engines = [
+                cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+                for _ in range(2)
+            ]
+            worklist_engine, rescan_engine = engines
+            for line in game['turns']:
+                for engine in engines:
+                    turn = parse_turn(engine, len(engine.turn_sequence), line)
+                    engine.one_time_turn_deductions(turn)
+                    engine.turn_sequence.append(turn)
+                worklist_engine.process_turns_for_info()
+                rescan_engine.reprocess_all_turns_for_info()
+                self.assertEqual(self.deductions(worklist_engine), self.deductions(rescan_engine))
+
+    def test_card_index(self):
+        """Every unprocessed Turn is indexed under each card it might have revealed, and processed Turns drop out"""
+        for game in list(RECORDED_GAMES.values()) + [random_game(seed) for seed in range(30)]:
+            engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+            for line in game['turns']:
+                turn = parse_turn(engine, len(engine.turn_sequence), line)
+                engine.one_time_turn_deductions(turn)
+                engine.turn_sequence.append(turn)
+                engine.process_turns_for_info()
+
+                indexed = {}
+                for index, turns in enumerate(engine._turns_by_card):
+                    for indexed_turn in turns:
+                        self.assertFalse(indexed_turn.totally_processed)
+                        indexed[indexed_turn] = indexed.get(indexed_turn, 0) | (1 << index)
+                for past_turn in engine.turn_sequence:
+                    if past_turn.totally_processed:
+                        continue
+                    self.assertFalse(past_turn.possible_reveals & engine.accusation)
+                    self.assertEqual(indexed.get(past_turn, 0) & past_turn.possible_reveals.mask,
+                                     past_turn.possible_reveals.mask)
+
+    def test_worklist_picks_up_user_updates(self):
+        """Changes made to Players between calls are propagated on the next call"""
+        game = RECORDED_GAMES['four_player_40_turns']
+        engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+        engine.process_turns_for_info()
+        # Narrow Player 2's POSSIBLES down to exactly their hand size
+        player2 = engine.get_player(2)
+        cards = {'plum', 'rope', 'kitchen', 'dining', 'hall'}
+        player2.possibles = cards
+        engine.process_turns_for_info()
+        self.assertEqual(player2.hand, cards)
+        for player in engine.other_players:
+            self.assertFalse(player.possibles & cards)
+
+
+class EngineTestUndo(TestCase):
+    def setUp(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        self.game = game
+        self.engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+
+    @mock.patch('builtins.print')
+    def test_user_undoes_asks_again(self, _):
+        """An answer that isn't one of the listed numbers is asked again, and no answer undoes nothing"""
+        for line in self.game['turns'][:3]:
+            self.take_turn(self.engine, line)
+        with mock.patch('clue_solver.handle_input', side_effect=['pass', '0', '4', '2']) as answers:
+            self.engine.user_undoes()
+        self.assertEqual(answers.call_count, 4)
+        self.assertEqual(len(self.engine.turn_sequence), 2)
+
+        with mock.patch('clue_solver.handle_input', return_value=''):
+            self.engine.user_undoes()
+        self.assertEqual(len(self.engine.turn_sequence), 2)
+
+        self.engine.user_undoes(redo=True)
+        self.engine.user_undoes(redo=True)
+        self.assertEqual(self.engine.notices, [f"{cs.COLORS.INVERSE} ! ! There is nothing to redo{cs.COLORS.RESET}"])
+
+    @staticmethod
+    def state(engine):
+        return (
+            [(player.hand.mask, player.possibles.mask) for player in engine.all_players],
+            engine.accusation.mask,
+            [(turn.number, turn.possible_reveals.mask, turn.revealed_card, turn.totally_processed)
+             for turn in engine.turn_sequence],
+        )
+
+    @staticmethod
+    def take_turn(engine, line):
+        turn = parse_turn(engine, len(engine.turn_sequence), line)
+        engine.checkpoint(line)
+        engine.one_time_turn_deductions(turn)
+        engine.turn_sequence.append(turn)
+        engine.process_turns_for_info()
+
+    def test_undo_and_redo(self):
+        """Undoing restores the exact state from before a Turn, and the game carries on as if it never happened"""
+        for game in list(RECORDED_GAMES.values()) + [random_game(seed) for seed in range(10)]:
+            engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+            states = []
+            for line in game['turns']:
+                states.append(self.state(engine))
+                self.take_turn(engine, line)
+            final = self.state(engine)
+
+            for steps in (1, 7, len(game['turns'])):
+                engine.undo(steps)
+                self.assertEqual(self.state(engine), states[-steps])
+                engine.redo()
+                self.assertEqual(self.state(engine), final)
+
+            # Undo, then replay the same Turns: the worklist must pick up where the snapshot left off
+            engine.undo(15)
+            for line in game['turns'][-15:]:
+                self.take_turn(engine, line)
+            self.assertEqual(self.state(engine), final)
+            self.assertEqual(len(engine.history), len(game['turns']))
+
+    def test_undo_rebuilds_turn_indexes(self):
+        """After an undo the worklist's Turn indexes are those of a game that only got that far"""
+        def indexes(engine):
+            by_revealer = [[turn.number for turn in turns if not turn.totally_processed]
+                           for turns in engine._turns_by_revealer]
+            by_card = [sorted(turn.number for turn in turns if turn.possible_reveals.mask & (1 << index))
+                       for index, turns in enumerate(engine._turns_by_card)]
+            return by_revealer, by_card
+
+        for game in list(RECORDED_GAMES.values()) + [random_game(seed) for seed in range(10)]:
+            engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+            shorter = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+            for line in game['turns']:
+                self.take_turn(engine, line)
+            for line in game['turns'][:-15]:
+                self.take_turn(shorter, line)
+            engine.undo(15)
+            self.assertEqual(indexes(engine), indexes(shorter))
+
+    def test_undo_update(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+        for line in game['turns'][:10]:
+            self.take_turn(engine, line)
+        before = self.state(engine)
+        engine.checkpoint('update')
+        engine.apply_update(2, 'has', 'plum')
+        engine.process_turns_for_info()
+        self.assertIn('plum', engine.get_player(2).hand)
+
+        engine.undo()
+        self.assertEqual(self.state(engine), before)
+        self.assertEqual(engine.updates, [])
+        engine.redo()
+        self.assertEqual(engine.updates, [(11, 2, 'has', 'plum')])
+        engine.undo()
+        # Something new happening means the undone UPDATE can't be redone
+        self.take_turn(engine, game['turns'][10])
+        with self.assertRaises(ValueError):
+            engine.redo()
+        with self.assertRaises(ValueError):
+            engine.undo(len(engine.history) + 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import unittest
+from unittest import mock, TestCase
+
+import clue_solver as cs
+import defs
+import display
+from bench_clue_solver import RECORDED_GAMES, parse_turn, replay
+
+
+class TestColors(TestCase):
+    def test_cached_colors_match(self):
+        """The cached colorized strings are the ones color_cards() always built"""
+        cards = defs.CardSet(['rope', 'plum', 'hall', 'white', 'knife'])
+        expected = '[' + ', '.join(cs._colorize(card) for card in ['plum', 'white', 'knife', 'rope', 'hall']) + ']'
+        self.assertEqual(cs.color_cards(cards), expected)
+        self.assertEqual(cs.color_cards(set(cards)), expected)
+        self.assertEqual(cs.color_cards(defs.CardSet()), '[]')
+
+    def test_use_ansi(self):
+        try:
+            display.use_ansi(False)
+            self.assertEqual(cs.color_cards(defs.CardSet(['rope', 'plum'])), '[plum, rope]')
+            self.assertEqual(defs.COLORS.RESET, '')
+        finally:
+            display.use_ansi(True)
+        self.assertEqual(cs._colorize('plum'), f"{defs.COLORS.RED}plum{defs.COLORS.RESET}")
+
+
+class TestBoardRenderer(TestCase):
+    def setUp(self):
+        self.game = RECORDED_GAMES['four_player_40_turns']
+        self.eng = replay(dict(self.game, turns=self.game['turns'][:20]))
+        self.out = io.StringIO()
+        self.renderer = display.BoardRenderer(out=self.out, ansi=True, rows=200)
+
+    def test_frame_matches_printed_board(self):
+        """A frame shows what print_player_hands() and offer_turn_intel() log"""
+        probabilities = self.eng.estimate_probabilities()
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed):
+            self.eng.print_player_hands(len(self.eng.turn_sequence))
+            self.eng.offer_turn_intel(probabilities=probabilities)
+        frame = self.renderer.frame(self.eng, probabilities)
+        self.assertEqual('\n'.join(frame[2:]) + '\n', printed.getvalue())
+
+    def test_redraws_only_changed_lines(self):
+        self.renderer.render(self.eng)
+        self.assertTrue(self.out.getvalue().startswith('\033[H\033[2J'))
+
+        # Nothing changed: nothing but the prompt area is redrawn
+        self.out.seek(0)
+        self.out.truncate()
+        self.renderer.render(self.eng)
+        self.assertEqual(self.out.getvalue(), f"\033[{len(self.renderer.frame(self.eng)) + 1};1H\033[J")
+
+        # New Turns redraw only the lines of the Players and Turns they told us about
+        before = self.renderer.frame(self.eng)
+        for line in self.game['turns'][20:22]:
+            turn = parse_turn(self.eng, len(self.eng.turn_sequence), line)
+            self.eng.one_time_turn_deductions(turn)
+            self.eng.turn_sequence.append(turn)
+        self.eng.process_turns_for_info()
+        self.out.seek(0)
+        self.out.truncate()
+        self.renderer.render(self.eng)
+        after = self.renderer.frame(self.eng)
+        changed = [row for row, line in enumerate(after, start=1) if row > len(before) or before[row - 1] != line]
+        self.assertTrue(changed)
+        self.assertEqual(self.out.getvalue().count(';1H'), len(changed) + 1)
+
+    def test_full_redraw_when_board_does_not_fit(self):
+        renderer = display.BoardRenderer(out=self.out, ansi=True, rows=10)
+        renderer.render(self.eng)
+        renderer.render(self.eng)
+        self.assertEqual(self.out.getvalue().count('\033[2J'), 2)
+
+    def test_plain_output(self):
+        renderer = display.BoardRenderer(out=self.out, ansi=False)
+        try:
+            display.use_ansi(False)
+            renderer.render(self.eng)
+        finally:
+            display.use_ansi(True)
+        self.assertNotIn('\033', self.out.getvalue())
+        self.assertIn('CARD DISTRIBUTION', self.out.getvalue())
+
+    def test_unavailable_probabilities(self):
+        """A sample with no consistent deal in it isn't shown as a contradiction, and offers no suggestions"""
+        failed = cs.SamplingFailed('none of the 2000 random deals drawn agree with what the Engine knows')
+        with mock.patch('clue_solver.estimate_probabilities', side_effect=failed):
+            probabilities = self.eng.estimate_probabilities()
+        self.assertIs(probabilities, failed)
+        frame = '\n'.join(self.renderer.frame(self.eng, probabilities, suggestions=True))
+        self.assertIn('(Unavailable this time: none of the 2000 random deals drawn agree', frame)
+        self.assertNotIn('No deal of the cards agrees', frame)
+        self.assertNotIn('Suggestions', frame)
+        self.assertIn('No deal of the cards agrees', '\n'.join(self.renderer.frame(self.eng, None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
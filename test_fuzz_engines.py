@@ -0,0 +1,69 @@
+import unittest
+from unittest import TestCase, mock
+
+import clue_solver as cs
+import fuzz_engines as fz
+import provenance as pv
+from game_script import ScriptReader, numbered_lines, parse_setup
+
+
+class ForgetfulEngine(cs.Engine):
+    """Misses the knock-on effects of whatever changed between calls, e.g. UPDATEs and non-revealing responders"""
+    def process_turns_for_info(self):
+        self._last_seen_masks = {player.number: (player.hand.mask, player.possibles.mask)
+                                 for player in self.all_players}
+        super().process_turns_for_info()
+
+
+FORGETFUL = 'test_fuzz_engines:ForgetfulEngine.process_turns_for_info'
+
+
+class TestFuzzEngines(TestCase):
+    def test_random_scripts(self):
+        """The games cover passes, Turns where I'm the Revealer, and UPDATEs, and they're valid game scripts"""
+        kinds = set()
+        for seed in range(20):
+            script = fz.random_script(seed)
+            lines = iter(numbered_lines(fz.script_lines(script)))
+            num_players, my_player_number, _ = parse_setup(lines)
+            self.assertEqual(ScriptReader(num_players, my_player_number).parse_batch(list(lines)), script['actions'])
+            for action in script['actions']:
+                kinds.add('me revealer' if action[0] == 'turn' and action[3] == my_player_number else action[0])
+        self.assertEqual(kinds, {'pass', 'turn', 'me revealer', 'update'})
+
+    def test_worklist_matches_rescan(self):
+        candidate, reference = fz.load_implementation('worklist'), fz.load_implementation('rescan')
+        for seed in range(30):
+            self.assertIsNone(fz.first_disagreement(fz.random_script(seed), candidate, reference))
+
+    def test_provenance_matches_engine(self):
+        """The rules justifying the Engine's deductions deduce exactly what the Engine does, and drift is caught"""
+        self.assertFalse(any(lines for _, _, lines in fz.fuzz(range(100), candidate='provenance', reference='worklist',
+                                                              processes=2)))
+
+        candidate, reference = fz.load_implementation('provenance'), fz.load_implementation('worklist')
+        with mock.patch.object(pv.Provenance, '_assign_sole_owners', return_value=False):
+            self.assertTrue(any(fz.first_disagreement(fz.random_script(seed), candidate, reference) is not None
+                                for seed in range(20)))
+
+    def test_shrink(self):
+        candidate, reference = fz.load_implementation(FORGETFUL), fz.load_implementation('rescan')
+        seed = next(seed for seed in range(100)
+                    if fz.first_disagreement(fz.random_script(seed), candidate, reference) is not None)
+        script = fz.random_script(seed)
+        shrunk = fz.shrink(script, candidate, reference)
+
+        self.assertLess(len(shrunk['actions']), len(script['actions']))
+        self.assertEqual(fz.first_disagreement(shrunk, candidate, reference), len(shrunk['actions']) - 1)
+        self.assertLessEqual(len(shrunk['actions']), 2 * script['num_players'])
+        self.assertEqual(fz.renumber(shrunk['actions']), shrunk['actions'])
+
+    def test_fuzz(self):
+        results = list(fz.fuzz(range(8), candidate=FORGETFUL, processes=2, chunk_size=2, num_turns=30))
+        self.assertEqual(sorted(seed for seed, _, _ in results), list(range(8)))
+        self.assertTrue(any(lines for _, _, lines in results))
+        self.assertFalse(any(lines for _, _, lines in fz.fuzz(range(8), candidate='worklist', processes=2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+import game_records as gr
+from bench_clue_solver import RECORDED_GAMES, replay
+from game_script import ScriptReader
+
+
+def normalized(actions):
+    """Suggestions come back from the records in CARD_ORDER"""
+    return [action[:2] + (sorted(action[2]),) + action[3:] if action[0] == 'turn' else action for action in actions]
+
+
+def game_actions(game):
+    reader = ScriptReader(game['num_players'], game['my_player_number'])
+    return reader.parse_batch(list(enumerate(game['turns'], start=1)))
+
+
+class TestGameRecords(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.cgr')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        games = [(game['num_players'], game['my_player_number'], game['my_hand'], game_actions(game))
+                 for game in RECORDED_GAMES.values()]
+        games.append((4, 1, games[0][2], [('pass', 1), ('update', 2, 3, 'has', 'rope'), ('update', 2, 2, 'lacks', 'hall')]))
+        self.assertEqual(gr.write_corpus(self.path, games), len(games))
+        self.assertEqual(os.path.getsize(self.path), 16 * sum(1 + len(actions) for *_, actions in games))
+
+        corpus = gr.GameCorpus(self.path)
+        self.assertEqual(len(corpus), len(games))
+        for record, (num_players, my_player_number, my_hand, actions) in zip(corpus, games):
+            self.assertEqual(record.num_players, num_players)
+            self.assertEqual(record.my_player_number, my_player_number)
+            self.assertCountEqual(record.my_hand, my_hand)
+            self.assertEqual(normalized(record.actions()), normalized(actions))
+
+        # Counting Turns needs no Python object per Turn
+        records = corpus.records()
+        self.assertEqual(len(records), sum(len(actions) for *_, actions in games))
+        self.assertEqual(int((records['kind'] == gr.HAS).sum()), 1)
+
+    def test_replay(self):
+        game = RECORDED_GAMES['six_player_60_turns']
+        gr.write_corpus(self.path, [(game['num_players'], game['my_player_number'], game['my_hand'],
+                                     game_actions(game))])
+        eng = gr.GameCorpus(self.path)[0].replay()
+        expected = replay(game)
+        for player, expected_player in zip(eng.all_players, expected.all_players):
+            self.assertEqual(player.hand, expected_player.hand)
+            self.assertEqual(player.possibles, expected_player.possibles)
+        self.assertEqual(eng.accusation, expected.accusation)
+
+    def test_damaged_corpus(self):
+        game = RECORDED_GAMES['three_player_20_turns']
+        gr.write_corpus(self.path, [(game['num_players'], game['my_player_number'], game['my_hand'],
+                                     game_actions(game))])
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 16)
+        with self.assertRaises(ValueError):
+            gr.GameCorpus(self.path)
+        with open(self.path, 'r+b') as f:
+            f.write(b'XX')
+        with self.assertRaises(ValueError):
+            gr.GameCorpus(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
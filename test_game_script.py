@@ -0,0 +1,72 @@
+import io
+import json
+import unittest
+from unittest import mock, TestCase
+
+import game_script as gs
+from bench_clue_solver import RECORDED_GAMES, replay
+
+
+def script_of(game, extra_lines=()):
+    lines = [f"players {game['num_players']}", f"me {game['my_player_number']}",
+             f"hand {','.join(game['my_hand'])}", '# a comment', '']
+    return io.StringIO('\n'.join(lines + list(game['turns']) + list(extra_lines)) + '\n')
+
+
+class TestGameScript(TestCase):
+    def test_matches_replay(self):
+        """However the script is batched, the Engine must reach the same deductions as Turn-by-Turn play"""
+        for game in RECORDED_GAMES.values():
+            expected = replay(game)
+            for batch_size in (None, 1, 7):
+                out = io.StringIO()
+                eng = gs.run_script(script_of(game), batch_size=batch_size, jsonl=True, out=out)
+                for player, expected_player in zip(eng.all_players, expected.all_players):
+                    self.assertEqual(player.hand, expected_player.hand)
+                    self.assertEqual(player.possibles, expected_player.possibles)
+                states = [json.loads(line) for line in out.getvalue().splitlines()]
+                self.assertEqual(len(states), 1 if batch_size is None else -(-len(game['turns']) // batch_size))
+                self.assertEqual(states[-1]['turns'], len(game['turns']))
+                self.assertEqual(states[-1]['accusation'], sorted(expected.accusation))
+
+    def test_updates(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        game = dict(game, turns=game['turns'][:5])
+        with mock.patch('builtins.print'):
+            eng = gs.run_script(script_of(game, ['2,has,plum', '3,lacks,green']))
+        self.assertIn('plum', eng.get_player(2).hand)
+        self.assertNotIn('green', eng.get_player(3).possibles)
+        self.assertEqual(len(eng.turn_sequence), 6)
+
+    def test_every_mistake_is_reported_before_playing(self):
+        game = dict(RECORDED_GAMES['four_player_40_turns'], turns=[
+            'pass',                      # Turn 1
+            'plum,rope,knife,3',         # Two weapons
+            'plum,rope,hall,3:rope',     # Turn 3 is Player 3's, not the user's
+            'plum,rope,hall,3',          # Fine
+            'plum,rope,hall,3',          # Turn 5 is the user's: missing the card shown
+            '9,has,plum',                # No Player 9
+            'plum,rope,hall,2',          # Player 2 can't reveal on their own Turn (6)
+            'plum,rope,hall,3:knife',    # Turn 7 is Player 3's
+        ])
+        with self.assertRaises(gs.ScriptError) as raised:
+            gs.run_script(script_of(game))
+        self.assertEqual([line_number for line_number, _ in raised.exception.errors], [7, 8, 10, 11, 12, 13])
+
+    def test_contradiction_is_reported_by_line(self):
+        script = "players 3\nme 1\nhand white,plum,rope,pipe,hall,study\npass\n3,lacks,green\nwhite,rope,hall,3\npass\n"
+        for batch_size in (None, 1, 2):
+            with self.assertRaises(gs.ScriptContradiction) as raised:
+                gs.run_script(io.StringIO(script), batch_size=batch_size, jsonl=True, out=io.StringIO())
+            self.assertEqual(raised.exception.line_number, 6)
+            self.assertIn("Player 3 can't have shown any of the cards suggested on Turn 2", str(raised.exception))
+
+    def test_bad_setup(self):
+        with self.assertRaises(gs.ScriptError):
+            gs.run_script(io.StringIO("players 4\nme 5\nhand rope,hall\n"))
+        with self.assertRaises(gs.ScriptError):
+            gs.run_script(io.StringIO("players 4\nhand rope,hall\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
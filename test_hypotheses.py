@@ -0,0 +1,59 @@
+import unittest
+from unittest import TestCase
+
+import hypotheses
+from bench_clue_solver import RECORDED_GAMES, replay
+from probability import DealConstraints, enumerate_deals
+
+
+def engine_state(engine):
+    return (
+        [(player.hand.mask, player.possibles.mask) for player in engine.all_players],
+        engine.accusation.mask,
+        [(turn.possible_reveals.mask, turn.revealed_card, turn.totally_processed) for turn in engine.turn_sequence],
+        len(engine.history),
+    )
+
+
+class TestWhatIf(TestCase):
+    def setUp(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        self.engine = replay(dict(game, turns=game['turns'][:20]))
+
+    def test_what_if_leaves_the_game_alone(self):
+        before = engine_state(self.engine)
+        # A card Player 3 might have, without contradicting anything
+        results = hypotheses.what_ifs(self.engine, [[(3, 'has', card)]
+                                                    for card in sorted(self.engine.get_player(3).possibles)])
+        result = next(result for result in results if result.contradiction is None)
+        card = result.facts[0][2]
+        self.assertIn(card, result.new_hands[3])
+        self.assertEqual(engine_state(self.engine), before)
+
+        # The same fact, applied for real, leads to the same deductions
+        self.engine.apply_update(3, 'has', card)
+        self.engine.process_turns_for_info()
+        self.assertLessEqual(result.new_hands[3], self.engine.get_player(3).hand)
+
+    def test_contradictions(self):
+        my_card = self.engine.my_hand[0]
+        self.assertIsNotNone(hypotheses.what_if(self.engine, [(2, 'has', my_card)]).contradiction)
+        before = engine_state(self.engine)
+        self.assertIsNotNone(hypotheses.what_if(self.engine, [(1, 'lacks', my_card)]).contradiction)
+        self.assertEqual(engine_state(self.engine), before)
+
+    def test_forced_facts_hold_in_every_deal(self):
+        before = engine_state(self.engine)
+        forced = hypotheses.forced_facts(self.engine)
+        self.assertEqual(engine_state(self.engine), before)
+        self.assertTrue(forced)
+
+        probabilities = enumerate_deals(DealConstraints.from_engine(self.engine), max_steps=None)
+        for player_num, action, card, _ in forced:
+            with self.subTest(player=player_num, action=action, card=card):
+                p = probabilities.player_probabilities(player_num).get(card, 0)
+                self.assertEqual(p, 1 if action == 'has' else 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+import clue_solver as cs
+import instrumentation as ins
+from bench_clue_solver import RECORDED_GAMES, parse_turn, replay
+
+
+def play(engine, game):
+    for line in game['turns']:
+        turn = parse_turn(engine, len(engine.turn_sequence), line)
+        engine.one_time_turn_deductions(turn)
+        engine.turn_sequence.append(turn)
+        engine.process_turns_for_info()
+    return engine
+
+
+class TestDeductionProfiler(TestCase):
+    def test_counts_without_changing_deductions(self):
+        game = RECORDED_GAMES['six_player_60_turns']
+        profiler = ins.DeductionProfiler()
+        engine = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+        play(profiler.attach(engine), game)
+
+        expected = replay(game)
+        for player, expected_player in zip(engine.all_players, expected.all_players):
+            self.assertEqual(player.hand, expected_player.hand)
+            self.assertEqual(player.possibles, expected_player.possibles)
+
+        summary = profiler.summary()
+        self.assertEqual(summary['passes'], len(game['turns']))
+        for name, stats in summary['rules'].items():
+            self.assertGreater(stats['calls'], 0, name)
+            self.assertLessEqual(stats['hits'], stats['calls'], name)
+        # Each pass's counters add up to the totals, apart from the calls made outside any pass
+        per_pass_calls = sum(record['rules'].get('process_revealed_turn', {}).get('calls', 0)
+                             for record in profiler.passes)
+        self.assertEqual(per_pass_calls, summary['rules']['process_revealed_turn']['calls'])
+        self.assertTrue(all(record['rounds'] >= 0 for record in profiler.passes))
+
+    def test_exports(self):
+        profiler = ins.DeductionProfiler()
+        engine = profiler.attach(cs.Engine(4, 1, list(RECORDED_GAMES['four_player_40_turns']['my_hand'])))
+        play(engine, RECORDED_GAMES['four_player_40_turns'])
+        handle, path = tempfile.mkstemp(suffix='.folded')
+        os.close(handle)
+        try:
+            profiler.write(path)
+            with open(path) as f:
+                stacks = dict(line.rsplit(' ', maxsplit=1) for line in f.read().splitlines())
+            self.assertIn('process_turns_for_info;process_revealed_turn', stacks)
+            self.assertTrue(all(int(value) >= 0 for value in stacks.values()))
+
+            profiler.write_json(path)
+            with open(path) as f:
+                trace = json.load(f)
+            self.assertEqual(len(trace['passes']), 40)
+            self.assertTrue(all(event['ph'] == 'X' for event in trace['traceEvents']))
+        finally:
+            os.remove(path)
+
+    def test_detach(self):
+        engine = cs.Engine(4, 1, ['rope', 'hall', 'white', 'knife', 'study'])
+        ins.DeductionProfiler().attach(engine)
+        ins.DeductionProfiler.detach(engine)
+        self.assertFalse(set(engine.__dict__) & set(ins.RULES + ins.PASSES))
+
+
+if __name__ == "__main__":
+    unittest.main()
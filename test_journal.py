@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest import mock, TestCase
+
+import clue_solver as cs
+import journal as jn
+from bench_clue_solver import RECORDED_GAMES, parse_turn, replay
+
+
+class TestGameJournal(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def record_game(self, game):
+        """Play a recorded game into an Engine that writes to the journal, as Engine.take_turn() would"""
+        eng = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+        eng.journal = jn.GameJournal(self.path)
+        eng.journal.record_setup(eng.num_players, eng.my_player_number, eng.my_hand)
+        for line in game['turns']:
+            turn = parse_turn(eng, len(eng.turn_sequence), line)
+            eng.one_time_turn_deductions(turn)
+            eng.turn_sequence.append(turn)
+            eng.journal.record_turn(turn)
+        eng.journal.close()
+
+    def assertSameDeductions(self, eng, expected):
+        for player, expected_player in zip(eng.all_players, expected.all_players):
+            self.assertEqual(player.hand, expected_player.hand)
+            self.assertEqual(player.possibles, expected_player.possibles)
+        self.assertEqual(eng.accusation, expected.accusation)
+
+    def test_replay_matches_game(self):
+        for game in RECORDED_GAMES.values():
+            self.record_game(game)
+            eng = jn.replay_journal(self.path)
+            self.assertEqual(len(eng.turn_sequence), len(game['turns']) + 1)
+            self.assertSameDeductions(eng, replay(game))
+
+    def test_updates_are_replayed(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        game = dict(game, turns=game['turns'][:10])
+        self.record_game(game)
+        eng = replay(game)
+        with mock.patch('clue_solver.handle_input', return_value='2,lacks,rope'), mock.patch('builtins.print'):
+            eng.journal = jn.GameJournal(self.path, new_game=False)
+            eng.user_updates_hands(len(eng.turn_sequence))
+            eng.journal.close()
+        self.assertNotIn('rope', eng.get_player(2).possibles)
+        self.assertSameDeductions(jn.replay_journal(self.path), eng)
+
+    def test_undo_is_replayed(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        self.record_game(dict(game, turns=game['turns'][:20]))
+        journal = jn.GameJournal(self.path, new_game=False)
+        journal.record_undo(5)
+        journal.record_redo()
+        journal.record_undo(8)
+        journal.close()
+        eng = jn.replay_journal(self.path)
+        self.assertEqual(len(eng.turn_sequence), 13)
+        self.assertEqual(len(eng.history), 12)
+        self.assertSameDeductions(eng, replay(dict(game, turns=game['turns'][:12])))
+
+    def test_truncated_record_is_skipped(self):
+        """A record cut short when the process was killed doesn't stop the rest of the game being replayed"""
+        game = RECORDED_GAMES['three_player_20_turns']
+        self.record_game(game)
+        with open(self.path, 'a') as f:
+            f.write('{"v":1,"type":"turn","num')
+        eng = jn.replay_journal(self.path)
+        self.assertEqual(len(eng.turn_sequence), len(game['turns']) + 1)
+
+    def test_unknown_version(self):
+        with open(self.path, 'w') as f:
+            f.write('{"v":99,"type":"setup"}\n')
+        with self.assertRaises(ValueError):
+            jn.replay_journal(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
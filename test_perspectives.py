@@ -0,0 +1,88 @@
+import unittest
+from unittest import TestCase
+
+import clue_solver as cs
+from bench_clue_solver import RECORDED_GAMES, parse_turn
+from defs import ALL_CARDS_MASK, cards_to_mask
+from perspectives import Perspectives
+from provenance import ENVELOPE, Provenance, turn_input
+from simulator import random_game
+
+
+def play(game, rivals, num_turns=None):
+    """Feed a game's Turns into a fresh Engine, updating the rivals' models after every Turn"""
+    eng = cs.Engine(game['num_players'], game['my_player_number'], list(game['my_hand']))
+    for line in game['turns'][:num_turns]:
+        turn = parse_turn(eng, len(eng.turn_sequence), line)
+        eng.checkpoint(f"Turn {turn.number}")
+        eng.one_time_turn_deductions(turn)
+        eng.turn_sequence.append(turn)
+        eng.process_turns_for_info()
+        rivals.update(eng)
+    return eng
+
+
+class TestPerspectives(TestCase):
+    def test_rivals_know_at_least_the_public_facts(self):
+        for seed in range(10):
+            game = random_game(seed)
+            rivals = Perspectives()
+            eng = play(game, rivals)
+            public = Provenance(eng.num_players, {player.number: player.hand_size for player in eng.all_players})
+            public.add([turn_input(eng, turn) for turn in eng.turn_sequence[1:] if not turn.is_pass])
+
+            self.assertEqual(set(rivals.rivals), {player.number for player in eng.other_players})
+            for rival in rivals.rivals.values():
+                knowledge = rival.knowledge
+                self.assertIsNone(knowledge.contradiction)
+                for row in range(eng.num_players + 1):
+                    self.assertEqual(knowledge.has[row] & public.has[row], public.has[row])
+                    self.assertEqual(knowledge.lacks[row] & public.lacks[row], public.lacks[row])
+                # And nothing that isn't true
+                self.assertEqual(knowledge.has[ENVELOPE] & ~cards_to_mask(game['murder_cards']), 0)
+                self.assertEqual(knowledge.lacks[ENVELOPE] & cards_to_mask(game['murder_cards']), 0)
+
+    def test_public_facts_are_shared(self):
+        rivals = Perspectives()
+        eng = play(RECORDED_GAMES['four_player_40_turns'], rivals, num_turns=10)
+        shared = set.intersection(*({id(entry) for entry in rival.knowledge.inputs}
+                                    for rival in rivals.rivals.values()))
+        self.assertEqual(len(shared), len([turn for turn in eng.turn_sequence if not turn.is_pass]))
+
+    def test_shown_cards(self):
+        # Turn 12: Player 4 suggested scarlet, wrench, library and I showed the only one I have, scarlet
+        rivals = Perspectives()
+        play(RECORDED_GAMES['four_player_40_turns'], rivals, num_turns=12)
+        self.assertTrue(rivals.rivals[4].knowledge.has[1] & cards_to_mask(['scarlet']))
+        self.assertFalse(rivals.rivals[2].knowledge.has[1] & cards_to_mask(['scarlet']))
+
+    def test_progress(self):
+        rivals = Perspectives()
+        eng = play(RECORDED_GAMES['four_player_40_turns'], rivals, num_turns=1)
+        for rival in rivals.rivals.values():
+            self.assertEqual(rival.progress(), 0)
+            self.assertFalse(rival.ready_to_accuse())
+
+        # A rival that has worked out all but one card of each category could accuse
+        rival = rivals.rivals[2]
+        rival.knowledge.lacks[ENVELOPE] = ALL_CARDS_MASK & ~cards_to_mask(['plum', 'rope', 'hall'])
+        self.assertEqual(rival.progress(), 1)
+        self.assertTrue(rival.ready_to_accuse())
+        self.assertIn('could accuse now', rivals.describe()[0])
+        self.assertEqual(len(eng.format_rivals()), 0)
+
+    def test_undo(self):
+        rivals = Perspectives()
+        eng = play(RECORDED_GAMES['four_player_40_turns'], rivals, num_turns=12)
+        model = rivals.rivals[4].knowledge
+        rivals.update(eng)
+        self.assertIs(rivals.rivals[4].knowledge, model)
+
+        eng.undo()
+        rivals.update(eng)
+        # Player 4 no longer saw my scarlet
+        self.assertFalse(rivals.rivals[4].knowledge.has[1] & cards_to_mask(['scarlet']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import itertools
+import math
+import unittest
+from unittest import TestCase
+
+import defs
+import probability as pr
+from bench_clue_solver import RECORDED_GAMES, replay
+from simulator import random_game
+
+
+def brute_force_deals(constraints: pr.DealConstraints):
+    """List every consistent deal the slow way, as (envelope mask, tuple of HAND masks)"""
+    deals = []
+    for murder_cards in itertools.product(*constraints.murder_candidates()):
+        envelope = sum(murder_cards)
+
+        def deal(index, remaining, hands):
+            if index == len(constraints.numbers):
+                if not remaining:
+                    deals.append((envelope, tuple(hands)))
+                return
+            free = constraints.candidates[index] & remaining & ~constraints.hands[index]
+            need = constraints.hand_sizes[index] - constraints.hands[index].bit_count()
+            for chosen in pr._combinations(free, need):
+                hands.append(constraints.hands[index] | chosen)
+                deal(index + 1, remaining & ~chosen, hands)
+                hands.pop()
+
+        known = 0
+        for hand in constraints.hands:
+            known |= hand
+        deal(0, defs.ALL_CARDS_MASK & ~known & ~envelope, [])
+
+    return [(envelope, hands) for envelope, hands in deals
+            if all(hands[index] & reveals for index, reveals in constraints.turn_constraints)]
+
+
+class TestEnumerateDeals(TestCase):
+    def test_matches_brute_force(self):
+        """Exact counts and marginals must agree with listing every deal one by one"""
+        game = RECORDED_GAMES['four_player_40_turns']
+        for num_turns in (10, 20, 30, 40):
+            engine = replay(dict(game, turns=game['turns'][:num_turns]))
+            constraints = pr.DealConstraints.from_engine(engine)
+            deals = brute_force_deals(constraints)
+            probabilities = pr.enumerate_deals(constraints)
+
+            self.assertEqual(probabilities.num_deals, len(deals))
+            for card, bit in defs.CARD_BITS.items():
+                in_envelope = sum(1 for envelope, _ in deals if envelope & bit)
+                self.assertAlmostEqual(probabilities.probability(0, card), in_envelope / len(deals))
+                for index, number in enumerate(constraints.numbers):
+                    in_hand = sum(1 for _, hands in deals if hands[index] & bit)
+                    self.assertAlmostEqual(probabilities.probability(number, card), in_hand / len(deals))
+
+    def test_probabilities_add_up(self):
+        """Each Player's probabilities sum to their hand size, and the Murder Cards' to one per category"""
+        game = RECORDED_GAMES['three_player_20_turns']
+        engine = replay(dict(game, turns=game['turns'][:5]))
+        probabilities = pr.enumerate_deals(pr.DealConstraints.from_engine(engine))
+        for player in engine.all_players:
+            self.assertAlmostEqual(sum(probabilities.player_probabilities(player.number).values()), player.hand_size)
+        self.assertAlmostEqual(sum(probabilities.murder_probabilities().values()), len(defs.CATEGORIES))
+        # The user's own cards are certain
+        for card in engine.my_player.hand:
+            self.assertEqual(probabilities.probability(engine.my_player_number, card), 1)
+
+    def test_max_steps(self):
+        """Give up when there are too many deals to enumerate"""
+        game = RECORDED_GAMES['six_player_60_turns']
+        engine = replay(dict(game, turns=game['turns'][:5]))
+        with self.assertRaises(pr.EnumerationTooLarge):
+            pr.enumerate_deals(pr.DealConstraints.from_engine(engine), max_steps=1000)
+
+    def test_should_stop(self):
+        """Give up partway through once should_stop() says so, and estimate_probabilities() gives back None"""
+        game = RECORDED_GAMES['six_player_60_turns']
+        constraints = pr.DealConstraints.from_engine(replay(dict(game, turns=game['turns'][:5])))
+        checks = []
+
+        def should_stop():
+            checks.append(None)
+            return len(checks) == 3
+
+        with self.assertRaises(pr.EstimationCancelled):
+            pr.enumerate_deals(constraints, max_steps=100000, should_stop=should_stop)
+        self.assertEqual(len(checks), 3)
+        self.assertIsNone(pr.estimate_probabilities(constraints, max_steps=100000, time_budget=10,
+                                                    should_stop=lambda: True))
+
+
+class TestCountDeals(TestCase):
+    def test_matches_enumeration(self):
+        """Counting must give exactly the counts that listing every deal gives"""
+        games = [RECORDED_GAMES['four_player_40_turns']] + [random_game(seed, num_players=3 + seed % 3)
+                                                              for seed in range(6)]
+        for game in games:
+            for num_turns in (8, 15, 25, 40):
+                engine = replay(dict(game, turns=game['turns'][:num_turns]))
+                constraints = pr.DealConstraints.from_engine(engine)
+                try:
+                    listed = pr.enumerate_deals(constraints, max_steps=100000)
+                except pr.EnumerationTooLarge:
+                    continue
+                counted = pr.count_deals(constraints, max_states=10 ** 6)
+                self.assertEqual(counted.num_deals, listed.num_deals)
+                self.assertEqual(counted._player_counts, listed._player_counts)
+                self.assertEqual(counted._murder_counts, listed._murder_counts)
+
+    def test_first_turn(self):
+        """Far too many deals to list on Turn 1, but they're counted within the default limits"""
+        game = RECORDED_GAMES['three_player_20_turns']
+        engine = replay(dict(game, turns=game['turns'][:1]))
+        constraints = pr.DealConstraints.from_engine(engine)
+        probabilities = pr.count_deals(constraints)
+
+        # Nothing's known but my own hand: any Murder Cards I don't hold, and any split of the rest
+        num_envelopes = math.prod(len(candidates) for candidates in constraints.murder_candidates())
+        unknown = len(defs.CARD_ORDER) - engine.my_player.hand_size - len(defs.CATEGORIES)
+        others = [player.hand_size for player in engine.other_players]
+        self.assertEqual(probabilities.num_deals, num_envelopes * math.comb(unknown, others[0]))
+        for player in engine.other_players:
+            self.assertAlmostEqual(sum(probabilities.player_probabilities(player.number).values()), player.hand_size)
+
+    def test_max_states(self):
+        game = RECORDED_GAMES['six_player_60_turns']
+        engine = replay(dict(game, turns=game['turns'][:5]))
+        with self.assertRaises(pr.EnumerationTooLarge):
+            pr.count_deals(pr.DealConstraints.from_engine(engine), max_states=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
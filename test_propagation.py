@@ -0,0 +1,101 @@
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+import clue_solver as cs
+import defs
+import fuzz_engines as fz
+import propagation as pg
+from bench_clue_solver import RECORDED_GAMES, replay
+
+
+def card_index(card):
+    return defs.CARD_ORDER.index(card)
+
+
+class TestKnowledgeMatrix(TestCase):
+    def test_masks_round_trip(self):
+        masks = [0, defs.ALL_CARDS_MASK, defs.cards_to_mask({'plum', 'rope', 'ballroom'})]
+        bits = pg.masks_to_matrix(masks)
+        self.assertEqual(bits.shape, (3, defs.NUM_CARDS))
+        self.assertTrue(bits[2, card_index('ballroom')])
+        self.assertEqual(pg.matrix_to_masks(bits), masks)
+
+    def test_matrix_of_engine(self):
+        engine = cs.Engine(4, 1, ['plum', 'rope', 'pipe', 'hall', 'study'])
+        engine.accusation = {'white'}
+        matrix = pg.knowledge_matrix(engine)
+        self.assertEqual(matrix.shape, (5, defs.NUM_CARDS))
+        # The rest of a solved category is out of the envelope, as are the cards in my hand
+        self.assertEqual(matrix[0, card_index('white')], pg.HAS)
+        self.assertEqual(matrix[0, card_index('green')], pg.LACKS)
+        self.assertEqual(matrix[0, card_index('rope')], pg.LACKS)
+        self.assertEqual(matrix[0, card_index('knife')], pg.UNKNOWN)
+        self.assertEqual(matrix[1, card_index('rope')], pg.HAS)
+        self.assertEqual(matrix[1, card_index('knife')], pg.LACKS)
+        self.assertEqual(matrix[2, card_index('knife')], pg.UNKNOWN)
+
+
+class TestRules(TestCase):
+    def setUp(self):
+        self.matrix = np.zeros((3, defs.NUM_CARDS), dtype=np.int8)
+
+    def test_exclude_held_cards(self):
+        self.matrix[1, card_index('rope')] = pg.HAS
+        self.assertTrue(pg.exclude_held_cards(self.matrix))
+        self.assertEqual(list(self.matrix[:, card_index('rope')]), [pg.LACKS, pg.HAS, pg.LACKS])
+        self.assertFalse(pg.exclude_held_cards(self.matrix))
+
+    def test_assign_sole_owners(self):
+        self.matrix[[0, 1], card_index('rope')] = pg.LACKS
+        self.assertTrue(pg.assign_sole_owners(self.matrix))
+        self.assertEqual(self.matrix[2, card_index('rope')], pg.HAS)
+        self.matrix[2, card_index('rope')] = pg.LACKS
+        with self.assertRaises(ValueError):
+            pg.assign_sole_owners(self.matrix)
+
+    def test_apply_murder_categories(self):
+        weapons = [card_index(card) for card in defs.WEAPON.__members__]
+        self.matrix[0, weapons[:-1]] = pg.LACKS
+        self.assertTrue(pg.apply_murder_categories(self.matrix))
+        self.assertEqual(self.matrix[0, weapons[-1]], pg.HAS)
+
+        self.matrix[0, card_index('plum')] = pg.HAS
+        self.assertTrue(pg.apply_murder_categories(self.matrix))
+        self.assertEqual(self.matrix[0, card_index('green')], pg.LACKS)
+
+        self.matrix[0, card_index('green')] = pg.HAS
+        with self.assertRaises(ValueError):
+            pg.apply_murder_categories(self.matrix)
+
+    def test_apply_hand_sizes(self):
+        self.matrix[1, :2] = pg.HAS
+        self.matrix[2, 3:] = pg.LACKS
+        self.assertTrue(pg.apply_hand_sizes(self.matrix, [1, 2], np.array([2, 3])))
+        self.assertTrue((self.matrix[1, 2:] == pg.LACKS).all())
+        self.assertTrue((self.matrix[2, :3] == pg.HAS).all())
+
+
+class TestPropagation(TestCase):
+    def test_propagation_settles(self):
+        """propagate() leaves nothing for any rule to deduce, and only ever adds to what the Engine knew"""
+        game = RECORDED_GAMES['four_player_40_turns']
+        engine = replay(dict(game, turns=game['turns'][:20]))
+        before = pg.knowledge_matrix(engine)
+        matrix = before.copy()
+        rows = [player.number for player in engine.other_players]
+        hand_sizes = np.array([player.hand_size for player in engine.other_players])
+        pg.propagate(matrix, rows, hand_sizes)
+        self.assertTrue(((before == pg.UNKNOWN) | (matrix == before)).all())
+        self.assertFalse(pg.propagate(matrix, rows, hand_sizes))
+
+    def test_matrix_engine_matches_engine(self):
+        """The rules on the matrix deduce exactly what the Engine's own do on its bitmasks"""
+        candidate, reference = fz.load_implementation('matrix'), fz.load_implementation('worklist')
+        for seed in range(20):
+            self.assertIsNone(fz.first_disagreement(fz.random_script(seed), candidate, reference))
+
+
+if __name__ == "__main__":
+    unittest.main()
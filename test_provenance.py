@@ -0,0 +1,130 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+import display
+import provenance as pv
+from bench_clue_solver import RECORDED_GAMES, parse_turn, replay
+from defs import ALL_CARDS_MASK
+from journal import GameJournal, read_journal
+from simulator import random_game
+
+
+class TestProvenance(TestCase):
+    def setUp(self):
+        self.game = RECORDED_GAMES['four_player_40_turns']
+        self.engine = replay(dict(self.game, turns=self.game['turns'][:20]))
+
+    def test_agrees_with_engine(self):
+        """The facts with justifications are exactly the Engine's deductions"""
+        for game in list(RECORDED_GAMES.values()) + [random_game(seed) for seed in range(30)]:
+            engine = replay(game)
+            provenance = pv.track(engine)
+            self.assertIsNone(provenance.contradiction)
+            self.assertEqual(provenance.has[pv.ENVELOPE], engine.accusation.mask)
+            for player in engine.all_players:
+                self.assertEqual(provenance.has[player.number], player.hand.mask)
+                self.assertEqual(provenance.lacks[player.number],
+                                 ALL_CARDS_MASK & ~player.hand.mask & ~player.possibles.mask)
+
+    def test_justification(self):
+        # Turn 5: I suggested mustard, rope, hall and Player 3 showed me the rope
+        kind, rule, inputs = pv.track(self.engine).justify(3, 'rope')
+        self.assertEqual((kind, rule), (pv.HAS, 'given'))
+        self.assertEqual([self.engine.provenance.keys[index] for index in inputs], [self.engine.turn_sequence[5]])
+        # Nobody else can have it
+        kind, rule, inputs = pv.track(self.engine).justify(4, 'rope')
+        self.assertEqual((kind, rule), (pv.LACKS, 'one owner'))
+        self.assertIn('Player 4 lacks rope', pv.explain(self.engine, 4, 'rope')[0])
+
+    def test_tracks_undo(self):
+        provenance = pv.track(self.engine)
+        turn = parse_turn(self.engine, 21, self.game['turns'][20])
+        self.engine.checkpoint('Turn 21')
+        self.engine.one_time_turn_deductions(turn)
+        self.engine.turn_sequence.append(turn)
+        self.engine.process_turns_for_info()
+        # New inputs are added on
+        self.assertIs(pv.track(self.engine), provenance)
+        self.assertIs(provenance.keys[-1], turn)
+
+        self.engine.undo()
+        self.assertIsNot(pv.track(self.engine), provenance)
+        self.assertNotIn(turn, self.engine.provenance.keys)
+
+    def test_minimal_conflict(self):
+        self.engine.apply_update(3, 'lacks', 'rope')
+        conflict = pv.find_conflict(self.engine)
+        provenance = self.engine.provenance
+        self.assertIn(len(provenance.inputs) - 1, conflict.inputs)
+        self.assertIn("Player 3 would both have and lack rope", conflict.reason)
+        # The conflict is minimal: leaving out any of it, the rest agree
+        support = sum(1 << index for index in conflict.inputs)
+        self.assertIsNotNone(provenance.replay(support))
+        for index in conflict.inputs:
+            self.assertIsNone(provenance.replay(support & ~(1 << index)))
+
+
+class TestRollBack(TestCase):
+    def setUp(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        self.engine = replay(dict(game, turns=game['turns'][:20]))
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine.journal = GameJournal(os.path.join(self.directory.name, 'game_journal.jsonl'))
+        self.out = io.StringIO()
+        self.engine.renderer = display.BoardRenderer(out=self.out, ansi=True, rows=200)
+
+    def tearDown(self):
+        self.engine.journal.close()
+        self.directory.cleanup()
+
+    def state(self):
+        return ([(player.hand.mask, player.possibles.mask) for player in self.engine.all_players],
+                self.engine.accusation.mask, len(self.engine.turn_sequence), list(self.engine.updates))
+
+    @mock.patch("clue_solver.input")
+    def test_bad_update_is_rolled_back(self, mock_input):
+        before = self.state()
+        mock_input.side_effect = ['3,lacks,rope']
+        self.engine.user_updates_hands(21)
+        self.assertEqual(self.state(), before)
+        self.assertEqual([record['type'] for record in read_journal(self.engine.journal.path)], ['update', 'undo'])
+        # The explanation is part of the board drawn after it, rather than printed and then drawn over
+        board = self.out.getvalue()
+        self.assertIn("UPDATE Player 3 lacks rope contradicts what's known", board)
+        self.assertIn("It has been undone (enter REDO to keep it anyway)", board)
+        self.assertEqual(self.engine.notices, [])
+
+        # Unless the user insists
+        self.engine.redo()
+        self.assertEqual(self.engine.updates, [(21, 3, 'lacks', 'rope')])
+
+    @mock.patch("clue_solver.input")
+    def test_good_update_is_kept(self, mock_input):
+        mock_input.side_effect = ['2,lacks,rope']
+        self.engine.user_updates_hands(21)
+        self.assertEqual(self.engine.updates, [(21, 2, 'lacks', 'rope')])
+
+    def test_impossible_turn_is_rolled_back(self):
+        before = self.state()
+        # Player 2 can't have shown me any of these cards, since I hold them all
+        turn = parse_turn(self.engine, 21, 'white,candlestick,lounge,2')
+        self.engine.checkpoint('Turn 21')
+        self.engine.one_time_turn_deductions(turn)
+        self.engine.turn_sequence.append(turn)
+        self.assertFalse(self.engine.settle_or_roll_back())
+        self.assertEqual(self.state(), before)
+        self.assertEqual(self.engine.notices[-1], "   It has been undone")
+        # The deductions gave up halfway through, so what they left can't be redone
+        with self.assertRaises(ValueError):
+            self.engine.redo()
+
+        self.engine.render_board()
+        self.assertIn("Turn 21 contradicts what's known", self.out.getvalue())
+        self.assertEqual(self.engine.notices, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import math
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+import defs
+import recommender as rc
+from bench_clue_solver import RECORDED_GAMES, replay
+
+
+def card_index(card):
+    return defs.CARD_ORDER.index(card)
+
+
+class TestExpectedInformationGain(TestCase):
+    def test_known_cards_teach_nothing(self):
+        """When every card's holder is known, no response can be a surprise"""
+        holders = np.zeros((2, defs.NUM_CARDS))
+        holders[0, [card_index('plum'), card_index('rope')]] = 1
+        holders[1, card_index('hall')] = 1
+        suggestion = np.array([[card_index('plum'), card_index('rope'), card_index('hall')]])
+        self.assertAlmostEqual(rc.expected_information_gain(holders, suggestion)[0], 0)
+
+    def test_coin_flip_is_one_bit(self):
+        """A suggestion that a card is revealed half of the time is worth one bit"""
+        holders = np.zeros((2, defs.NUM_CARDS))
+        holders[1, card_index('knife')] = 0.5
+        suggestion = np.array([[card_index('plum'), card_index('knife'), card_index('hall')]])
+        self.assertAlmostEqual(rc.expected_information_gain(holders, suggestion)[0], 1)
+
+    def test_rank_suggestions(self):
+        """Every possible suggestion is scored, and the best come first"""
+        game = RECORDED_GAMES['four_player_40_turns']
+        engine = replay(dict(game, turns=game['turns'][:20]))
+        probabilities = engine.estimate_probabilities()
+        ranked = rc.rank_suggestions(probabilities, [2, 3, 4], top=len(rc.SUGGESTIONS))
+        self.assertEqual(len(ranked), math.prod(len(category.__members__) for category in defs.CATEGORIES))
+        gains = [gain for gain, _ in ranked]
+        self.assertEqual(gains, sorted(gains, reverse=True))
+        categories = [category.__name__ for category in defs.CATEGORIES]
+        for _, cards in ranked[:5]:
+            self.assertEqual([defs.CARD_TO_CATEGORY[card] for card in cards], categories)
+
+
+if __name__ == "__main__":
+    unittest.main()
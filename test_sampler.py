@@ -0,0 +1,61 @@
+import time
+import unittest
+from unittest import mock, TestCase
+
+import probability as pr
+import sampler
+from bench_clue_solver import RECORDED_GAMES, replay
+
+
+class TestSampleDeals(TestCase):
+    def setUp(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        engine = replay(dict(game, turns=game['turns'][:10]))
+        self.constraints = pr.DealConstraints.from_engine(engine)
+
+    def test_estimates_match_exact_counts(self):
+        """The sampled probabilities should land close to the exact ones"""
+        exact = pr.enumerate_deals(self.constraints)
+        estimate = sampler.sample_deals(self.constraints, num_samples=5000, processes=1, seed=7)
+        self.assertFalse(estimate.exact)
+        for number in (0,) + self.constraints.numbers:
+            for card in exact.murder_probabilities():
+                low, high = estimate.confidence_interval(number, card, z=4)
+                self.assertLessEqual(low, exact.probability(number, card))
+                self.assertGreaterEqual(high, exact.probability(number, card))
+
+    def test_seeded_sample_is_reproducible(self):
+        """With a seed and a sample budget, the estimates don't depend on the number of processes"""
+        in_process = sampler.sample_deals(self.constraints, num_samples=1200, processes=1, seed=3)
+        in_pool = sampler.sample_deals(self.constraints, num_samples=1200, processes=2, seed=3)
+        self.assertEqual(in_process.num_drawn, 1200)
+        self.assertEqual(in_process.murder_probabilities(), in_pool.murder_probabilities())
+        self.assertEqual(in_process.player_probabilities(2), in_pool.player_probabilities(2))
+
+    def test_time_budget(self):
+        """Sampling stops soon after the time budget runs out"""
+        start = time.time()
+        sampler.sample_deals(self.constraints, time_budget=0.2, processes=1)
+        self.assertLess(time.time() - start, 1)
+
+    def test_no_consistent_draw(self):
+        """A sample with no consistent deal in it fails as a sample, not as a contradiction"""
+        with mock.patch.object(sampler.DealSampler, 'draw', return_value=None):
+            with self.assertRaises(pr.SamplingFailed) as raised:
+                sampler.sample_deals(self.constraints, num_samples=100, processes=1)
+        self.assertNotIsInstance(raised.exception, ValueError)
+        self.assertIn('none of the 100 random deals drawn', str(raised.exception))
+
+    def test_should_stop(self):
+        """Sampling gives up soon after should_stop() says so, in this process or in the pool"""
+        for processes in (1, 2):
+            stop_at = time.time() + 0.2
+            start = time.time()
+            with self.assertRaises(pr.EstimationCancelled):
+                sampler.sample_deals(self.constraints, time_budget=10, processes=processes,
+                                     should_stop=lambda: time.time() > stop_at)
+            self.assertLess(time.time() - start, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import unittest
+from unittest import mock, TestCase
+
+from bench_clue_solver import RECORDED_GAMES, replay
+from load_test_service import Client
+import service
+from service import ClueService, ServiceError
+
+
+class TestService(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ClueService(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.shutdown()
+
+    def run_with_client(self, coroutine):
+        async def run():
+            server = await self.service.start('127.0.0.1', 0)
+            client = await Client.connect('127.0.0.1', server.sockets[0].getsockname()[1])
+            try:
+                return await coroutine(client)
+            finally:
+                await client.close()
+                server.close()
+        return asyncio.run(run())
+
+    def test_game_session(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        expected = replay(game)
+
+        async def play(client):
+            status, created = await client.request('POST', '/games', {
+                'num_players': 4, 'my_player_number': 1, 'my_hand': game['my_hand']})
+            self.assertEqual(status, 201)
+            path = f"/games/{created['game_id']}"
+            for line in game['turns'][:20]:
+                self.assertEqual((await client.request('POST', f"{path}/turns", {'lines': [line]}))[0], 200)
+            status, state = await client.request('POST', f"{path}/turns", {'lines': game['turns'][20:]})
+            self.assertEqual(status, 200)
+            self.assertEqual(state, (await client.request('GET', path))[1])
+            return path, state
+
+        path, state = self.run_with_client(play)
+        self.assertEqual(state['turns'], len(game['turns']))
+        self.assertEqual(state['accusation'], sorted(expected.accusation))
+        for player in expected.all_players:
+            self.assertEqual(state['players'][str(player.number)]['hand'], sorted(player.hand))
+
+    def test_requests_are_all_or_nothing(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+
+        async def play(client):
+            _, created = await client.request('POST', '/games', {
+                'num_players': 4, 'my_player_number': 1, 'my_hand': game['my_hand']})
+            path = f"/games/{created['game_id']}"
+            _, before = await client.request('POST', f"{path}/turns", {'lines': game['turns']})
+
+            # A mistaken line: nothing is applied
+            status, response = await client.request('POST', f"{path}/turns", {'lines': ['pass', 'plum,rope,knife,2']})
+            self.assertEqual(status, 400)
+            self.assertEqual(response['errors'][0][0], 1)
+            self.assertEqual((await client.request('GET', path))[1], before)
+
+            # A contradiction: Player 3 showed a card on Turn 2, so can't lack all three
+            _, created = await client.request('POST', '/games', {
+                'num_players': 4, 'my_player_number': 1, 'my_hand': game['my_hand']})
+            path = f"/games/{created['game_id']}"
+            await client.request('POST', f"{path}/turns", {'lines': ['pass', 'plum,rope,hall,3']})
+            _, before = await client.request('GET', path)
+            status, _ = await client.request('POST', f"{path}/turns", {
+                'lines': ['3,lacks,plum', '3,lacks,rope', '3,lacks,hall']})
+            self.assertEqual(status, 409)
+            self.assertEqual((await client.request('GET', path))[1], before)
+
+            self.assertEqual((await client.request('DELETE', path))[0], 200)
+            self.assertEqual((await client.request('GET', path))[0], 404)
+            self.assertEqual((await client.request('POST', '/games', {'num_players': 4}))[0], 400)
+            self.assertEqual((await client.request('GET', '/nowhere'))[0], 404)
+
+        self.run_with_client(play)
+
+    def test_applied_requests_keep_no_checkpoint(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+        service._create_game(0, 4, 1, game['my_hand'])
+        try:
+            for line in ['pass', 'plum,rope,hall,3']:
+                self.assertEqual(service._submit_lines(0, [line])[0], 200)
+            self.assertEqual(service._engines[0].history, [])
+            # Player 3 showed a card on Turn 2, so can't lack all three
+            self.assertEqual(service._submit_lines(0, ['3,lacks,plum', '3,lacks,rope', '3,lacks,hall'])[0], 409)
+            self.assertEqual(service._engines[0].history, [])
+        finally:
+            service._delete_game(0)
+
+    def test_failures_are_answered(self):
+        game = RECORDED_GAMES['four_player_40_turns']
+
+        async def play(client):
+            _, created = await client.request('POST', '/games', {
+                'num_players': 4, 'my_player_number': 1, 'my_hand': game['my_hand']})
+            game_id = created['game_id']
+            # A bug answers 500, and the connection carries on
+            with mock.patch.object(self.service, 'handle', side_effect=RuntimeError('bug')):
+                status, response = await client.request('GET', f"/games/{game_id}")
+            self.assertEqual(status, 500)
+            self.assertEqual(response['error'], "Internal error: RuntimeError: bug")
+            self.assertEqual((await client.request('GET', f"/games/{game_id}"))[0], 200)
+
+            # A worker process dying loses its games, but a new one takes over
+            with self.assertRaises(ServiceError) as raised:
+                await self.service._run(game_id, os._exit)
+            self.assertEqual(raised.exception.status, 500)
+            self.assertEqual((await client.request('GET', f"/games/{game_id}"))[0], 404)
+
+        self.run_with_client(play)
+
+
+if __name__ == "__main__":
+    unittest.main()
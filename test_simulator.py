@@ -0,0 +1,33 @@
+import random
+import unittest
+from unittest import TestCase
+
+import defs
+import simulator as sim
+
+
+class TestSimulator(TestCase):
+    def test_deal_follows_setup_rules(self):
+        """One Murder Card per category, and leftover cards go to the first Players in the rotation"""
+        for seed in range(20):
+            rng = random.Random(seed)
+            num_players = 3 + seed % 4
+            murder_cards, hands = sim.deal(rng, num_players)
+            for category, card in zip(defs.CATEGORIES, murder_cards):
+                self.assertIn(card, category.__members__)
+            dealt = [card for hand in hands.values() for card in hand]
+            self.assertCountEqual(dealt + murder_cards, defs.CARD_ORDER)
+            sizes = [len(hands[number]) for number in range(1, num_players + 1)]
+            self.assertEqual(sizes, sorted(sizes, reverse=True))
+            self.assertLessEqual(sizes[0] - sizes[-1], 1)
+
+    def test_games_are_solved_correctly(self):
+        """The Engine must reach the right accusation, and the same seed must replay the same game"""
+        results = [sim.simulate_game(seed) for seed in range(25)]
+        for result in results:
+            self.assertIsNotNone(result.turns_to_accuse)
+            self.assertEqual(len(result.propagation_times), len(sim.simulate_game(result.seed).propagation_times))
+
+
+if __name__ == "__main__":
+    unittest.main()